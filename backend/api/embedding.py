@@ -3,13 +3,15 @@ from pathlib import Path
 from typing import List, Dict, Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
 import threading
-from tqdm import tqdm
 import logging
 import os
 
 from backend.utils.config import get_settings
+from backend.services.embedding_service import embed_items, encode_texts
+from backend.services.model_registry import get_model_registry
+from backend.services.embedding_stream import can_resume, iter_json_items, stream_embed_file
+from backend.services.embedding_store import write_embedding_store
 
 router = APIRouter(tags=["Embed"])
 
@@ -29,16 +31,21 @@ class FileEmbeddingRequest(BaseModel):
     content_field: str = "content"
     output_path: Optional[str] = None
     overwrite: bool = False
+    batch_size: Optional[int] = None
+    stream: bool = False  # 流式模式：增量读取并输出 NDJSON
+    resume: bool = False  # 流式模式下从上次中断处继续
+    output_format: str = "json"  # json / npy（向量写入 .npy，元数据写入 .meta.ndjson）
+    vector_dtype: str = "float32"  # npy 格式下的向量类型：float32 / float16
 
 # ===== 模型加载函数 =====
-def get_embedding_model(model_path: str = "E:/model/m3e-base"):
+def get_embedding_model(model_path: Optional[str] = None):
     settings = get_settings()
     global _embedding_model
     with _model_lock:
         if _embedding_model is None:
             try:
-                _embedding_model = SentenceTransformer(
-                    model_path,
+                _embedding_model = get_model_registry().acquire(
+                    model_path or settings.EMBEDDING_MODEL_PATH,
                     device=settings.DEVICE or "cpu"
                 )
                 logging.info("Embedding model loaded successfully")
@@ -55,7 +62,7 @@ def generate_embedding(request: EmbeddingRequest):
     """
     try:
         model = get_embedding_model()
-        embedding = model.encode([request.text]).tolist()[0]
+        embedding = encode_texts(model, [request.text])[0]
         return {"text": request.text, "embedding": embedding}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating embedding: {str(e)}")
@@ -67,7 +74,7 @@ def batch_generate_embedding(request: BatchEmbeddingRequest):
     """
     try:
         model = get_embedding_model()
-        embeddings = model.encode(request.texts).tolist()
+        embeddings = encode_texts(model, request.texts, batch_size=get_settings().EMBEDDING_BATCH_SIZE)
         results = [{"text": text, "embedding": emb} for text, emb in zip(request.texts, embeddings)]
         return {"count": len(results), "results": results}
     except Exception as e:
@@ -87,11 +94,43 @@ def process_json_file(request: FileEmbeddingRequest):
             raise HTTPException(status_code=404, detail="Input file not found")
         
         # 设置输出路径
+        suffix = "npy" if request.output_format == "npy" else ("ndjson" if request.stream else "json")
         output_path = Path(request.output_path) if request.output_path else \
-            input_path.parent / f"{input_path.stem}_with_embeddings.json"
+            input_path.parent / f"{input_path.stem}_with_embeddings.{suffix}"
         
+        # resume 只对流式 NDJSON 输出有效，且输出文件必须留有未完成的进度记录
+        resume = request.resume and request.stream and request.output_format != "npy"
         if output_path.exists() and not request.overwrite:
-            raise HTTPException(status_code=400, detail="Output file already exists and overwrite=False")
+            if not resume:
+                raise HTTPException(status_code=400, detail="Output file already exists and overwrite=False")
+            if not can_resume(output_path):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Output file already exists with no progress record to resume from"
+                )
+        # overwrite=True 且没有可续跑的进度时从头写
+        resume = resume and can_resume(output_path)
+
+        batch_size = request.batch_size or get_settings().EMBEDDING_BATCH_SIZE
+        if request.output_format == "npy":
+            stats = write_embedding_store(
+                model,
+                iter_json_items(input_path),
+                output_path,
+                request.content_field,
+                batch_size,
+                dtype=request.vector_dtype
+            )
+            return {"input_file": str(input_path), "output_file": str(output_path), **stats}
+        if request.stream:
+            stats = stream_embed_file(
+                model, input_path, output_path, request.content_field, batch_size, resume=resume
+            )
+            return {
+                "input_file": str(input_path),
+                "output_file": str(output_path),
+                **stats
+            }
         
         # 读取输入文件
         with open(input_path, "r", encoding="utf-8") as f:
@@ -100,20 +139,8 @@ def process_json_file(request: FileEmbeddingRequest):
         if not isinstance(data, list):
             raise HTTPException(status_code=400, detail="Input JSON should be a list of items")
         
-        # 处理数据
-        processed = []
-        for item in tqdm(data, desc="Generating embeddings"):
-            if request.content_field not in item:
-                continue
-            
-            try:
-                text = item[request.content_field]
-                embedding = model.encode(text).tolist()
-                item["embedding"] = embedding
-                processed.append(item)
-            except Exception as e:
-                logging.warning(f"Failed to process item: {e}")
-                continue
+        # 处理数据（按长度排序分批编码）
+        processed = embed_items(model, data, request.content_field, batch_size)
         
         # 保存结果
         with open(output_path, "w", encoding="utf-8") as f:
@@ -125,6 +152,8 @@ def process_json_file(request: FileEmbeddingRequest):
             "processed_items": len(processed),
             "skipped_items": len(data) - len(processed)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
@@ -132,7 +161,8 @@ def process_json_file(request: FileEmbeddingRequest):
 async def upload_and_process_file(
     file: UploadFile = File(...),
     content_field: str = "content",
-    overwrite: bool = False
+    overwrite: bool = False,
+    batch_size: Optional[int] = None
 ):
     """
     上传JSON文件并处理生成嵌入向量
@@ -147,20 +177,8 @@ async def upload_and_process_file(
         if not isinstance(data, list):
             raise HTTPException(status_code=400, detail="Uploaded JSON should be a list of items")
         
-        # 处理数据
-        processed = []
-        for item in tqdm(data, desc="Generating embeddings"):
-            if content_field not in item:
-                continue
-            
-            try:
-                text = item[content_field]
-                embedding = model.encode(text).tolist()
-                item["embedding"] = embedding
-                processed.append(item)
-            except Exception as e:
-                logging.warning(f"Failed to process item: {e}")
-                continue
+        # 处理数据（按长度排序分批编码）
+        processed = embed_items(model, data, content_field, batch_size or get_settings().EMBEDDING_BATCH_SIZE)
         
         # 返回结果而不是保存
         return {
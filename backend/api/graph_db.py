@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Any, List, Dict, Optional
+import threading
+import logging
 from backend.services.neo4j_client import MetadataInput, Neo4jClient, SqlContent, generate_cypher, parse_sql_metadata
 from backend.utils.config import get_settings
 
 router = APIRouter(tags=["GraphDB"])
+logger = logging.getLogger(__name__)
 
 # ===== 请求模型定义 =====
 class ClearGraphRequest(BaseModel):
@@ -12,6 +15,15 @@ class ClearGraphRequest(BaseModel):
 
 class InsertCypherRequest(BaseModel):
     cypher_content: str  # 从 .cypher 文件加载的内容
+    batched: bool = False  # 为 True 时按分号拆分，每 batch_size 条语句一个事务
+    batch_size: Optional[int] = Field(None, ge=1)  # 默认 Settings.NEO4J_BATCH_SIZE
+
+class LoadSqlRequest(BaseModel):
+    content: str  # SQL 文件内容（CREATE TABLE 语句）
+    batch_size: Optional[int] = Field(None, ge=1)  # 每个事务写入的行数，默认 Settings.NEO4J_BATCH_SIZE
+
+class SyncSqlRequest(LoadSqlRequest):
+    dry_run: bool = False  # 为 True 时只返回差异摘要，不写入
 
 class QueryGraphRequest(BaseModel):
     input_string: str  # 要查询的字符串，可能是表名或字段名
@@ -19,23 +31,46 @@ class QueryGraphRequest(BaseModel):
     return_data: bool = True  # 是否返回完整数据，默认为True
 
 # ===== 初始化 Neo4j 客户端 =====
-# def get_neo4j_client():
-#     settings = get_settings()
-#     client = Neo4jClient(
-#         uri=settings.NEO4J_URI,
-#         user=settings.NEO4J_USER,
-#         password=settings.NEO4J_PASSWORD
-#     )
-#     yield client
-#     client.close()
+# 全局共享 Neo4j 客户端，整个应用生命周期复用同一个驱动及其连接池
+_neo4j_client = None
+_lock = threading.Lock()
+
 def get_neo4j_client():
-    client = Neo4jClient(
-        uri="bolt://localhost:7687",  # 直接写死 URI
-        user="neo4j",                # 直接写死用户名
-        password="password"          # 直接写死密码
-    )
-    yield client
-    client.close()
+    global _neo4j_client
+    with _lock:
+        if _neo4j_client is None:
+            settings = get_settings()
+            _neo4j_client = Neo4jClient(
+                uri=settings.NEO4J_URI,
+                user=settings.NEO4J_USER,
+                password=settings.NEO4J_PASSWORD,
+                max_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+                acquisition_timeout=settings.NEO4J_ACQUISITION_TIMEOUT,
+                liveness_check_seconds=settings.NEO4J_LIVENESS_CHECK_SECONDS,
+                max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME
+            )
+    return _neo4j_client
+
+
+def ensure_neo4j_schema():
+    """
+    确保约束与索引存在，作为后台预热步骤执行，结果见 /ready 的 neo4j_schema 组件
+    Neo4j 不可用或有语句失败时抛出异常，由预热记录为 failed
+    """
+    report = get_neo4j_client().ensure_schema()
+    failed = [item for item in report if not item["ok"]]
+    if failed:
+        raise RuntimeError(f"Neo4j schema bootstrap incomplete: {failed}")
+    return {"statements": len(report)}
+
+
+def close_neo4j_client():
+    """应用关闭时释放驱动及连接池"""
+    global _neo4j_client
+    with _lock:
+        if _neo4j_client is not None:
+            _neo4j_client.close()
+            _neo4j_client = None
 
 # ===== 接口实现 =====
 
@@ -54,12 +89,42 @@ def clear_graph(request: ClearGraphRequest, client: Neo4jClient = Depends(get_ne
 @router.post("/insert")
 def insert_cypher_data(request: InsertCypherRequest, client: Neo4jClient = Depends(get_neo4j_client)):
     try:
+        if request.batched:
+            batch_size = request.batch_size or get_settings().NEO4J_BATCH_SIZE
+            return client.insert_cypher_batched(request.cypher_content, batch_size)
         result = client.insert_cypher_content(request.cypher_content)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 解析 SQL 并以参数化批量写入图数据库
+@router.post("/load-sql")
+def load_sql_metadata(request: LoadSqlRequest, client: Neo4jClient = Depends(get_neo4j_client)):
+    """
+    解析 SQL 文件中的建表语句，直接以 UNWIND 批量写入表、字段及其关系，
+    不经过 generate_cypher 生成的脚本
+    """
+    try:
+        metadata = parse_sql_metadata(request.content)
+        return client.load_metadata(metadata, request.batch_size or get_settings().NEO4J_BATCH_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # 查询图数据库中的部分数据（用于前端预览）
+# 增量同步：只写入与图中现有结构的差异
+@router.post("/sync-sql")
+def sync_sql_metadata(request: SyncSqlRequest, client: Neo4jClient = Depends(get_neo4j_client)):
+    """
+    解析 SQL 后与图中已有的表、字段、外键对比，以 MERGE/DELETE/SET 批量写入差异，
+    无需先清空图库，返回新增/删除/变更的差异摘要
+    """
+    try:
+        metadata = parse_sql_metadata(request.content)
+        batch_size = request.batch_size or get_settings().NEO4J_BATCH_SIZE
+        return client.sync_metadata(metadata, batch_size, dry_run=request.dry_run)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/query")
 def query_graph(request: QueryGraphRequest, client: Neo4jClient = Depends(get_neo4j_client)):
     """
@@ -95,4 +160,42 @@ async def convert_sql_to_cypher(input_data: SqlContent):
         cypher_script = generate_cypher(metadata)
         return {"cypher": cypher_script}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
+
+
+# 全文检索表名、字段名及注释
+@router.get("/search")
+def search_schema(text: str, limit: int = 20, client: Neo4jClient = Depends(get_neo4j_client)):
+    try:
+        return {"results": client.search_schema(text, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/schema/ensure")
+def ensure_graph_schema(client: Neo4jClient = Depends(get_neo4j_client)):
+    """重新创建缺失的约束与索引（如清理重复表节点后补建唯一约束）"""
+    try:
+        return {"statements": client.ensure_schema()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/schema/check")
+def check_graph_indexes(client: Neo4jClient = Depends(get_neo4j_client)):
+    """EXPLAIN 热点查询，确认按索引查找而非标签扫描"""
+    try:
+        report = client.check_index_usage()
+        # 只要有一段仍做标签扫描（如 TABLE_OR_FIELD_QUERY 的字段分支）就不算通过
+        return {
+            "all_index_seeks": all(item["uses_index_seek"] and not item["label_scans"] for item in report),
+            "queries": report
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/pool")
+def neo4j_pool_status(client: Neo4jClient = Depends(get_neo4j_client)):
+    """连接池占用情况与存活检查"""
+    return {**client.stats(), "liveness": client.check_liveness()}
@@ -126,6 +126,7 @@ def cancel_task(task_id: str):
 
 class MetadataInput(BaseModel):
     metadata: List[Dict[str, Any]]  
+    database: Optional[str] = None  # 来源数据库，写入每个条目的 metadata.database
     
 @router.post("/format-vector-items", response_model=List[Dict])
 def format_vector_items_endpoint(input_data: MetadataInput):
@@ -134,6 +135,7 @@ def format_vector_items_endpoint(input_data: MetadataInput):
     
     输入：
     - metadata_list: 包含多个 metadata 的列表，每个 metadata 是包含 table_info、fields、metrics 的字典
+    - database: (可选) 来源数据库，向量库按库名和条目类型分区
     
     输出：
     - list of items，每项包含 type, content, metadata
@@ -143,7 +145,7 @@ def format_vector_items_endpoint(input_data: MetadataInput):
         # 遍历每个 metadata 字典并生成 items
         for metadata in input_data.metadata:
             print(f"Processing metadata: {metadata}")
-            items = generate_vector_items(metadata)
+            items = generate_vector_items(metadata, input_data.database)
             print(f"Generated items: {items}")
             all_items.extend(items)
         return all_items
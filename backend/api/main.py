@@ -1,21 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 import logging
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from backend.models.m3e_base import model
-from sentence_transformers import SentenceTransformer
+from backend.services.model_registry import get_model_registry
+from backend.services.search_executor import close_search_executor
+from backend.services.warmup import check_components, readiness, start_warmup
+from backend.utils.config import get_settings
 # 导入各模块的路由
 from .database import router as database_router
-from .vector_db import router as vector_db_router
-from backend.api.graph_db import router as graph_db_router
+from .vector_db import get_milvus_client, router as vector_db_router
+from backend.api.graph_db import close_neo4j_client, ensure_neo4j_schema, router as graph_db_router
 from .llm_description import router as llm_description_router
 # from .embedding import router as embed_router
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 应用先完成构建并开始接收请求，模型、Milvus 与图库约束/索引在后台准备，进度见 /ready
+    start_warmup(get_milvus_client, ensure_neo4j_schema)
+    yield
+    close_search_executor()
+    close_neo4j_client()
+
 # 创建 FastAPI 实例
 app = FastAPI(
     title="Text2SQL Backend API",
     description="API for managing database connections, embedding knowledge into vector DB, and building Neo4j graphs.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 logger = logging.getLogger(__name__)
 
@@ -41,6 +53,23 @@ async def validation_exception_handler(request, exc):
 def health_check():
     return {"status": "ok"}
 
+# 就绪检查接口：各组件预热完成后返回 200，否则返回 503；未启用预热时直接检查模型与 Milvus
+@app.get("/ready", tags=["System"])
+def ready_check():
+    components = readiness.snapshot()
+    if not get_settings().WARMUP_ENABLED:
+        components.update(check_components(get_milvus_client))
+    ready = bool(components) and all(c["status"] == "ready" for c in components.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": components}
+    )
+
+# 已加载的嵌入模型及引用计数
+@app.get("/models", tags=["System"])
+def loaded_models():
+    return get_model_registry().stats()
+
 # 注册子路由
 app.include_router(llm_description_router, prefix="/api/llm", tags=["LLM Description"])
 app.include_router(database_router, prefix="/api/database", tags=["Database"])
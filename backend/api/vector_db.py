@@ -1,15 +1,24 @@
-import concurrent
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from typing import Any, List, Dict, Optional
-from sentence_transformers import SentenceTransformer
-from backend.services.milvus_client import MilvusClient
 from backend.utils.config import get_settings
 import threading
-from backend.models.m3e_base import model  
+from backend.models.m3e_base import get_model
+from backend.services.embedding_service import encode_texts
+from backend.services.embedding_cache import get_embedding_cache
+from backend.services.query_cache import embedding_hash, get_search_cache
+from backend.services.embedding_dispatcher import dispatcher_stats, encode_query
+from backend.services.search_executor import get_search_executor
 from fastapi import UploadFile, File
-import pandas as pd
-from io import StringIO
+import os
+import tempfile
+import uuid
+import math
+import time
+from backend.services.partitioning import with_default_database
+from backend.services.index_policy import INDEX_TYPES, TARGETS
+from backend.services.result_merge import collections_to_refetch, merge_top_k
+from backend.services.task_manager import task_manager
 router = APIRouter(tags=["VectorDB"])
 
 
@@ -22,17 +31,147 @@ def get_milvus_client():
     with _lock:
         if _milvus_client is None:
             settings = get_settings()
-            _milvus_client = MilvusClient(host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
-            _milvus_client.connect()
+            if settings.VECTOR_STORE_BACKEND == "local":
+                from backend.services.local_vector_store import LocalVectorClient
+                client = LocalVectorClient(settings.LOCAL_VECTOR_STORE_PATH)
+            else:
+                # 延迟导入 pymilvus，加快应用启动
+                from backend.services.milvus_client import MilvusClient
+                client = MilvusClient(host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+            client.connect()
+            _milvus_client = client
     return _milvus_client
 
 
+def search_timeout(timeout: Optional[float]) -> float:
+    """请求未指定超时（None）时使用默认值；显式传入的 0 保留，表示不等待"""
+    return timeout if timeout is not None else get_settings().SEARCH_TIMEOUT_SECONDS
+
+
+def get_query_embedding(query: str) -> List[float]:
+    """获取查询向量，优先命中内存缓存"""
+    cache = get_search_cache()
+    embedding = cache.get_embedding(query)
+    if embedding is None:
+        embedding = encode_query(get_model(), query)
+        cache.put_embedding(query, embedding)
+    return embedding
+
+
+def get_query_embeddings(queries: List[str]) -> List[List[float]]:
+    """批量获取查询向量：先查内存缓存，未命中的在一次前向计算中编码"""
+    cache = get_search_cache()
+    embeddings = [cache.get_embedding(query) for query in queries]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        encoded = encode_texts(get_model(), [queries[i] for i in missing], batch_size=len(missing))
+        for i, embedding in zip(missing, encoded):
+            embeddings[i] = embedding
+            cache.put_embedding(queries[i], embedding)
+    return embeddings
+
+
+def resolve_partitions(client, collections, databases=None, types=None, timeout=None):
+    """
+    并发确定各集合需要探查的分区
+    :return: ({集合名: 分区名列表或 None（全部）}, {集合名: 错误信息})
+    """
+    if not databases and not types:
+        return {col: None for col in collections}, {}
+    tasks = {col: lambda remaining, col=col: client.resolve_partitions(col, databases, types) for col in collections}
+    found = get_search_executor().fan_out(tasks, search_timeout(timeout))
+    partitions = {col: names for col, names in found.items() if not isinstance(names, dict)}
+    errors = {col: names["error"] for col, names in found.items() if isinstance(names, dict)}
+    return partitions, errors
+
+
+def search_collections(client, query_embedding, collections, top_k, kind="metadata", timeout=None, partitions=None):
+    """
+    在多个集合上检索同一个查询向量，优先命中结果缓存
+    未命中的集合提交到共享检索线程池并发执行
+    :param partitions: {集合名: 只探查的分区列表}，见 resolve_partitions，缺省检索全部分区
+    :return: ({集合名: 命中列表}, {集合名: 错误信息})，失败或超时的集合只出现在错误中
+    """
+    cache = get_search_cache()
+    emb_hash = embedding_hash(query_embedding)
+    search_fn = client.search_qa if kind == "qa" else client.search
+    partitions = partitions or {}
+
+    results, errors = {}, {}
+    tasks = {}
+    cache_kinds = {}
+    for col in collections:
+        names = partitions.get(col)
+        # 分区过滤后的结果单独缓存
+        cache_kinds[col] = kind if names is None else f"{kind}:{','.join(names)}"
+        cached = cache.get_results(col, emb_hash, top_k, kind=cache_kinds[col])
+        if cached is not None:
+            results[col] = cached
+        elif names is not None:
+            tasks[col] = lambda remaining, col=col, names=names: search_fn(
+                col, query_embedding, top_k, timeout=remaining, partition_names=names
+            )
+        else:
+            tasks[col] = lambda remaining, col=col: search_fn(col, query_embedding, top_k, timeout=remaining)
+
+    if tasks:
+        found = get_search_executor().fan_out(tasks, search_timeout(timeout))
+        for col, hits in found.items():
+            if isinstance(hits, dict):
+                errors[col] = hits["error"]
+            else:
+                results[col] = hits
+                cache.put_results(col, emb_hash, top_k, hits, kind=cache_kinds[col])
+    return results, errors
+
+
+def merged_search(client, query_embedding, collections, top_k, kind="metadata", timeout=None, partitions=None):
+    """
+    跨集合合并检索，返回全局 top-k
+    先从每个集合取 ceil(top_k / 集合数) 条并归并，只有最差一条仍进入全局 top-k 的集合才再取满 top_k 条
+    :return: (合并后的命中列表, {集合名: 错误信息})
+    """
+    deadline = time.monotonic() + search_timeout(timeout)
+    # 度量由客户端给出：本地后端始终为 L2，不能按 Milvus 索引策略中记录的度量换算
+    metric_types = {col: client.metric_type(col) for col in collections}
+
+    fetched = min(top_k, math.ceil(top_k / max(1, len(collections))))
+    results, errors = search_collections(
+        client, query_embedding, collections, fetched, kind, timeout=timeout, partitions=partitions
+    )
+    merged = merge_top_k(results, top_k, metric_types)
+    refetch = collections_to_refetch(results, fetched, merged, top_k, metric_types)
+    remaining = deadline - time.monotonic()
+    if refetch and remaining > 0:
+        # 再次获取失败的集合保留首轮结果参与归并，错误一并返回
+        more, more_errors = search_collections(
+            client, query_embedding, refetch, top_k, kind, timeout=remaining, partitions=partitions
+        )
+        results.update(more)
+        errors.update(more_errors)
+        merged = merge_top_k(results, top_k, metric_types)
+    return merged, errors
+
+
 # ===== 请求模型定义 =====
 
 class VectorSearchRequest(BaseModel):
     vquery: str
     collections: List[str]  # 自定义要检索哪些集合
     top_k: int = 5
+    timeout: Optional[float] = None  # 请求截止时间（秒），默认 Settings.SEARCH_TIMEOUT_SECONDS
+    merge: bool = False  # 为 True 时跨集合归并，只返回全局 top_k（每条附带来源集合与归一化分数）
+    databases: Optional[List[str]] = None  # 只检索这些来源数据库的分区（仅元数据集合）
+    types: Optional[List[str]] = None  # 只检索这些条目类型的分区：table / column / metric
+
+class BatchVectorSearchRequest(BaseModel):
+    vqueries: List[str]
+    collections: List[str]
+    top_k: int = 5
+    qa: bool = False  # 为 True 时按 QA 集合检索
+    timeout: Optional[float] = None
+    databases: Optional[List[str]] = None  # 同 VectorSearchRequest，仅元数据集合
+    types: Optional[List[str]] = None
 
 class CreateCollectionRequest(BaseModel):
     collection_name: str
@@ -44,6 +183,32 @@ class ClearCollectionRequest(BaseModel):
 class InsertDataRequest(BaseModel):
     collection_name: str
     data: List[Dict]
+    database: Optional[str] = None  # 条目未标明来源数据库时使用，决定写入的分区
+
+class SyncDataRequest(BaseModel):
+    collection_name: str
+    data: List[Dict]  # 条目格式同 insert-data，不含向量
+    database: Optional[str] = None
+    delete_missing: bool = True  # 删除本次未出现的已存储条目（分区集合只限本次涉及的数据库）
+
+class SyncQARequest(BaseModel):
+    collection_name: str
+    data: List[Dict]  # [{"question": ..., "answer": ...}]
+    delete_missing: bool = True
+
+class IndexPolicyRequest(BaseModel):
+    collection_name: str
+    target: Optional[str] = None  # latency / balanced / recall
+    index_params: Optional[Dict] = None  # 固定索引参数，如 {"index_type": "HNSW", "params": {...}, "metric_type": "L2"}
+    rebuild: bool = True  # 是否在后台按新策略重建索引
+
+class PinCollectionRequest(BaseModel):
+    collection_name: str
+    pinned: bool = True
+
+class InsertStoreRequest(BaseModel):
+    collection_name: str
+    vector_file: str  # write_embedding_store 生成的 .npy 文件，元数据文件需在同目录
 
 
 
@@ -57,7 +222,7 @@ def generate_embedding(request: EmbeddingRequest):
     根据提供的文本生成嵌入向量。
     """
     try:
-        embedding = model.encode([request.text]).tolist()[0]
+        embedding = encode_query(get_model(), request.text)
         return {"embedding": embedding}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating embedding: {str(e)}")
@@ -74,26 +239,30 @@ def vector_search(request: VectorSearchRequest, client: Any = Depends(get_milvus
 
     try:
         # 使用模型生成查询嵌入
-        query_embedding = model.encode([query]).tolist()[0]
-
-        from concurrent.futures import ThreadPoolExecutor
-        results = {}
-        with ThreadPoolExecutor(max_workers=len(request.collections)) as executor:
-            future_to_col = {
-                executor.submit(client.search, col, query_embedding, request.top_k): col
-                for col in request.collections
-            }
-            for future in concurrent.futures.as_completed(future_to_col):
-                col = future_to_col[future]
-                try:
-                    results[col] = future.result()
-                except Exception as exc:
-                    results[col] = {"error": str(exc)}
+        query_embedding = get_query_embedding(query)
+        filtered = bool(request.databases or request.types)
+        partitions, partition_errors = resolve_partitions(
+            client, request.collections, request.databases, request.types, request.timeout
+        )
+        collections = [col for col in request.collections if col in partitions]
 
-        return {
-            "query": query,
-            "results": results
-        }
+        if request.merge:
+            merged, errors = merged_search(
+                client, query_embedding, collections, request.top_k, timeout=request.timeout, partitions=partitions
+            )
+            errors.update(partition_errors)
+            response = {"query": query, "results": merged, "errors": errors}
+        else:
+            results, errors = search_collections(
+                client, query_embedding, collections, request.top_k, timeout=request.timeout, partitions=partitions
+            )
+            errors.update(partition_errors)
+            response = {"query": query, "results": results, "errors": errors}
+
+        if filtered:
+            # None 表示该集合未分区，检索了全部数据
+            response["partitions"] = partitions
+        return response
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during search: {str(e)}")
@@ -101,30 +270,34 @@ def vector_search(request: VectorSearchRequest, client: Any = Depends(get_milvus
 @router.post("/search-qa")
 def search_qa_vector(
     request: VectorSearchRequest,
-    client: MilvusClient = Depends(get_milvus_client)
+    client: Any = Depends(get_milvus_client)
 ):
     """QA专用搜索接口"""
     query = request.vquery
     if not query:
         raise HTTPException(status_code=400, detail="Query string is required.")
+    if request.databases or request.types:
+        raise HTTPException(status_code=400, detail="QA collections are not partitioned; databases/types are not supported.")
 
     try:
         # 生成查询嵌入
-        query_embedding = model.encode([query]).tolist()[0]
+        query_embedding = get_query_embedding(query)
         
-        results = {}
-        for collection in request.collections:
-            # QA专用搜索
-            matched_results = client.search_qa(
-                collection_name=collection,
-                query_embedding=query_embedding,
-                top_k=request.top_k
+        # QA专用搜索，各集合并发执行
+        if request.merge:
+            merged, errors = merged_search(
+                client, query_embedding, request.collections, request.top_k, kind="qa", timeout=request.timeout
             )
-            results[collection] = matched_results
+            return {"query": query, "results": merged, "errors": errors}
+
+        results, errors = search_collections(
+            client, query_embedding, request.collections, request.top_k, kind="qa", timeout=request.timeout
+        )
 
         return {
             "query": query,
-            "results": results
+            "results": results,
+            "errors": errors
         }
     except Exception as e:
         raise HTTPException(
@@ -133,8 +306,82 @@ def search_qa_vector(
         )
 
 
+@router.post("/search-batch")
+def vector_search_batch(request: BatchVectorSearchRequest, client: Any = Depends(get_milvus_client)):
+    """
+    多查询批量检索：所有查询一次编码，每个集合一次多向量 search 调用
+    返回结果按查询分组
+    """
+    queries = request.vqueries
+    if not queries or any(not q for q in queries):
+        raise HTTPException(status_code=400, detail="Query strings are required.")
+    filtered = bool(request.databases or request.types)
+    if request.qa and filtered:
+        raise HTTPException(status_code=400, detail="QA collections are not partitioned; databases/types are not supported.")
+
+    try:
+        embeddings = get_query_embeddings(queries)
+        cache = get_search_cache()
+        hashes = [embedding_hash(embedding) for embedding in embeddings]
+        partitions, partition_errors = resolve_partitions(
+            client, request.collections, request.databases, request.types, request.timeout
+        )
+        collections = [col for col in request.collections if col in partitions]
+
+        grouped = [{} for _ in queries]
+        # 失败或超时按集合记录，对所有查询相同
+        errors = dict(partition_errors)
+        # 每个集合只检索结果缓存中没有的查询
+        pending = {}
+        kinds = {}
+        for col in collections:
+            names = partitions[col]
+            # 分区过滤后的结果单独缓存
+            kinds[col] = "qa" if request.qa else ("metadata" if names is None else f"metadata:{','.join(names)}")
+            for i, emb_hash in enumerate(hashes):
+                cached = cache.get_results(col, emb_hash, request.top_k, kind=kinds[col])
+                if cached is not None:
+                    grouped[i][col] = cached
+                else:
+                    pending.setdefault(col, []).append(i)
+
+        def search(col, idx, remaining):
+            vectors = [embeddings[i] for i in idx]
+            if request.qa:
+                return client.search_qa_batch(col, vectors, request.top_k, timeout=remaining)
+            return client.search_batch(col, vectors, request.top_k, timeout=remaining, partition_names=partitions[col])
+
+        tasks = {
+            col: lambda remaining, col=col, idx=idx: search(col, idx, remaining)
+            for col, idx in pending.items()
+        }
+        found = get_search_executor().fan_out(tasks, search_timeout(request.timeout))
+        for col, hits_per_query in found.items():
+            if isinstance(hits_per_query, dict):
+                errors[col] = hits_per_query["error"]
+                continue
+            for n, i in enumerate(pending[col]):
+                grouped[i][col] = hits_per_query[n]
+                cache.put_results(col, hashes[i], request.top_k, hits_per_query[n], kind=kinds[col])
+
+        response = {
+            "count": len(queries),
+            "results": [
+                {"query": query, "results": results}
+                for query, results in zip(queries, grouped)
+            ],
+            "errors": errors
+        }
+        if filtered:
+            # None 表示该集合未分区，检索了全部数据
+            response["partitions"] = partitions
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error during batch search: {str(e)}")
+
+
 @router.get("/collections")
-def list_collections(client: MilvusClient = Depends(get_milvus_client)):
+def list_collections(client: Any = Depends(get_milvus_client)):
     """列出所有可用的向量集合"""
     try:
         return {"collections": client.list_collections()}
@@ -143,7 +390,7 @@ def list_collections(client: MilvusClient = Depends(get_milvus_client)):
 
 
 @router.post("/create-collection")
-def create_collection(request: CreateCollectionRequest, client: MilvusClient = Depends(get_milvus_client)):
+def create_collection(request: CreateCollectionRequest, client: Any = Depends(get_milvus_client)):
     """创建一个新的向量集合"""
     try:
         client.create_collection(request.collection_name)
@@ -152,7 +399,7 @@ def create_collection(request: CreateCollectionRequest, client: MilvusClient = D
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/create-qa-collection")
-def create_collection(request: CreateCollectionRequest, client: MilvusClient = Depends(get_milvus_client)):
+def create_collection(request: CreateCollectionRequest, client: Any = Depends(get_milvus_client)):
     """创建一个新的向量集合"""
     try:
         client.create_qa_collection(request.collection_name)
@@ -163,7 +410,7 @@ def create_collection(request: CreateCollectionRequest, client: MilvusClient = D
 
 
 @router.post("/clear-collection")
-def clear_collection(request: ClearCollectionRequest, client: MilvusClient = Depends(get_milvus_client)):
+def clear_collection(request: ClearCollectionRequest, client: Any = Depends(get_milvus_client)):
     """清空指定集合的数据和索引"""
     if not request.confirm:
         raise HTTPException(status_code=400, detail="Operation not confirmed.")
@@ -175,35 +422,39 @@ def clear_collection(request: ClearCollectionRequest, client: MilvusClient = Dep
 
 
 @router.post("/insert-data")
-def insert_data(request: InsertDataRequest, client: MilvusClient = Depends(get_milvus_client)):
+def insert_data(request: InsertDataRequest, client: Any = Depends(get_milvus_client)):
     """向指定集合插入数据"""
     try:
-        # 处理数据并生成嵌入向量
-        processed_data = []
+        # 确保数据包含必要的内容字段
         for item in request.data:
-            # 确保数据包含必要的内容字段
             if "content" not in item:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Item missing 'content' field: {item}"
                 )
-            
-            # 生成嵌入向量
-            content = item["content"]
-            embedding = model.encode([content]).tolist()[0]
-            
-            # 创建新的数据项，包含嵌入向量
-            processed_item = {
-                **item,  # 保留原始字段
-                "embedding": embedding  # 添加嵌入向量
-            }
-            processed_data.append(processed_item)
+
+        request.data = with_default_database(request.data, request.database)
+
+        # 批量生成嵌入向量（未变化的内容直接命中缓存）
+        settings = get_settings()
+        embeddings = encode_texts(
+            get_model(),
+            [item["content"] for item in request.data],
+            batch_size=settings.EMBEDDING_BATCH_SIZE
+        )
+
+        # 创建新的数据项，包含嵌入向量
+        processed_data = [
+            {**item, "embedding": embedding}
+            for item, embedding in zip(request.data, embeddings)
+        ]
         
         # 插入处理后的数据
-        client.insert_and_create_index(request.collection_name, processed_data)
+        stats = client.insert_and_create_index(request.collection_name, processed_data)
         return {
-            "message": f"已插入 {len(processed_data)} 条数据到集合 {request.collection_name}",
-            "processed_count": len(processed_data)
+            "message": f"已插入 {stats['inserted']} 条数据到集合 {request.collection_name}",
+            "processed_count": stats["inserted"],
+            "ingest": stats
         }
     except HTTPException:
         raise  # 直接抛出已有的HTTP异常
@@ -213,95 +464,240 @@ def insert_data(request: InsertDataRequest, client: MilvusClient = Depends(get_m
             detail=f"Error processing or inserting data: {str(e)}"
         )
     
+def _embed_texts(texts: List[str]) -> List[List[float]]:
+    return encode_texts(get_model(), texts, batch_size=get_settings().EMBEDDING_BATCH_SIZE)
+
+
+@router.post("/sync-data")
+def sync_data(request: SyncDataRequest, client: Any = Depends(get_milvus_client)):
+    """
+    按 (database, type, name) 增量同步元数据，不清空集合
+    只为新增或内容变化的条目生成向量，返回 added/updated/unchanged/deleted 统计
+    """
+    data = with_default_database(request.data, request.database)
+    try:
+        stats = client.sync_items(
+            request.collection_name, data, kind="metadata", embed=_embed_texts, delete_missing=request.delete_missing
+        )
+        return {"collection": request.collection_name, "sync": stats}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error syncing data: {str(e)}")
+
+
+@router.post("/sync-qa")
+def sync_qa(request: SyncQARequest, client: Any = Depends(get_milvus_client)):
+    """按归一化问题增量同步QA数据，不清空集合"""
+    try:
+        stats = client.sync_items(
+            request.collection_name, request.data, kind="qa", embed=_embed_texts, delete_missing=request.delete_missing
+        )
+        return {"collection": request.collection_name, "sync": stats}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error syncing QA data: {str(e)}")
+
+
 @router.post("/insert-qa-csv")
 async def insert_qa_csv(
     collection_name: str = Query(..., description="集合名称"),
     csv_file: UploadFile = File(..., description="CSV文件"),
-    client: MilvusClient = Depends(get_milvus_client)
+    chunk_size: int = Query(2000, ge=1, description="每块处理的CSV行数"),
+    client: Any = Depends(get_milvus_client)
 ):
     """
     从CSV文件导入QA数据到指定集合
     CSV格式要求：
     - 必须有"问题"和"答案"两列
     - 文件编码应为UTF-8
+    上传内容分块写入临时文件后在后台流水线导入，立即返回 job_id，
+    通过 /insert-qa-csv/jobs/{job_id} 查询进度
     """
-    try:
-        # 读取CSV文件
-        contents = await csv_file.read()
-        df = pd.read_csv(StringIO(contents.decode('utf-8')))
-        
-        # 检查必要列是否存在
-        if "问题" not in df.columns or "答案" not in df.columns:
-            raise HTTPException(
-                status_code=400,
-                detail="CSV文件必须包含'问题'和'答案'两列"
-            )
+    from backend.services.qa_ingest import ingest_qa_csv, read_qa_csv_header
 
-        # 处理数据并生成嵌入向量
-        questions = []
-        answers = []
-        embeddings = []
-        
-        for _, row in df.iterrows():
-            question = str(row["问题"]).strip()
-            answer = str(row["答案"]).strip()
-            
-            if not question or not answer:
-                continue
-            
-            try:
-                embedding = model.encode([question]).tolist()[0]
-                if len(embedding) != 768:
-                    continue
-                
-                questions.append(question)
-                answers.append(answer)
-                embeddings.append(embedding)
-            except Exception as e:
-                continue
+    try:
+        exists = collection_name in client.list_collections()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"处理CSV文件失败: {str(e)}")
+    if not exists:
+        raise HTTPException(status_code=404, detail=f"集合 {collection_name} 不存在")
 
-        if not questions:
-            raise HTTPException(
-                status_code=400,
-                detail="没有有效的QA数据可插入"
-            )
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
+    try:
+        with tmp:
+            while True:
+                block = await csv_file.read(1 << 20)
+                if not block:
+                    break
+                tmp.write(block)
+        read_qa_csv_header(tmp.name)
+    except ValueError as e:
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnicodeDecodeError:
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail="文件编码应为UTF-8")
+    except Exception as e:
+        os.remove(tmp.name)
+        raise HTTPException(status_code=500, detail=f"处理CSV文件失败: {str(e)}")
 
-        # 准备插入数据
-        data_to_insert = [
-            {"question": q, "answer": a, "embedding": e}
-            for q, a, e in zip(questions, answers, embeddings)
-        ]
+    job_id = str(uuid.uuid4())
 
-        # 插入数据
-        client.insert_qa_and_create_index(collection_name, data_to_insert)
-        
+    def worker():
+        try:
+            return ingest_qa_csv(
+                client, collection_name, tmp.name, get_model(), chunk_size=chunk_size,
+                on_progress=lambda progress: task_manager.update_progress(job_id, **progress)
+            )
+        finally:
+            os.remove(tmp.name)
+
+    def remove_if_cancelled(future):
+        # 开始执行前被取消的任务不会运行 worker，临时文件在这里删除
+        if future.cancelled() and os.path.exists(tmp.name):
+            os.remove(tmp.name)
+
+    task_manager.update_progress(job_id, collection=collection_name)
+    future = task_manager.executor.submit(worker)
+    future.add_done_callback(remove_if_cancelled)
+    task_manager.add_task(job_id, future)
+    return {"job_id": job_id, "collection": collection_name, "status": "running"}
+
+
+@router.get("/insert-qa-csv/jobs/{job_id}")
+def get_qa_csv_job(job_id: str):
+    """查看QA CSV导入任务的状态与进度"""
+    future = task_manager.get_task(job_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    status = {"job_id": job_id, "progress": task_manager.get_progress(job_id)}
+    if not future.done():
+        return {**status, "status": "running"}
+    if future.cancelled():
+        return {**status, "status": "cancelled"}
+    error = future.exception()
+    if error is not None:
+        return {**status, "status": "failed", "error": str(error)}
+    return {**status, "status": "completed", "result": future.result()}
+
+
+@router.post("/insert-store")
+def insert_store(request: InsertStoreRequest, client: Any = Depends(get_milvus_client)):
+    """从 .npy 向量文件 + 元数据文件导入数据（内存映射读取，不重新编码）"""
+    try:
+        count = client.insert_from_store(request.collection_name, request.vector_file)
         return {
-            "message": f"成功插入 {len(questions)} 条QA数据到集合 {collection_name}",
-            "processed_count": len(questions),
-            "failed_count": len(df) - len(questions),
-            "collection": collection_name
+            "message": f"已插入 {count} 条数据到集合 {request.collection_name}",
+            "processed_count": count
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error inserting vector file: {str(e)}")
 
-    except HTTPException:
-        raise
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="CSV文件为空")
-    except pd.errors.ParserError:
-        raise HTTPException(status_code=400, detail="CSV文件解析失败")
-    except UnicodeDecodeError:
-        raise HTTPException(status_code=400, detail="文件编码应为UTF-8")
+
+@router.get("/index-policy/{collection_name}")
+def get_index_policy(collection_name: str, client: Any = Depends(get_milvus_client)):
+    """查看集合的索引策略与按当前行数推荐的索引参数"""
+    try:
+        return client.get_index_info(collection_name)
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"处理CSV文件失败: {str(e)}"
-        )
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/index-policy")
+def set_index_policy(request: IndexPolicyRequest, client: Any = Depends(get_milvus_client)):
+    """修改集合的索引策略，并在后台重建索引"""
+    if request.target is not None and request.target not in TARGETS:
+        raise HTTPException(status_code=400, detail=f"target 必须是 {', '.join(TARGETS)} 之一")
+    if request.index_params is not None and request.index_params.get("index_type") not in INDEX_TYPES:
+        raise HTTPException(status_code=400, detail=f"index_type 必须是 {', '.join(INDEX_TYPES)} 之一")
+    try:
+        policy = client.set_index_policy(request.collection_name, request.target, request.index_params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not request.rebuild:
+        return {"collection": request.collection_name, "policy": policy}
+
+    task_id = str(uuid.uuid4())
+    future = task_manager.executor.submit(client.create_index, request.collection_name)
+    task_manager.add_task(task_id, future)
+    return {"collection": request.collection_name, "policy": policy, "rebuild_task_id": task_id}
+
+
+@router.get("/index-policy/tasks/{task_id}")
+def get_index_rebuild_status(task_id: str):
+    """查看后台重建索引任务的状态"""
+    future = task_manager.get_task(task_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not future.done():
+        return {"task_id": task_id, "status": "running"}
+    if future.cancelled():
+        return {"task_id": task_id, "status": "cancelled"}
+    error = future.exception()
+    if error is not None:
+        return {"task_id": task_id, "status": "failed", "error": str(error)}
+    return {"task_id": task_id, "status": "completed"}
 
 
 @router.post("/create-index")
-def create_index(collection_name: str, client: MilvusClient = Depends(get_milvus_client)):
+def create_index(collection_name: str, client: Any = Depends(get_milvus_client)):
     """为指定集合创建索引"""
     try:
         client.create_index(collection_name)
         return {"message": f"集合 {collection_name} 索引创建完成"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/embedding-cache/stats")
+def embedding_cache_stats():
+    """查看嵌入缓存的命中率与容量"""
+    cache = get_embedding_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/search-cache/stats")
+def search_cache_stats():
+    """查看查询向量缓存与检索结果缓存的命中率"""
+    return get_search_cache().stats()
+
+
+@router.get("/embedding-dispatcher/stats")
+def embedding_dispatcher_stats():
+    """查看在线编码合并器的队列深度与批大小分布"""
+    return dispatcher_stats()
+
+
+@router.get("/search-executor/stats")
+def search_executor_stats():
+    """查看共享检索线程池的排队与超时情况"""
+    return get_search_executor().stats()
+
+
+@router.get("/loaded-collections")
+def loaded_collections(client: Any = Depends(get_milvus_client)):
+    """查看已加载的集合、内存预算以及加载/释放统计"""
+    try:
+        return client.loaded_collections_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/loaded-collections/pin")
+def pin_collection(request: PinCollectionRequest, client: Any = Depends(get_milvus_client)):
+    """固定热点集合使其常驻加载，或取消固定"""
+    try:
+        client.pin_collection(request.collection_name, request.pinned)
+        return {"collection": request.collection_name, "pinned": request.pinned}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/loaded-collections/release")
+def release_collection(request: CreateCollectionRequest, client: Any = Depends(get_milvus_client)):
+    """主动释放已加载的集合"""
+    try:
+        return {"collection": request.collection_name, "released": client.release_collection(request.collection_name)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
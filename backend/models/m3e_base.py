@@ -1,14 +1,41 @@
 # backend/models.py
 
-from sentence_transformers import SentenceTransformer
 import logging
+import threading
+from backend.services.model_registry import get_model_registry
+from backend.utils.config import get_settings
 
 logger = logging.getLogger(__name__)
 
-try:
-    logger.info("正在加载嵌入模型...")
-    model = SentenceTransformer('E:/model/m3e-base')
-    logger.info("嵌入模型加载成功。")
-except Exception as e:
-    logger.error(f"加载嵌入模型失败: {str(e)}")
-    raise
\ No newline at end of file
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """获取全局嵌入模型，首次调用时才加载（导入本模块不再触发模型加载）"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    logger.info("正在加载嵌入模型...")
+                    settings = get_settings()
+                    # 从共享注册表获取，与 EmbeddingGenerator / get_embedding_model 复用同一份模型
+                    _model = get_model_registry().acquire(settings.EMBEDDING_MODEL_PATH, settings.DEVICE or "cpu")
+                    logger.info("嵌入模型加载成功。")
+                except Exception as e:
+                    logger.error(f"加载嵌入模型失败: {str(e)}")
+                    raise
+    return _model
+
+
+def is_model_loaded() -> bool:
+    """模型是否已加载，不触发加载"""
+    return _model is not None
+
+
+def __getattr__(name):
+    # 兼容 `from backend.models.m3e_base import model` 的旧写法
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
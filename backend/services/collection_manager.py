@@ -0,0 +1,280 @@
+# backend/services/collection_manager.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionUnavailableError(RuntimeError):
+    """集合正在维护（如重建索引），暂时无法检索"""
+
+
+class LoadedCollectionManager:
+    """
+    管理已加载到 Milvus 查询节点的集合
+    - 按数量和估算内存设置预算，超出时按 LRU 释放冷集合（固定的集合和正在使用的集合不释放）
+    - 同一集合的并发首次访问只触发一次 load()，其余请求等待同一结果
+    - 正在释放的集合被再次访问时，等释放完成后重新加载；
+      正在维护的集合由 acquire() 访问时立即抛出 CollectionUnavailableError，由 get() 访问时等维护完成
+    - 检索期间通过 acquire() 持有集合，引用计数归零前不会被 LRU 释放
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Any],
+        release: Callable[[str, Any], None],
+        estimate_bytes: Callable[[str, Any], int],
+        max_collections: int = 32,
+        max_bytes: int = 0,
+        pinned: Iterable[str] = ()
+    ):
+        """
+        :param load: 加载集合并返回句柄
+        :param release: 释放集合
+        :param estimate_bytes: 估算集合加载后占用的内存
+        :param max_collections: 最多同时加载的集合数，0 表示不限
+        :param max_bytes: 已加载集合估算内存的上限，0 表示不限
+        :param pinned: 不参与 LRU 释放的集合
+        """
+        self._load = load
+        self._release = release
+        self._estimate_bytes = estimate_bytes
+        self.max_collections = max_collections
+        self.max_bytes = max_bytes
+        self._pinned = set(pinned)
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, tuple]" = OrderedDict()  # 名称 -> (句柄, 估算字节数)
+        self._pending: Dict[str, tuple] = {}  # 名称 -> ("load" / "release" / "maintenance", Future)
+        self._in_use: Dict[str, int] = {}  # 名称 -> 正在使用该集合的 acquire() 数
+        self.hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.load_seconds = 0.0
+        self.shared_loads = 0
+        self.releases = 0
+
+    def get(self, name: str):
+        """返回已加载的集合句柄，未加载时加载（必要时先释放冷集合腾出预算）"""
+        return self._get(name, hold=False, wait_maintenance=True)
+
+    @contextmanager
+    def acquire(self, name: str, wait_maintenance: bool = False):
+        """
+        取得集合句柄并在 with 块内持有，期间集合不会被 LRU 或维护释放
+        退出时若已超出预算，立即释放多余的冷集合
+        :param wait_maintenance: 集合正在维护时是否等待维护完成；默认不等待，
+                                 直接抛出 CollectionUnavailableError，让检索立即失败而不是阻塞到重建结束
+        """
+        handle = self._get(name, hold=True, wait_maintenance=wait_maintenance)
+        try:
+            yield handle
+        finally:
+            with self._lock:
+                count = self._in_use.get(name, 0) - 1
+                if count > 0:
+                    self._in_use[name] = count
+                    victims = []
+                else:
+                    self._in_use.pop(name, None)
+                    victims = self._select_victims()
+            self._release_all(victims)
+
+    def _get(self, name: str, hold: bool, wait_maintenance: bool):
+        while True:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is not None:
+                    self._loaded.move_to_end(name)
+                    self.hits += 1
+                    if hold:
+                        self._in_use[name] = self._in_use.get(name, 0) + 1
+                    return entry[0]
+                pending = self._pending.get(name)
+                if pending is None:
+                    future = Future()
+                    self._pending[name] = ("load", future)
+                    break
+                if pending[0] == "maintenance" and not wait_maintenance:
+                    raise CollectionUnavailableError(f"集合 {name} 正在维护（重建索引），暂时无法检索")
+                if pending[0] == "load":
+                    self.shared_loads += 1
+            action, future = pending
+            result = future.result()
+            if action == "load" and not hold:
+                return result
+            # 释放/维护完成后重新加载；持有句柄时回到锁内登记引用
+
+        start = time.perf_counter()
+        try:
+            handle = self._load(name)
+            size = self._estimate_bytes(name, handle)
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(name, None)
+                self.load_failures += 1
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._pending.pop(name, None)
+            self._loaded[name] = (handle, size)
+            if hold:
+                self._in_use[name] = self._in_use.get(name, 0) + 1
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+            victims = self._select_victims(keep=name)
+        future.set_result(handle)
+        self._release_all(victims)
+        return handle
+
+    def _select_victims(self, keep: Optional[str] = None):
+        """在锁内挑出需要释放的 LRU 集合并标记为释放中"""
+        victims = []
+        total = sum(size for _, size in self._loaded.values())
+        candidates = [
+            name for name in self._loaded
+            if name != keep and name not in self._pinned and name not in self._in_use
+        ]
+        for name in candidates:
+            over_count = self.max_collections and len(self._loaded) > self.max_collections
+            over_bytes = self.max_bytes and total > self.max_bytes
+            if not over_count and not over_bytes:
+                break
+            handle, size = self._loaded.pop(name)
+            total -= size
+            future = Future()
+            self._pending[name] = ("release", future)
+            victims.append((name, handle, future))
+        # 正在使用的集合只是暂时超出预算，归还后即释放；只有固定集合超出预算时告警
+        idle = sum(1 for name in self._loaded if name not in self._in_use)
+        if self.max_collections and idle > self.max_collections:
+            logger.warning(f"已加载集合数 {len(self._loaded)} 超出预算，其余集合均为固定集合")
+        return victims
+
+    def _release_all(self, victims):
+        for name, handle, future in victims:
+            try:
+                self._release(name, handle)
+                logger.info(f"集合 {name} 已按 LRU 释放")
+            except Exception as e:
+                logger.error(f"释放集合 {name} 失败: {e}")
+            with self._lock:
+                self._pending.pop(name, None)
+                self.releases += 1
+            future.set_result(None)
+
+    def release(self, name: str) -> bool:
+        """主动释放集合，固定的集合也会被释放；正在使用的集合不释放，返回 False"""
+        with self._lock:
+            if name in self._in_use:
+                logger.warning(f"集合 {name} 正在被检索使用，暂不释放")
+                return False
+            entry = self._loaded.pop(name, None)
+            if entry is None:
+                return False
+            future = Future()
+            self._pending[name] = ("release", future)
+        self._release_all([(name, entry[0], future)])
+        return True
+
+    @contextmanager
+    def maintenance(self, name: str, handle=None, drain_timeout: float = 60.0):
+        """
+        独占集合进行维护（如重建索引）：
+        等待进行中的检索结束后经 release 回调释放集合；
+        维护期间 acquire() 立即失败（CollectionUnavailableError），get() 等待维护完成后重新加载
+        :param handle: 集合未由本管理器加载时用于释放的句柄（其他进程可能已加载该集合）
+        :param drain_timeout: 等待进行中的检索结束的最长时间（秒）
+        :return: 进入维护前集合是否已由本管理器加载
+        """
+        deadline = time.monotonic() + drain_timeout
+        future = Future()
+        while True:
+            with self._lock:
+                pending = self._pending.get(name)
+                if pending is None:
+                    self._pending[name] = ("maintenance", future)
+                    break
+            try:
+                pending[1].result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"集合 {name} 的加载/释放未在 {drain_timeout}s 内完成")
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._in_use.get(name):
+                        entry = self._loaded.pop(name, None)
+                        break
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"集合 {name} 仍有检索在进行，{drain_timeout}s 内无法进入维护")
+                time.sleep(0.05)
+            target = entry[0] if entry is not None else handle
+            if target is not None:
+                self._release(name, target)
+            if entry is not None:
+                with self._lock:
+                    self.releases += 1
+            yield entry is not None
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+            future.set_result(None)
+
+    def discard(self, name: str):
+        """集合已被删除时调用：只移除记录，不调用 release"""
+        with self._lock:
+            self._loaded.pop(name, None)
+            self._pinned.discard(name)
+
+    def peek(self, name: str):
+        """返回已加载的句柄，未加载时返回 None 且不触发加载"""
+        with self._lock:
+            entry = self._loaded.get(name)
+            return entry[0] if entry else None
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._loaded
+
+    def pin(self, name: str, pinned: bool = True):
+        """固定或取消固定集合；取消固定后若超出预算立即释放"""
+        with self._lock:
+            if pinned:
+                self._pinned.add(name)
+                victims = []
+            else:
+                self._pinned.discard(name)
+                victims = self._select_victims()
+        self._release_all(victims)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            loaded = [
+                {"name": name, "estimated_bytes": size, "pinned": name in self._pinned}
+                for name, (_, size) in reversed(self._loaded.items())
+            ]
+            maintenance = sorted(name for name, (action, _) in self._pending.items() if action == "maintenance")
+            return {
+                "loaded": loaded,
+                "maintenance": maintenance,
+                "loaded_count": len(loaded),
+                "estimated_bytes": sum(item["estimated_bytes"] for item in loaded),
+                "max_collections": self.max_collections,
+                "max_bytes": self.max_bytes,
+                "pinned": sorted(self._pinned),
+                "in_use": dict(self._in_use),
+                "hits": self.hits,
+                "loads": self.loads,
+                "shared_loads": self.shared_loads,
+                "load_failures": self.load_failures,
+                "avg_load_seconds": round(self.load_seconds / self.loads, 3) if self.loads else 0.0,
+                "releases": self.releases
+            }
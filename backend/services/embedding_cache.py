@@ -0,0 +1,233 @@
+# backend/services/embedding_cache.py
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：NFKC、去首尾空白、合并连续空白"""
+    text = unicodedata.normalize("NFKC", str(text))
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def model_identity(model) -> Optional[str]:
+    """
+    生成模型标识，作为缓存键的一部分
+    优先使用模型上的 cache_identity 属性，否则取 tokenizer 路径和向量维度
+    无法确定模型路径时返回 None，此时不使用缓存（类名 + 维度不足以区分不同模型）
+    """
+    identity = getattr(model, "cache_identity", None)
+    if identity:
+        return identity
+    tokenizer = getattr(model, "tokenizer", None)
+    name = getattr(tokenizer, "name_or_path", None)
+    if not name:
+        return None
+    dim_fn = getattr(model, "get_sentence_embedding_dimension", None)
+    dim = dim_fn() if callable(dim_fn) else ""
+    return f"{name}:{dim}"
+
+
+class EmbeddingCache:
+    """
+    基于 SQLite 的持久化嵌入缓存
+    键为 (模型标识, 归一化文本的 sha256)，超过 max_entries 时按最近访问时间淘汰
+    - 命中时只在内存中记录访问时间，累计 touch_batch 条或超过 touch_interval 秒后批量写回
+    - SQLite 出错（如多进程写入时 database is locked）时读按未命中处理、写直接跳过，不影响编码
+    """
+
+    def __init__(self, path: str, max_entries: int = 500000, touch_batch: int = 1000,
+                 touch_interval: float = 60.0, busy_timeout: float = 5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._touched: Dict[tuple, float] = {}  # (模型标识, 文本哈希) -> 待写回的访问时间
+        self._last_touch_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def get_many(self, model_id: str, texts: List[str]) -> Dict[int, List[float]]:
+        """
+        批量查询缓存
+        :return: {输入下标: 向量}，只包含命中的条目
+        """
+        if not texts:
+            return {}
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            try:
+                unique = list(set(hashes))
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model_id, *chunk]
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        vector = array("f")
+                        vector.frombytes(blob)
+                        found[text_hash] = vector.tolist()
+
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning(f"Embedding cache read failed, treating as miss: {e}")
+                found = {}
+
+            if found:
+                now = time.time()
+                for h in found:
+                    self._touched[(model_id, h)] = now
+                try:
+                    self._maybe_flush_touches()
+                except sqlite3.Error as e:
+                    # 访问时间只影响淘汰顺序，写回失败不影响本次命中
+                    self.errors += 1
+                    logger.warning(f"Embedding cache access-time update skipped: {e}")
+
+            results = {i: found[h] for i, h in enumerate(hashes) if h in found}
+            self.hits += len(results)
+            self.misses += len(texts) - len(results)
+        return results
+
+    def put_many(self, model_id: str, texts: List[str], vectors: List[List[float]]):
+        """批量写入缓存，并在超出容量时淘汰最久未访问的条目"""
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (model_id, self.text_hash(text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._size += self._conn.total_changes - before
+                if self._size > self.max_entries:
+                    # 淘汰前写回访问时间，避免误删近期命中的条目
+                    self._flush_touches()
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning(f"Embedding cache write skipped: {e}")
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error:
+                    pass
+
+    def _maybe_flush_touches(self):
+        if (len(self._touched) >= self.touch_batch
+                or time.monotonic() - self._last_touch_flush >= self.touch_interval):
+            self._flush_touches()
+            self._conn.commit()
+
+    def _flush_touches(self):
+        """批量写回命中条目的访问时间（调用方持有锁并负责 commit）"""
+        self._last_touch_flush = time.monotonic()
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        self._conn.executemany(
+            "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+            [(ts, model_id, h) for (model_id, h), ts in touched.items()]
+        )
+
+    def _evict(self):
+        # 多淘汰 10%，避免每次写入都触发淘汰
+        excess = self._size - int(self.max_entries * 0.9)
+        self._conn.execute(
+            """
+            DELETE FROM embeddings WHERE rowid IN (
+                SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?
+            )
+            """,
+            (excess,)
+        )
+        self._size -= excess
+        self.evictions += excess
+        logger.info(f"Embedding cache evicted {excess} entries")
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+# 全局共享缓存实例
+_embedding_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """获取全局嵌入缓存，未启用时返回 None"""
+    global _embedding_cache
+    settings = get_settings()
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+            )
+            logger.info(f"Embedding cache opened at {settings.EMBEDDING_CACHE_PATH}")
+    return _embedding_cache
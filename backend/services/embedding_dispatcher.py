@@ -0,0 +1,182 @@
+# backend/services/embedding_dispatcher.py
+
+import logging
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from typing import Dict, List, Optional
+
+from backend.services.embedding_cache import model_identity
+from backend.services.embedding_service import encode_in_batches
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingDispatcher:
+    """
+    嵌入请求合并器
+    并发的单条文本编码请求在 max_wait_ms 窗口内（或达到 max_batch_size 时）
+    合并为一次批量编码，再把结果分发回各调用方
+    只弱引用模型：模型被卸载回收后，后台线程把排队中的请求置为失败并退出
+    """
+
+    def __init__(self, model, max_batch_size: int = 64, max_wait_ms: float = 5, timeout: Optional[float] = None):
+        self._model_ref = weakref.ref(model)
+        self.model_name = model_identity(model) or type(model).__name__
+        self.timeout = timeout
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.max_observed_batch = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self._closed = False
+        weakref.finalize(model, self._queue.put, None)
+        self._worker = threading.Thread(target=self._run, name="embedding-dispatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Embedding model has been unloaded"))
+            return future
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        """
+        编码单条文本，阻塞直到所在批次完成
+        :param timeout: 等待超时（秒），为 None 时使用创建合并器时的默认超时；超时抛出 TimeoutError
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(text)
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            # 尚未开始编码的请求直接取消，不再占用后续批次
+            future.cancel()
+            raise TimeoutError(f"Embedding request timed out after {timeout}s")
+
+    def _collect_batch(self) -> List[tuple]:
+        """收集一个批次；收到模型已回收的信号（None）时提前结束"""
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # 信号放回队列，处理完当前批次后由下一轮退出
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _drain(self):
+        """模型已回收：拒绝后续请求，并把队列中剩余的请求置为失败"""
+        self._closed = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Embedding model has been unloaded"))
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            model = self._model_ref()
+            if model is None:
+                for _, future in batch:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(RuntimeError("Embedding model has been unloaded"))
+                self._drain()
+                logger.info(f"Embedding dispatcher for {self.model_name} stopped: model unloaded")
+                return
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                del model
+                continue
+            self._record(len(batch))
+            try:
+                vectors = encode_in_batches(model, [text for text, _ in batch], len(batch))
+            except Exception as e:
+                logger.error(f"Dispatcher batch failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (text, future), vector in zip(batch, vectors):
+                if vector is None:
+                    future.set_exception(RuntimeError(f"Failed to encode text: {text[:50]}"))
+                else:
+                    future.set_result(vector)
+            # 不在等待下一批时持有模型，否则模型永远无法被回收
+            del model
+
+    def _record(self, size: int):
+        with self._stats_lock:
+            self.requests += size
+            self.batches += 1
+            self.max_observed_batch = max(self.max_observed_batch, size)
+            self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_observed_batch,
+                "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+                "config": {
+                    "max_batch_size": self.max_batch_size,
+                    "max_wait_ms": self.max_wait * 1000
+                }
+            }
+
+
+# 每个模型共享一个合并器；以模型对象弱引用为键，模型被注册表卸载后条目随之移除
+_dispatchers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_dispatcher_lock = threading.Lock()
+
+
+def get_embedding_dispatcher(model) -> EmbeddingDispatcher:
+    with _dispatcher_lock:
+        dispatcher = _dispatchers.get(model)
+        if dispatcher is None:
+            settings = get_settings()
+            dispatcher = EmbeddingDispatcher(
+                model,
+                max_batch_size=settings.EMBEDDING_DISPATCH_MAX_BATCH,
+                max_wait_ms=settings.EMBEDDING_DISPATCH_WAIT_MS,
+                timeout=settings.EMBEDDING_DISPATCH_TIMEOUT
+            )
+            _dispatchers[model] = dispatcher
+    return dispatcher
+
+
+def encode_query(model, text: str) -> List[float]:
+    """在线单条编码入口：启用合并时经过合并器，否则直接编码"""
+    if get_settings().EMBEDDING_DISPATCH_ENABLED:
+        return get_embedding_dispatcher(model).encode(text)
+    return encode_in_batches(model, [text], strict=True)[0]
+
+
+def dispatcher_stats() -> Dict:
+    with _dispatcher_lock:
+        dispatchers = list(_dispatchers.values())
+    return {d.model_name: d.stats() for d in dispatchers}
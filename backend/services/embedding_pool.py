@@ -0,0 +1,277 @@
+# backend/services/embedding_pool.py
+
+import atexit
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(index, model_path, device, num_threads, shm_name, max_rows, dim, requests, responses):
+    """
+    工作进程入口：固定 torch 线程数并加载模型
+    编码结果直接写入共享内存，只通过队列回传行数
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(num_threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # 与 torch 后端（load_embedding_model）的构造参数保持一致，向量与缓存键才能通用
+        model = SentenceTransformer(model_path, device=device, tokenizer_kwargs={"padding_side": "left"})
+        model_dim = model.get_sentence_embedding_dimension()
+        if model_dim != dim:
+            raise ValueError(f"Model dimension {model_dim} != configured dimension {dim}")
+        out = np.ndarray((max_rows, dim), dtype=np.float32, buffer=shm.buf)
+        responses.put((index, None, "ready"))
+    except Exception as e:
+        responses.put((index, None, f"error: {e}"))
+        shm.close()
+        return
+
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        job_id, texts, batch_size = job
+        try:
+            vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            out[:len(texts)] = vectors
+            responses.put((index, job_id, len(texts)))
+        except Exception as e:
+            responses.put((index, job_id, f"error: {e}"))
+    shm.close()
+
+
+class _Worker:
+    def __init__(self, index, process, requests, shm, out):
+        self.index = index
+        self.process = process
+        self.requests = requests
+        self.shm = shm
+        self.out = out
+        self.job_id: Optional[int] = None  # 正在执行的任务
+        self.restarts = 0
+        self.generation = 0  # 每次重启加一，空闲队列中旧进程留下的条目据此丢弃
+        self.ready = True
+        self.failed = False  # 重启次数用尽或模型加载失败，不再分配任务
+
+
+class ProcessPoolEmbeddingBackend:
+    """
+    多进程嵌入后端
+    启动 N 个工作进程，每个进程持有一份模型并固定 torch 线程数，
+    大批量文本按 chunk_size 切分后分发到空闲进程，向量经共享内存回传
+    工作进程意外退出时，其正在执行的任务立即失败并重启该进程（最多 max_restarts 次）
+    与 SentenceTransformer.encode 接口兼容
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        device: str = "cpu",
+        num_workers: int = 0,
+        threads_per_worker: int = 4,
+        chunk_size: int = 256,
+        dim: int = 768,
+        start_timeout: float = 600,
+        job_timeout: float = 300,
+        max_restarts: int = 3
+    ):
+        """
+        :param job_timeout: 等待空闲进程及单块编码结果的超时时间（秒）
+        :param max_restarts: 每个工作进程意外退出后的最大重启次数
+        """
+        self.model_path = model_path
+        self.dim = dim
+        self.chunk_size = max(1, chunk_size)
+        self.cache_identity = f"{model_path}:{dim}"
+        threads_per_worker = max(1, threads_per_worker)
+        if num_workers <= 0:
+            num_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+        self.tokenizer = None
+        try:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable in parent process, sorting by char length: {e}")
+
+        self.job_timeout = job_timeout
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        ctx = mp.get_context("spawn")
+        self._ctx = ctx
+        self._spawn_args = (model_path, device, threads_per_worker)
+        self._responses = ctx.Queue()
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[tuple]" = queue.Queue()  # (进程序号, generation)
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._closed = False
+
+        nbytes = self.chunk_size * dim * np.dtype(np.float32).itemsize
+        for index in range(num_workers):
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            out = np.ndarray((self.chunk_size, dim), dtype=np.float32, buffer=shm.buf)
+            requests, process = self._spawn(index, shm)
+            self._workers.append(_Worker(index, process, requests, shm, out))
+
+        try:
+            for _ in range(num_workers):
+                index, _, status = self._responses.get(timeout=start_timeout)
+                if status != "ready":
+                    raise RuntimeError(f"Embedding worker {index} failed to start: {status}")
+                self._idle.put((index, 0))
+        except Exception:
+            self.close()
+            raise
+
+        self._collector = threading.Thread(target=self._collect, name="embedding-pool-collector", daemon=True)
+        self._collector.start()
+        atexit.register(self.close)
+        logger.info(f"Embedding worker pool started: {num_workers} workers x {threads_per_worker} threads")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _spawn(self, index, shm):
+        """启动（或重启）一个工作进程，返回 (请求队列, 进程)"""
+        model_path, device, threads_per_worker = self._spawn_args
+        requests = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, model_path, device, threads_per_worker, shm.name,
+                  self.chunk_size, self.dim, requests, self._responses),
+            daemon=True
+        )
+        process.start()
+        return requests, process
+
+    def _fail_job(self, job_id, message):
+        with self._pending_lock:
+            future = self._pending.pop(job_id, None)
+        if future is not None and not future.done():
+            future.set_exception(RuntimeError(message))
+
+    def _check_workers(self):
+        """发现已退出的工作进程：让其正在执行的任务失败，并在次数允许时重启"""
+        for worker in self._workers:
+            if self._closed or worker.failed or worker.process.is_alive():
+                continue
+            exitcode = worker.process.exitcode
+            if worker.job_id is not None:
+                self._fail_job(worker.job_id, f"Embedding worker {worker.index} exited (code {exitcode})")
+                worker.job_id = None
+            if worker.restarts >= self.max_restarts:
+                worker.failed = True
+                logger.error(f"Embedding worker {worker.index} exited (code {exitcode}), restart limit reached")
+                continue
+            worker.restarts += 1
+            worker.generation += 1
+            worker.ready = False
+            self.restarts += 1
+            logger.warning(f"Embedding worker {worker.index} exited (code {exitcode}), restarting")
+            worker.requests, worker.process = self._spawn(worker.index, worker.shm)
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while not self._closed:
+            if time.monotonic() - last_check >= 1:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                index, job_id, result = self._responses.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            worker = self._workers[index]
+            if job_id is None:
+                # 重启后的进程就绪或加载失败
+                if result == "ready":
+                    worker.ready = True
+                    self._idle.put((index, worker.generation))
+                else:
+                    worker.failed = True
+                    logger.error(f"Embedding worker {index} failed to restart: {result}")
+                continue
+            worker.job_id = None
+            with self._pending_lock:
+                future = self._pending.pop(job_id, None)
+            if future is not None:
+                if isinstance(result, int):
+                    future.set_result(worker.out[:result].copy())
+                else:
+                    future.set_exception(RuntimeError(result))
+            self._idle.put((index, worker.generation))
+
+    def _submit(self, texts: List[str], batch_size: int) -> Future:
+        while True:
+            if all(worker.failed for worker in self._workers):
+                raise RuntimeError("All embedding workers have failed")
+            try:
+                index, generation = self._idle.get(timeout=self.job_timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No idle embedding worker within {self.job_timeout}s")
+            worker = self._workers[index]
+            # 空闲期间退出的进程由 _check_workers 重启，就绪后以新的 generation 重新放回空闲队列
+            if worker.generation == generation and worker.ready and worker.process.is_alive():
+                break
+        job_id = next(self._job_ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[job_id] = future
+        worker.job_id = job_id
+        worker.requests.put((job_id, texts, batch_size))
+        return future
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if self._closed:
+            raise RuntimeError("Embedding worker pool is closed")
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        futures = [
+            self._submit(texts[start:start + self.chunk_size], batch_size)
+            for start in range(0, len(texts), self.chunk_size)
+        ]
+        try:
+            vectors = np.concatenate([future.result(timeout=self.job_timeout) for future in futures])
+        except FutureTimeoutError:
+            raise TimeoutError(f"Embedding workers did not respond within {self.job_timeout}s")
+        return vectors[0] if single else vectors
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            try:
+                worker.requests.put(None)
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            except Exception as e:
+                logger.warning(f"Failed to stop embedding worker {worker.index}: {e}")
+            worker.out = None
+            worker.shm.close()
+            worker.shm.unlink()
+        with self._pending_lock:
+            for future in self._pending.values():
+                future.set_exception(RuntimeError("Embedding worker pool closed"))
+            self._pending.clear()
@@ -2,9 +2,11 @@ import json
 from pathlib import Path
 from typing import List, Dict, Optional
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
 import logging
 
+from backend.services.embedding_cache import get_embedding_cache, model_identity
+from backend.utils.config import get_settings
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -12,55 +14,214 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 32
+
+
+def load_embedding_model(model_path: str, device: str = "cpu", backend: Optional[str] = None):
+    """
+    按配置的后端加载嵌入模型，返回对象均提供与 SentenceTransformer 兼容的 encode 方法
+    :param model_path: 模型路径
+    :param device: 计算设备 (cuda/cpu)
+    :param backend: 后端名称 (None则使用 Settings.EMBEDDING_BACKEND)
+    """
+    settings = get_settings()
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "process_pool":
+        from backend.services.embedding_pool import ProcessPoolEmbeddingBackend
+        return ProcessPoolEmbeddingBackend(
+            model_path,
+            device=device,
+            num_workers=settings.EMBEDDING_POOL_WORKERS,
+            threads_per_worker=settings.EMBEDDING_POOL_THREADS_PER_WORKER,
+            chunk_size=settings.EMBEDDING_POOL_CHUNK_SIZE,
+            dim=settings.EMBEDDING_DIMENSION,
+            job_timeout=settings.EMBEDDING_POOL_JOB_TIMEOUT
+        )
+    if backend == "onnx":
+        from backend.services.onnx_embedding import OnnxEmbeddingBackend
+        return OnnxEmbeddingBackend(
+            model_path,
+            onnx_path=settings.EMBEDDING_ONNX_PATH or None,
+            quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+            num_threads=settings.EMBEDDING_ONNX_THREADS
+        )
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(
+            model_path,
+            device=device,
+            tokenizer_kwargs={"padding_side": "left"}
+        )
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def _token_lengths(model, texts: List[str]) -> List[int]:
+    """估算每条文本的 token 数，用于按长度排序减少 padding"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(texts, add_special_tokens=False, truncation=False)
+            return [len(ids) for ids in encoded["input_ids"]]
+        except Exception as e:
+            logger.debug(f"Tokenizer length estimation failed, falling back to char length: {e}")
+    return [len(text) for text in texts]
+
+
+def encode_in_batches(
+    model,
+    texts: List[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    show_progress: bool = False,
+    strict: bool = False,
+    use_cache: bool = True
+) -> List[Optional[List[float]]]:
+    """
+    按 token 长度排序后分批编码文本，已缓存的文本直接复用
+    :param model: 具有 encode 方法的嵌入模型
+    :param texts: 文本列表
+    :param batch_size: 批大小
+    :param show_progress: 是否显示进度条
+    :param strict: 为 True 时编码失败直接抛出异常，否则逐条重试并隔离失败项
+    :param use_cache: 是否经过持久化嵌入缓存
+    :return: 与输入顺序一致的向量列表，编码失败的位置为 None
+    """
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    if not texts:
+        return results
+
+    cache = get_embedding_cache() if use_cache else None
+    model_id = model_identity(model) if cache else None
+    if model_id is None:
+        # 无法可靠标识的模型不使用缓存
+        cache = None
+    if cache:
+        for i, vector in cache.get_many(model_id, texts).items():
+            results[i] = vector
+    pending = [i for i in range(len(texts)) if results[i] is None]
+    if not pending:
+        return results
+
+    batch_size = max(1, int(batch_size))
+    lengths = _token_lengths(model, [texts[i] for i in pending])
+    order = [pending[j] for j in sorted(range(len(pending)), key=lambda j: lengths[j])]
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    for batch in tqdm(batches, desc="Generating embeddings", disable=not show_progress):
+        batch_texts = [texts[i] for i in batch]
+        try:
+            vectors = model.encode(batch_texts, batch_size=len(batch_texts))
+        except Exception as e:
+            if strict:
+                raise
+            # 整批失败时逐条重试，隔离出真正有问题的条目
+            logger.warning(f"Batch encode failed ({len(batch)} items), retrying one by one: {e}")
+            for i in batch:
+                try:
+                    results[i] = model.encode([texts[i]])[0].tolist()
+                except Exception as item_error:
+                    logger.error(f"Error encoding item #{i}: {item_error}")
+        else:
+            for i, vector in zip(batch, vectors):
+                results[i] = vector.tolist()
+
+        if cache:
+            done = [i for i in batch if results[i] is not None]
+            cache.put_many(model_id, [texts[i] for i in done], [results[i] for i in done])
+
+    return results
+
+
+def encode_texts(model, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[float]]:
+    """编码文本列表（经过嵌入缓存），任何一条失败都会抛出异常"""
+    return encode_in_batches(model, texts, batch_size, strict=True)
+
+
+def embed_items(
+    model,
+    items: List[Dict],
+    content_field: str = "content",
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[Dict]:
+    """
+    为字典列表批量生成嵌入向量，写入每项的 embedding 字段
+    :param model: 具有 encode 方法的嵌入模型
+    :param items: 包含文本的字典列表
+    :param content_field: 包含文本内容的字段名
+    :param batch_size: 批大小
+    :return: 成功生成向量的条目（保持原始顺序）
+    """
+    valid_items = []
+    for item in items:
+        if not isinstance(item, dict) or content_field not in item:
+            name = item.get("name", "unnamed") if isinstance(item, dict) else "unnamed"
+            logger.warning(f"Item missing '{content_field}' field: {name}")
+            continue
+        valid_items.append(item)
+
+    texts = [str(item[content_field]) for item in valid_items]
+    vectors = encode_in_batches(model, texts, batch_size, show_progress=True)
+
+    results = []
+    for item, vector in zip(valid_items, vectors):
+        if vector is None:
+            logger.error(f"Error processing item {item.get('name', 'unnamed')}")
+            continue
+        item["embedding"] = vector
+        results.append(item)
+    return results
+
+
 class EmbeddingGenerator:
-    def __init__(self, model_path: str, device: str = "cpu"):
+    def __init__(self, model_path: str, device: str = "cpu", batch_size: int = DEFAULT_BATCH_SIZE):
         """
         初始化嵌入模型
         :param model_path: 模型路径
         :param device: 计算设备 (cuda/cpu)
+        :param batch_size: 默认批大小
         """
+        self.model_path = model_path
+        self.device = device
         self.model = self._load_model(model_path, device)
+        self.batch_size = batch_size
     
-    def _load_model(self, model_path: str, device: str) -> SentenceTransformer:
-        """加载嵌入模型"""
+    def _load_model(self, model_path: str, device: str):
+        """从共享模型注册表获取嵌入模型（同一模型在进程内只加载一次）"""
+        from backend.services.model_registry import get_model_registry
+
         logger.info(f"Loading model from {model_path}...")
         try:
-            model = SentenceTransformer(
-                model_path,
-                device=device,
-                tokenizer_kwargs={"padding_side": "left"}
-            )
+            model = get_model_registry().acquire(model_path, device)
             logger.info("Model loaded successfully")
             return model
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
+
+    def close(self):
+        """释放对共享模型的引用"""
+        if self.model is not None:
+            from backend.services.model_registry import get_model_registry
+            get_model_registry().release(self.model_path, self.device)
+            self.model = None
     
-    def generate_embeddings(self, items: List[Dict], content_field: str = "content") -> List[Dict]:
+    def generate_embeddings(
+        self,
+        items: List[Dict],
+        content_field: str = "content",
+        batch_size: Optional[int] = None
+    ) -> List[Dict]:
         """
         为JSON数据生成嵌入向量
         :param items: 包含文本的字典列表
         :param content_field: 包含文本内容的字段名
+        :param batch_size: 批大小 (None则使用实例默认值)
         :return: 添加了嵌入向量的字典列表
         """
         if not items:
             logger.warning("No items to process")
             return []
-        
-        results = []
-        for item in tqdm(items, desc="Generating embeddings"):
-            try:
-                if content_field not in item:
-                    logger.warning(f"Item missing '{content_field}' field: {item.get('name', 'unnamed')}")
-                    continue
-                
-                text = item[content_field]
-                embedding = self.model.encode(text).tolist()
-                item["embedding"] = embedding
-                results.append(item)
-            except Exception as e:
-                logger.error(f"Error processing item {item.get('name', 'unnamed')}: {e}")
-        
+
+        results = embed_items(self.model, items, content_field, batch_size or self.batch_size)
         logger.info(f"Generated embeddings for {len(results)} items")
         return results
     
@@ -69,7 +230,11 @@ class EmbeddingGenerator:
         input_path: str,
         output_path: Optional[str] = None,
         content_field: str = "content",
-        overwrite: bool = False
+        overwrite: bool = False,
+        stream: bool = False,
+        resume: bool = False,
+        output_format: str = "json",
+        vector_dtype: str = "float32"
     ) -> bool:
         """
         处理输入文件并保存带嵌入向量的结果
@@ -77,6 +242,10 @@ class EmbeddingGenerator:
         :param output_path: 输出JSON文件路径 (None则自动生成)
         :param content_field: 包含文本内容的字段名
         :param overwrite: 是否覆盖已存在的输出文件
+        :param stream: 是否使用流式模式（增量读取 JSON 数组/NDJSON，边编码边写出 NDJSON）
+        :param resume: 流式模式下是否从上次中断处继续
+        :param output_format: json / npy（向量写入连续的 .npy 文件，元数据写入 .meta.ndjson）
+        :param vector_dtype: npy 格式下的向量类型 float32 / float16
         :return: 是否成功
         """
         input_path = Path(input_path)
@@ -86,12 +255,48 @@ class EmbeddingGenerator:
         
         # 设置默认输出路径
         if output_path is None:
-            output_path = input_path.parent / f"{input_path.stem}_with_embeddings.json"
+            suffix = "npy" if output_format == "npy" else ("ndjson" if stream else "json")
+            output_path = input_path.parent / f"{input_path.stem}_with_embeddings.{suffix}"
         output_path = Path(output_path)
         
+        # resume 只对流式 NDJSON 输出有效，且输出文件必须留有未完成的进度记录
+        resume = resume and stream and output_format != "npy"
+        from backend.services.embedding_stream import can_resume
         if output_path.exists() and not overwrite:
-            logger.error(f"Output file already exists: {output_path}")
-            return False
+            if not resume:
+                logger.error(f"Output file already exists: {output_path}")
+                return False
+            if not can_resume(output_path):
+                logger.error(f"Output file already exists with no progress record to resume from: {output_path}")
+                return False
+        # overwrite=True 且没有可续跑的进度时从头写
+        resume = resume and can_resume(output_path)
+
+        if output_format == "npy":
+            from backend.services.embedding_store import write_embedding_store
+            from backend.services.embedding_stream import iter_json_items
+            try:
+                stats = write_embedding_store(
+                    self.model, iter_json_items(input_path), output_path,
+                    content_field, self.batch_size, dtype=vector_dtype
+                )
+                logger.info(f"Vector file written successfully: {stats}")
+                return True
+            except Exception as e:
+                logger.error(f"Error writing vector file: {e}")
+                return False
+
+        if stream:
+            from backend.services.embedding_stream import stream_embed_file
+            try:
+                stats = stream_embed_file(
+                    self.model, input_path, output_path, content_field, self.batch_size, resume=resume
+                )
+                logger.info(f"Streaming completed successfully: {stats}")
+                return True
+            except Exception as e:
+                logger.error(f"Error streaming file: {e}")
+                return False
         
         try:
             # 读取输入文件
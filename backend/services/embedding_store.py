@@ -0,0 +1,151 @@
+# backend/services/embedding_store.py
+
+import json
+import logging
+import struct
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.services.embedding_service import DEFAULT_BATCH_SIZE, embed_items
+
+logger = logging.getLogger(__name__)
+
+# 预留固定长度的 .npy 头部，写完全部向量后再回填真实行数
+_NPY_HEADER_SIZE = 128
+
+
+def metadata_path_for(npy_path) -> Path:
+    """向量文件对应的元数据文件：<stem>.meta.ndjson，每行带 row 下标"""
+    npy_path = Path(npy_path)
+    return npy_path.with_name(f"{npy_path.stem}.meta.ndjson")
+
+
+def _write_npy_header(f, rows: int, dim: int, dtype):
+    header = repr({
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": (rows, dim),
+    })
+    padding = _NPY_HEADER_SIZE - 10 - len(header) - 1
+    if padding < 0:
+        raise ValueError("npy header too long")
+    f.seek(0)
+    f.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", _NPY_HEADER_SIZE - 10))
+    f.write((header + " " * padding + "\n").encode("latin1"))
+
+
+def write_embedding_store(
+    model,
+    items: Iterable[Dict],
+    npy_path,
+    content_field: str = "content",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dtype: str = "float32",
+    window_size: Optional[int] = None
+) -> Dict:
+    """
+    生成嵌入向量并写为紧凑的二进制格式
+    - 向量：连续的 float32/float16 .npy 文件，可用 np.load(mmap_mode='r') 零拷贝读取
+    - 元数据：<stem>.meta.ndjson，每行是去掉 embedding 的原始条目，并带 row 行号
+    :param model: 具有 encode 方法的嵌入模型
+    :param items: 条目迭代器（可直接传入 iter_json_items 的结果，保持常量内存）
+    :param npy_path: 输出 .npy 文件路径
+    :param content_field: 包含文本内容的字段名
+    :param batch_size: 编码批大小
+    :param dtype: 向量存储类型 float32 / float16
+    :param window_size: 每次读入内存的条目数 (None则为 batch_size 的 16 倍)
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+    npy_path = Path(npy_path)
+    meta_path = metadata_path_for(npy_path)
+    window_size = window_size or batch_size * 16
+    items = iter(items)
+
+    rows = 0
+    skipped = 0
+    dim = None
+    with open(npy_path, "wb") as vec_out, open(meta_path, "w", encoding="utf-8") as meta_out:
+        vec_out.write(b"\0" * _NPY_HEADER_SIZE)
+        while True:
+            window = list(islice(items, window_size))
+            if not window:
+                break
+            results = embed_items(model, window, content_field, batch_size)
+            skipped += len(window) - len(results)
+            if not results:
+                continue
+
+            vectors = np.asarray([item.pop("embedding") for item in results], dtype=dtype)
+            if dim is None:
+                dim = vectors.shape[1]
+            vec_out.write(vectors.tobytes())
+            for item in results:
+                item["row"] = rows
+                meta_out.write(json.dumps(item, ensure_ascii=False) + "\n")
+                rows += 1
+
+        _write_npy_header(vec_out, rows, dim or 0, dtype)
+
+    logger.info(f"Wrote {rows} vectors ({dtype}) to {npy_path}, metadata to {meta_path}")
+    return {
+        "vector_file": str(npy_path),
+        "metadata_file": str(meta_path),
+        "processed_items": rows,
+        "skipped_items": skipped,
+        "dim": dim,
+        "dtype": dtype
+    }
+
+
+def iter_store_metadata(npy_path) -> Iterator[Dict]:
+    with open(metadata_path_for(npy_path), "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_embedding_store(npy_path) -> Tuple[np.ndarray, List[Dict]]:
+    """以内存映射方式加载向量，并读入元数据"""
+    vectors = np.load(npy_path, mmap_mode="r")
+    return vectors, list(iter_store_metadata(npy_path))
+
+
+def iter_store_chunks(npy_path, chunk_size: int = 10000) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+    """按块遍历 (向量视图, 元数据)，向量为内存映射切片，不拷贝"""
+    vectors = np.load(npy_path, mmap_mode="r")
+    metadata = iter_store_metadata(npy_path)
+    while True:
+        chunk = list(islice(metadata, chunk_size))
+        if not chunk:
+            break
+        start, end = chunk[0]["row"], chunk[-1]["row"] + 1
+        yield vectors[start:end], chunk
+
+
+def search_embedding_store(npy_path, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    """在本地向量文件上做精确 L2 检索"""
+    vectors, metadata = load_embedding_store(npy_path)
+    if len(metadata) == 0:
+        return []
+    query = np.asarray(query_embedding, dtype=np.float32)
+    best_rows = np.empty(0, dtype=np.int64)
+    best_dist = np.empty(0, dtype=np.float32)
+    # 分块计算，避免把整个映射文件一次性转成 float32
+    for start in range(0, vectors.shape[0], 65536):
+        block = np.asarray(vectors[start:start + 65536], dtype=np.float32)
+        dist = ((block - query) ** 2).sum(axis=1)
+        rows = np.arange(start, start + block.shape[0])
+        best_rows = np.concatenate([best_rows, rows])
+        best_dist = np.concatenate([best_dist, dist])
+        if best_rows.shape[0] > top_k:
+            keep = np.argpartition(best_dist, top_k)[:top_k]
+            best_rows, best_dist = best_rows[keep], best_dist[keep]
+    order = np.argsort(best_dist)
+    return [
+        {"distance": float(best_dist[i]), **metadata[int(best_rows[i])]}
+        for i in order
+    ]
@@ -0,0 +1,170 @@
+# backend/services/embedding_stream.py
+
+import json
+import logging
+import os
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from backend.services.embedding_service import DEFAULT_BATCH_SIZE, embed_items
+
+logger = logging.getLogger(__name__)
+
+_SKIP_RE = re.compile(r"[\s,]*")
+_WHITESPACE_RE = re.compile(r"\s*")
+
+
+def iter_json_items(input_path, chunk_size: int = 1 << 20) -> Iterator:
+    """
+    增量读取输入文件中的条目，内存占用与文件大小无关
+    支持顶层为 JSON 数组的文件，以及每行一个 JSON 对象的 NDJSON 文件
+    """
+    decoder = json.JSONDecoder()
+    with open(input_path, "r", encoding="utf-8-sig") as f:
+        buffer = f.read(chunk_size)
+        start = _SKIP_RE.match(buffer).end()
+        if buffer[start:start + 1] != "[":
+            # NDJSON
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        pos = start + 1
+        eof = False
+        while True:
+            pos = _SKIP_RE.match(buffer, pos).end()
+            if pos >= len(buffer) and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if buffer[pos:pos + 1] == "]":
+                return
+            if pos >= len(buffer):
+                raise ValueError("Unexpected end of JSON array")
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # 条目在块边界处可能被截断（例如数字 "2." 会被解析为 2），
+                # 只有其后的下一个非空白字符已在缓冲区中且为 "," 或 "]" 时才算完整
+                after = _WHITESPACE_RE.match(buffer, end).end()
+                follow = buffer[after:after + 1]
+                complete = follow in (",", "]")
+                if not complete and eof:
+                    raise ValueError(f"Unexpected data after JSON array item: {follow!r}" if follow
+                                     else "Unexpected end of JSON array")
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield item
+            pos = end
+
+
+def _progress_path(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + ".progress")
+
+
+def _load_progress(output_path: Path) -> Dict:
+    progress_file = _progress_path(output_path)
+    if not progress_file.exists():
+        return {"input_offset": 0, "output_bytes": 0}
+    with open(progress_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def can_resume(output_path) -> bool:
+    """输出文件存在且留有进度记录（上次流式处理未完成）时才能续跑"""
+    output_path = Path(output_path)
+    return output_path.exists() and _progress_path(output_path).exists()
+
+
+def _save_progress(output_path: Path, progress: Dict):
+    progress_file = _progress_path(output_path)
+    tmp_file = progress_file.with_name(progress_file.name + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+    os.replace(tmp_file, progress_file)
+
+
+def stream_embed_file(
+    model,
+    input_path,
+    output_path,
+    content_field: str = "content",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    window_size: Optional[int] = None,
+    resume: bool = False
+) -> Dict:
+    """
+    流式生成嵌入向量：分窗口读取输入、批量编码、逐行写出 NDJSON
+    每个窗口写完后记录进度（已消费输入条数、输出文件字节数），中断后可用 resume=True 续跑
+    :param model: 具有 encode 方法的嵌入模型
+    :param input_path: 输入文件路径（JSON 数组或 NDJSON）
+    :param output_path: 输出 NDJSON 文件路径
+    :param content_field: 包含文本内容的字段名
+    :param batch_size: 编码批大小
+    :param window_size: 每次读入内存的条目数 (None则为 batch_size 的 16 倍)
+    :param resume: 是否从上次记录的进度继续；输出文件已存在但没有进度记录（已完成或非流式产物）时拒绝执行
+    :return: 处理统计
+    """
+    output_path = Path(output_path)
+    window_size = window_size or batch_size * 16
+
+    if resume and output_path.exists():
+        if not can_resume(output_path):
+            raise FileExistsError(f"Output file {output_path} has no progress record to resume from")
+        progress = _load_progress(output_path)
+    else:
+        progress = {"input_offset": 0, "output_bytes": 0}
+    resumed_from = progress["input_offset"]
+    if resumed_from:
+        logger.info(f"Resuming from input item {resumed_from}, output byte {progress['output_bytes']}")
+
+    processed = 0
+    skipped = 0
+    items = iter_json_items(input_path)
+    # 跳过已处理的条目（只解析、不编码）
+    for _ in islice(items, resumed_from):
+        pass
+
+    mode = "r+b" if resumed_from else "wb"
+    with open(output_path, mode) as out:
+        # 丢弃上次中断时可能写了一半的内容
+        out.seek(progress["output_bytes"])
+        out.truncate()
+        while True:
+            window = list(islice(items, window_size))
+            if not window:
+                break
+            results = embed_items(model, window, content_field, batch_size)
+            for item in results:
+                out.write((json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+
+            processed += len(results)
+            skipped += len(window) - len(results)
+            progress = {
+                "input_offset": progress["input_offset"] + len(window),
+                "output_bytes": out.tell()
+            }
+            _save_progress(output_path, progress)
+            logger.info(f"Streamed {progress['input_offset']} items to {output_path}")
+
+    _progress_path(output_path).unlink(missing_ok=True)
+    return {
+        "processed_items": processed,
+        "skipped_items": skipped,
+        "resumed_from": resumed_from,
+        "total_input_items": progress["input_offset"]
+    }
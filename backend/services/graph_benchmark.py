@@ -0,0 +1,108 @@
+# backend/services/graph_benchmark.py
+
+import json
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from backend.utils.config import get_settings
+
+# ===== 旧实现（每个字段单独查询被引用关系），仅用于对比 =====
+
+_LEGACY_COLUMNS = """
+MATCH (t:Table {name: $table_name})-[:HAS_COLUMN]->(c:Column)
+OPTIONAL MATCH (c)-[:REFERENCES]->(target_col:Column)
+OPTIONAL MATCH (target_col)<-[:HAS_COLUMN]-(target_table:Table)
+RETURN c.name AS column_name, c.type AS data_type,
+       target_table.name AS references_table, target_col.name AS references_column
+"""
+
+_LEGACY_REFERENCED_BY = """
+MATCH (c:Column {name: $column_name})<-[:REFERENCES]-(source_col:Column)
+MATCH (source_col)<-[:HAS_COLUMN]-(source_table:Table)
+RETURN source_table.name AS referenced_by_table, source_col.name AS referenced_by_column
+"""
+
+_LEGACY_FIND_TABLE = """
+MATCH (t:Table)-[:HAS_COLUMN]->(c:Column {name: $field_name})
+RETURN t.name AS table_name
+LIMIT 1
+"""
+
+_LEGACY_FIELD_REFERENCES = """
+MATCH (c:Column {name: $field_name})<-[:HAS_COLUMN]-(t:Table {name: $table_name})
+OPTIONAL MATCH (c)-[:REFERENCES]->(target_col:Column)
+OPTIONAL MATCH (target_col)<-[:HAS_COLUMN]-(target_table:Table)
+RETURN target_table.name AS references_table, target_col.name AS references_column
+"""
+
+_LEGACY_FIELD_REFERENCED_BY = """
+MATCH (c:Column {name: $field_name})<-[:HAS_COLUMN]-(t:Table {name: $table_name})
+OPTIONAL MATCH (referencing_col:Column)-[:REFERENCES]->(c)
+OPTIONAL MATCH (referencing_col)<-[:HAS_COLUMN]-(referencing_table:Table)
+RETURN referencing_table.name AS referenced_by_table, referencing_col.name AS referenced_by_column
+"""
+
+
+def legacy_query_database(client, name: str):
+    """按改造前的方式查询：1 次字段查询 + 每字段 1 次被引用查询，找不到表时再查 3 次字段"""
+    columns = client.run_query(_LEGACY_COLUMNS, {"table_name": name})
+    for record in columns:
+        client.run_query(_LEGACY_REFERENCED_BY, {"column_name": record["column_name"]})
+    if columns:
+        return columns
+    table = client.run_query(_LEGACY_FIND_TABLE, {"field_name": name})
+    if not table:
+        return None
+    params = {"field_name": name, "table_name": table[0]["table_name"]}
+    client.run_query(_LEGACY_FIELD_REFERENCES, params)
+    return client.run_query(_LEGACY_FIELD_REFERENCED_BY, params)
+
+
+def _measure(client, func: Callable, name: str, repeat: int) -> Dict:
+    latencies = []
+    round_trips = 0
+    for _ in range(repeat):
+        before = client.round_trips
+        start = time.perf_counter()
+        func(name)
+        latencies.append((time.perf_counter() - start) * 1000)
+        round_trips = client.round_trips - before
+    return {
+        "round_trips": round_trips,
+        "median_ms": round(statistics.median(latencies), 2),
+        "min_ms": round(min(latencies), 2)
+    }
+
+
+def benchmark_query_database(client, names: List[str], repeat: int = 5) -> List[Dict]:
+    """
+    对每个表名/字段名分别测量旧实现与聚合查询的往返次数和耗时
+    :param client: Neo4jClient
+    :param names: 要查询的表名或字段名
+    :param repeat: 每种实现的重复次数
+    """
+    report = []
+    for name in names:
+        before = _measure(client, lambda n: legacy_query_database(client, n), name, repeat)
+        after = _measure(client, client.query_database, name, repeat)
+        report.append({
+            "name": name,
+            "before": before,
+            "after": after,
+            "speedup": round(before["median_ms"] / after["median_ms"], 2) if after["median_ms"] else None
+        })
+    return report
+
+
+if __name__ == "__main__":
+    # 使用方式：python -m backend.services.graph_benchmark <表名或字段名> [...]
+    from backend.services.neo4j_client import Neo4jClient
+
+    settings = get_settings()
+    neo4j_client = Neo4jClient(settings.NEO4J_URI, settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+    try:
+        print(json.dumps(benchmark_query_database(neo4j_client, sys.argv[1:]), ensure_ascii=False, indent=2))
+    finally:
+        neo4j_client.close()
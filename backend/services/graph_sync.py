@@ -0,0 +1,133 @@
+# backend/services/graph_sync.py
+
+from typing import Dict, Iterable, List, Tuple
+
+REFERENCE_KEYS = ("from_table", "from_column", "to_table", "to_column")
+
+
+def _column_key(row: Dict) -> Tuple[str, str]:
+    return row["table"], row["name"]
+
+
+def _reference_key(row: Dict) -> Tuple[str, str, str, str]:
+    return tuple(row[key] for key in REFERENCE_KEYS)
+
+
+def _column_label(key: Tuple[str, str]) -> str:
+    return f"{key[0]}.{key[1]}"
+
+
+def _reference_label(key: Tuple[str, str, str, str]) -> str:
+    return f"{key[0]}.{key[1]} -> {key[2]}.{key[3]}"
+
+
+def reference_labels(rows: Iterable[Dict]) -> List[str]:
+    """外键行转为去重排序后的 "表.字段 -> 表.字段" 文本"""
+    return sorted({_reference_label(_reference_key(row)) for row in rows})
+
+
+def split_references(references: List[Dict], columns: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    按两端字段是否存在把外键分为 (可写入, 无法解析)
+    目标字段不存在的外键 MATCH 不到任何节点，写入时不会创建关系
+    """
+    known = {_column_key(row) for row in columns}
+    resolved, unresolved = [], []
+    for row in references:
+        ends = ((row["from_table"], row["from_column"]), (row["to_table"], row["to_column"]))
+        (resolved if all(end in known for end in ends) else unresolved).append(row)
+    return resolved, unresolved
+
+
+def diff_schema(
+    current_tables: Iterable[Dict],
+    current_columns: Iterable[Dict],
+    current_references: Iterable[Dict],
+    tables: List[Dict],
+    columns: List[Dict],
+    references: List[Dict]
+) -> Dict:
+    """
+    对比图中已有的表结构与新解析出的表结构（metadata_rows 的输出），得出增量同步计划
+    :param current_tables: 图中已有的表，包含 name/comment
+    :param current_columns: 图中已有的字段，需包含 table/name/type/comment，
+                            has_table_property 为 False 表示节点缺少 table 属性（旧脚本写入）
+    :param current_references: 图中已有的外键，包含 from_table/from_column/to_table/to_column
+    :return: 各类待执行的行（tables_to_add 等）以及 summary 差异摘要；
+             两端字段不在新结构中的外键不写入，列在 summary["references"]["unresolved"]
+    """
+    desired = {row["name"]: row for row in tables}
+    existing = {row["name"]: row for row in current_tables}
+    desired_tables, existing_tables = set(desired), set(existing)
+
+    desired_columns = {_column_key(row): row for row in columns}
+    existing_columns = {_column_key(row): row for row in current_columns}
+
+    # 同步后图中的字段即为新解析出的字段，以此判断外键两端是否存在
+    references, unresolved = split_references(references, columns)
+    desired_references = {_reference_key(row): row for row in references}
+    existing_references = {_reference_key(row) for row in current_references}
+
+    tables_to_add = [desired[name] for name in sorted(desired_tables - existing_tables)]
+    tables_to_remove = sorted(existing_tables - desired_tables)
+    tables_to_update = [
+        desired[name] for name in sorted(desired_tables & existing_tables)
+        if (existing[name].get("comment") or "") != (desired[name].get("comment") or "")
+    ]
+
+    columns_to_add, columns_to_update, changed = [], [], []
+    for key, row in desired_columns.items():
+        current = existing_columns.get(key)
+        if current is None:
+            columns_to_add.append(row)
+            continue
+        is_changed = (current.get("type"), current.get("comment") or "") != (row["type"], row["comment"] or "")
+        if is_changed:
+            changed.append(key)
+        # 内容变化或缺少 table 属性的旧节点都要 SET，后续按 (table, name) 定位字段依赖该属性
+        if is_changed or not current.get("has_table_property", True):
+            columns_to_update.append(row)
+    # 所在表被删除的字段随表一起删除，不单独处理
+    columns_to_remove = [
+        {"table": key[0], "name": key[1]}
+        for key in existing_columns
+        if key not in desired_columns and key[0] in desired_tables
+    ]
+
+    references_to_add = [row for key, row in desired_references.items() if key not in existing_references]
+    references_to_remove = [
+        dict(zip(REFERENCE_KEYS, key)) for key in existing_references if key not in desired_references
+    ]
+
+    summary = {
+        "tables": {
+            "added": [row["name"] for row in tables_to_add],
+            "removed": tables_to_remove,
+            "changed": [row["name"] for row in tables_to_update],
+            "unchanged": len(desired_tables & existing_tables) - len(tables_to_update)
+        },
+        "columns": {
+            "added": sorted(_column_label(_column_key(row)) for row in columns_to_add),
+            "removed": sorted(
+                [_column_label(_column_key(row)) for row in columns_to_remove]
+                + [_column_label(key) for key in existing_columns if key[0] not in desired_tables]
+            ),
+            "changed": sorted(_column_label(key) for key in changed)
+        },
+        "references": {
+            "added": sorted(_reference_label(_reference_key(row)) for row in references_to_add),
+            "removed": sorted(_reference_label(_reference_key(row)) for row in references_to_remove),
+            "unresolved": reference_labels(unresolved)
+        }
+    }
+    return {
+        "tables_to_add": tables_to_add,
+        "tables_to_remove": [{"name": name} for name in tables_to_remove],
+        "tables_to_update": tables_to_update,
+        "columns_to_add": columns_to_add,
+        "columns_to_update": columns_to_update,
+        "columns_to_remove": columns_to_remove,
+        "references_to_add": references_to_add,
+        "references_to_remove": references_to_remove,
+        "summary": summary
+    }
@@ -0,0 +1,198 @@
+# backend/services/index_policy.py
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 没有策略记录的集合（本模块引入前创建）沿用原先固定的检索参数
+LEGACY_SEARCH_PARAMS = {"metric_type": "L2", "params": {"nprobe": 10}}
+
+INDEX_TYPES = ("FLAT", "IVF_FLAT", "IVF_SQ8", "HNSW", "IVF_PQ")
+TARGETS = ("latency", "balanced", "recall")
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, int(value)))
+
+
+def recommend_index(row_count: int, target: str = "balanced", dim: int = 768, metric_type: str = "L2") -> Dict:
+    """
+    根据集合行数与延迟/召回目标选择索引类型及参数
+    - 小集合：FLAT，精确检索且无需建索引成本
+    - 中等集合：latency -> IVF_SQ8，balanced -> IVF_FLAT，recall -> HNSW
+    - 大集合：latency -> IVF_PQ，balanced -> IVF_SQ8，recall -> HNSW
+    :return: {"index_type", "params", "metric_type"}
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown index target: {target}")
+    settings = get_settings()
+    nlist = _clamp(4 * math.sqrt(max(row_count, 1)), 16, 65536)
+
+    if row_count < settings.MILVUS_FLAT_MAX_ROWS:
+        index_type, params = "FLAT", {}
+    elif target == "recall":
+        index_type = "HNSW"
+        params = {"M": 16 if row_count < settings.MILVUS_LARGE_COLLECTION_ROWS else 32, "efConstruction": 200}
+    elif row_count < settings.MILVUS_LARGE_COLLECTION_ROWS:
+        index_type = "IVF_SQ8" if target == "latency" else "IVF_FLAT"
+        params = {"nlist": nlist}
+    elif target == "latency":
+        # PQ 子空间数需要整除向量维度
+        m = next((m for m in (dim // 8, dim // 16, dim // 4) if m and dim % m == 0), 8)
+        index_type, params = "IVF_PQ", {"nlist": nlist, "m": m, "nbits": 8}
+    else:
+        index_type, params = "IVF_SQ8", {"nlist": nlist}
+
+    return {"index_type": index_type, "params": params, "metric_type": metric_type}
+
+
+def search_params_for(index_params: Dict, top_k: int = 5, target: str = "balanced") -> Dict:
+    """根据索引参数和目标生成检索参数"""
+    index_type = index_params.get("index_type", "IVF_FLAT")
+    metric_type = index_params.get("metric_type", "L2")
+    params = index_params.get("params", {})
+    # 召回优先时多探查一些分桶/候选
+    factor = {"latency": 1, "balanced": 2, "recall": 4}.get(target, 2)
+
+    if index_type == "FLAT":
+        search = {}
+    elif index_type == "HNSW":
+        search = {"ef": max(top_k, 32 * factor)}
+    else:
+        nlist = params.get("nlist", 100)
+        # 下限取原先固定的 nprobe=10，按策略建的索引召回不低于以前
+        search = {"nprobe": _clamp(nlist * factor / 64, min(LEGACY_SEARCH_PARAMS["params"]["nprobe"], nlist), nlist)}
+    return {"metric_type": metric_type, "params": search}
+
+
+@contextmanager
+def _file_lock(path: str):
+    """跨进程的排他文件锁（POSIX 用 fcntl，Windows 用 msvcrt）"""
+    with open(path, "a+b") as f:
+        try:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except ImportError:
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class IndexPolicyStore:
+    """
+    按集合保存索引策略，持久化为 JSON 文件
+    每个集合记录：target、当前索引参数、建索引时的行数
+    多个工作进程共用同一文件：写入时在文件锁内重新读取并只合并本次修改的集合，
+    读取时文件被其他进程修改过（按 mtime，至多每 reload_interval 秒检查一次）则重新加载
+    """
+
+    def __init__(self, path: str, reload_interval: float = 1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._policies: Dict[str, Dict] = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._policies = self._read()
+
+    def _read(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            self._mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read index policies from {self.path}: {e}")
+            return dict(self._policies)
+
+    def _refresh(self):
+        """调用方持有 self._lock"""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._policies = self._read()
+
+    def get(self, collection_name: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            policy = self._policies.get(collection_name)
+            return dict(policy) if policy else None
+
+    def update(self, collection_name: str, **fields):
+        with self._lock, _file_lock(self.path + ".lock"):
+            policies = self._read()
+            policies.setdefault(collection_name, {}).update(fields)
+            self._save(policies)
+
+    def remove(self, collection_name: str):
+        with self._lock, _file_lock(self.path + ".lock"):
+            policies = self._read()
+            if policies.pop(collection_name, None) is not None:
+                self._save(policies)
+            self._policies = policies
+
+    def _save(self, policies: Dict[str, Dict]):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(policies, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._policies = policies
+        self._mtime = os.path.getmtime(self.path)
+
+    def index_params_for(self, collection_name: str, row_count: int, dim: int = 768) -> Dict:
+        """集合指定了固定索引参数时使用之，否则按行数和目标推荐"""
+        policy = self.get(collection_name) or {}
+        if policy.get("pinned") and policy.get("pinned_params"):
+            return policy["pinned_params"]
+        return recommend_index(row_count, policy.get("target", get_settings().MILVUS_INDEX_TARGET), dim)
+
+    def search_params(self, collection_name: str, top_k: int = 5) -> Dict:
+        policy = self.get(collection_name) or {}
+        index_params = policy.get("index_params")
+        if not index_params:
+            # 索引不是按策略建的，沿用原先的检索参数，避免降低召回
+            return {"metric_type": LEGACY_SEARCH_PARAMS["metric_type"], "params": dict(LEGACY_SEARCH_PARAMS["params"])}
+        return search_params_for(index_params, top_k, policy.get("target", get_settings().MILVUS_INDEX_TARGET))
+
+
+# 全局共享策略实例
+_policy_store = None
+_policy_lock = threading.Lock()
+
+
+def get_index_policy_store() -> IndexPolicyStore:
+    global _policy_store
+    with _policy_lock:
+        if _policy_store is None:
+            _policy_store = IndexPolicyStore(get_settings().MILVUS_INDEX_POLICY_PATH)
+    return _policy_store
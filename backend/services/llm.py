@@ -159,10 +159,14 @@ class LLMClient:
             raise HTTPException(status_code=500, detail=f"解析 LLM 响应失败: {str(e)}")
         
 
-def generate_vector_items(metadata: dict) -> list:
+def generate_vector_items(metadata: dict, database: str = None) -> list:
+    """
+    :param database: 来源数据库，写入每个条目的 metadata.database，向量库按其分区；缺省取 metadata["database"]
+    """
     items = []
     # 提取嵌套的 metadata（兼容旧结构）
     actual_metadata = metadata.get('description', metadata)  # 关键修改
+    database = database or metadata.get("database") or actual_metadata.get("database")
     table_info = actual_metadata.get("table_info", {})
     if table_info:
         table_text = (
@@ -214,4 +218,7 @@ def generate_vector_items(metadata: dict) -> list:
             }
         })
 
+    if database:
+        for item in items:
+            item["metadata"]["database"] = database
     return items
\ No newline at end of file
@@ -0,0 +1,689 @@
+# backend/services/local_vector_store.py
+
+import glob
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.services.index_policy import get_index_policy_store
+from backend.services.partitioning import item_database, partition_name, select_partitions
+from backend.services.query_cache import get_search_cache
+from backend.services.upsert_sync import plan_sync
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 各类集合的标量字段（顺序与 MilvusClient 的 schema 一致）
+_FIELDS = {
+    "metadata": ("type", "name", "description"),
+    "partitioned": ("database", "type", "name", "description"),
+    "qa": ("question", "answer"),
+}
+
+_ROW_EXTRACTORS = {
+    "metadata": lambda item: (item["type"], item["metadata"]["name"], item["content"]),
+    "partitioned": lambda item: (item_database(item), item["type"], item["metadata"]["name"], item["content"]),
+    "qa": lambda item: (item["question"], item["answer"]),
+}
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 精确检索时每次参与矩阵乘法的行数，限制临时距离矩阵的内存占用
+_SEARCH_BLOCK_ROWS = 65536
+
+
+def _top_k(distances: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """对每行取距离最小的 k 个，返回按距离升序排列的 (列下标, 距离)"""
+    k = min(k, distances.shape[1])
+    if k < distances.shape[1]:
+        idx = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+    part = np.take_along_axis(distances, idx, axis=1)
+    order = np.argsort(part, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def _squared_l2(queries: np.ndarray, query_norms: np.ndarray, vectors: np.ndarray, norms: np.ndarray) -> np.ndarray:
+    """||q - x||^2 = ||q||^2 - 2 q·x + ||x||^2，与 Milvus L2 度量一致（不开方）"""
+    distances = query_norms[:, None] - 2.0 * (queries @ vectors.T) + norms[None, :]
+    return np.maximum(distances, 0.0, out=distances)
+
+
+class LocalCollection:
+    """
+    单个本地集合
+    - vectors.<n>.npy：预分配容量的 float32 矩阵，以内存映射方式读写，扩容时写入新文件
+    - rows.jsonl：与向量行一一对应的标量字段
+    - ivf.npz：可选的 IVF 聚类中心及每行所属分桶
+    - tombstones.npy：已删除行的标记，检索时跳过
+    - meta.json：类型、维度、有效行数等，最后写入，行数以其为准
+    分区元数据集合的每行按 (database, type) 归入一个逻辑分区，检索时按分区过滤候选行
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._lock = threading.RLock()
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.kind = self.meta["kind"]
+        self.partitioned = self.meta.get("partitioned", False)
+        self.row_kind = "partitioned" if self.partitioned else self.kind
+        self.dim = self.meta["dim"]
+        self.count = self.meta.get("count", 0)
+
+        self.vectors = None
+        if self.meta.get("vector_file"):
+            self.vectors = np.load(os.path.join(path, self.meta["vector_file"]), mmap_mode="r+")
+        self._remove_stale_vector_files()
+
+        # 中途失败时 rows.jsonl 可能多于有效行数，以 meta 为准截断
+        self.rows: List[Dict] = []
+        rows_path = os.path.join(path, "rows.jsonl")
+        if os.path.exists(rows_path):
+            with open(rows_path, "r", encoding="utf-8") as f:
+                self.rows = [json.loads(line) for line in islice(f, self.count)]
+        self.norms = self._norms(self._view(self.count))
+        self.partition_names: List[str] = []
+        self.partition_ids = np.empty(0, dtype=np.int32)
+        self._track_partitions(self.rows)
+
+        self.tombstones = np.zeros(self.count, dtype=bool)
+        tombstones_path = os.path.join(path, "tombstones.npy")
+        if os.path.exists(tombstones_path):
+            saved = np.load(tombstones_path)[:self.count]
+            self.tombstones[:len(saved)] = saved
+
+        self.centroids = None
+        self.assignments = None
+        ivf_path = os.path.join(path, "ivf.npz")
+        if (self.meta.get("index") or {}).get("index_type") == "IVF_FLAT" and os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                self.centroids = ivf["centroids"]
+                self.assignments = ivf["assignments"][:self.count]
+            if len(self.assignments) < self.count:
+                self.assignments = np.concatenate(
+                    [self.assignments, self._assign(self._view(self.count)[len(self.assignments):])]
+                )
+
+    @classmethod
+    def create(cls, path: str, kind: str, dim: int) -> "LocalCollection":
+        os.makedirs(path)
+        meta = {
+            "kind": kind, "dim": dim, "count": 0, "capacity": 0, "vector_file": None, "index": None,
+            "partitioned": kind == "metadata"
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    def _track_partitions(self, rows: List[Dict]):
+        """记录新行所属的分区编号"""
+        if not self.partitioned:
+            return
+        ids = []
+        for row in rows:
+            name = partition_name(row["database"], row["type"])
+            if name not in self.partition_names:
+                self.partition_names.append(name)
+            ids.append(self.partition_names.index(name))
+        self.partition_ids = np.concatenate([self.partition_ids, np.asarray(ids, dtype=np.int32)])
+
+    @staticmethod
+    def _norms(vectors: np.ndarray) -> np.ndarray:
+        return np.einsum("ij,ij->i", vectors, vectors)
+
+    def _view(self, count: int) -> np.ndarray:
+        if self.vectors is None:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return self.vectors[:count]
+
+    def _save_meta(self):
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def _remove_stale_vector_files(self):
+        current = self.meta.get("vector_file")
+        for file in glob.glob(os.path.join(self.path, "vectors.*.npy")):
+            if os.path.basename(file) != current:
+                try:
+                    os.remove(file)
+                except OSError:
+                    # Windows 下仍被映射的文件无法删除，下次加载时再清理
+                    pass
+
+    def _grow(self, needed: int):
+        """容量不足时按倍数扩容：写入新的映射文件后再切换，正在进行的检索仍可读取旧映射"""
+        capacity = self.meta.get("capacity", 0)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        generation = self.meta.get("generation", 0) + 1
+        file_name = f"vectors.{generation}.npy"
+        grown = np.lib.format.open_memmap(
+            os.path.join(self.path, file_name), mode="w+", dtype=np.float32, shape=(new_capacity, self.dim)
+        )
+        if self.count:
+            grown[:self.count] = self.vectors[:self.count]
+        grown.flush()
+        self.vectors = grown
+        self.meta.update(capacity=new_capacity, vector_file=file_name, generation=generation)
+        self._save_meta()
+        self._remove_stale_vector_files()
+
+    def append(self, scalars: List[Tuple], vectors: np.ndarray):
+        """追加一批行：向量写入映射矩阵，标量追加到 rows.jsonl，最后更新有效行数"""
+        fields = _FIELDS[self.row_kind]
+        with self._lock:
+            start, end = self.count, self.count + len(vectors)
+            self._grow(end)
+            self.vectors[start:end] = vectors
+            self.vectors.flush()
+            new_rows = [dict(zip(fields, values)) for values in scalars]
+            with open(os.path.join(self.path, "rows.jsonl"), "a", encoding="utf-8") as f:
+                for row in new_rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+            self.rows.extend(new_rows)
+            self._track_partitions(new_rows)
+            self.tombstones = np.concatenate([self.tombstones, np.zeros(len(new_rows), dtype=bool)])
+            self.norms = np.concatenate([self.norms, self._norms(self.vectors[start:end])])
+            if self.centroids is not None:
+                self.assignments = np.concatenate([self.assignments, self._assign(self.vectors[start:end])])
+                self._save_ivf()
+            self.count = end
+            self.meta["count"] = end
+            self._save_meta()
+
+    def delete(self, row_ids: List[int]) -> int:
+        """按行号标记删除，返回实际删除的行数"""
+        with self._lock:
+            row_ids = np.asarray([i for i in row_ids if 0 <= i < self.count], dtype=np.int64)
+            newly = int((~self.tombstones[row_ids]).sum()) if len(row_ids) else 0
+            if newly:
+                tombstones = self.tombstones.copy()
+                tombstones[row_ids] = True
+                tmp_path = os.path.join(self.path, "tombstones.tmp.npy")
+                np.save(tmp_path, tombstones)
+                os.replace(tmp_path, os.path.join(self.path, "tombstones.npy"))
+                self.tombstones = tombstones
+            return newly
+
+    def live_rows(self) -> List[Dict]:
+        """未删除的行，附带行号 id"""
+        with self._lock:
+            return [dict(row, id=i) for i, row in enumerate(self.rows) if not self.tombstones[i]]
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """把向量分配到最近的聚类中心"""
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        centroid_norms = self._norms(self.centroids)
+        for start in range(0, len(vectors), _SEARCH_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + _SEARCH_BLOCK_ROWS])
+            distances = _squared_l2(block, self._norms(block), self.centroids, centroid_norms)
+            assignments[start:start + len(block)] = np.argmin(distances, axis=1)
+        return assignments
+
+    def _save_ivf(self):
+        tmp_path = os.path.join(self.path, "ivf.tmp.npz")
+        np.savez(tmp_path, centroids=self.centroids, assignments=self.assignments)
+        os.replace(tmp_path, os.path.join(self.path, "ivf.npz"))
+
+    def build_ivf(self, nlist: int, iterations: int = 10, sample_size: int = 100000):
+        """在抽样数据上运行 k-means 得到聚类中心，再把全部行分配到分桶"""
+        with self._lock:
+            data = self._view(self.count)
+            nlist = max(1, min(nlist, self.count))
+            rng = np.random.default_rng(0)
+            sample_idx = rng.choice(self.count, size=min(self.count, max(sample_size, nlist)), replace=False)
+            sample = np.asarray(data[np.sort(sample_idx)])
+            sample_norms = self._norms(sample)
+
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmin(_squared_l2(sample, sample_norms, centroids, self._norms(centroids)), axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=nlist)
+                non_empty = counts > 0
+                # 空分桶保留原中心
+                centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+            self.centroids = centroids
+            self.assignments = self._assign(data)
+            self._save_ivf()
+            self.meta["index"] = {"index_type": "IVF_FLAT", "nlist": nlist}
+            self._save_meta()
+
+    def build_flat(self):
+        with self._lock:
+            self.centroids = None
+            self.assignments = None
+            ivf_path = os.path.join(self.path, "ivf.npz")
+            if os.path.exists(ivf_path):
+                os.remove(ivf_path)
+            self.meta["index"] = {"index_type": "FLAT"}
+            self._save_meta()
+
+    def search(
+        self, queries: np.ndarray, top_k: int, nprobe: Optional[int] = None, partition_names: Optional[List[str]] = None
+    ) -> List[List[Dict]]:
+        """
+        精确检索：分块矩阵乘法计算 L2 距离，argpartition 取 top-k
+        已建立 IVF 时只在最近的 nprobe 个分桶内检索
+        :param partition_names: 只检索这些分区内的行，None 表示全部
+        """
+        with self._lock:
+            count = self.count
+            vectors, norms, rows = self._view(count), self.norms, self.rows
+            centroids, assignments = self.centroids, self.assignments
+            allowed = None
+            if partition_names is not None:
+                wanted = [i for i, name in enumerate(self.partition_names) if name in partition_names]
+                allowed = np.isin(self.partition_ids[:count], wanted)
+            if self.tombstones[:count].any():
+                live = ~self.tombstones[:count]
+                allowed = live if allowed is None else allowed & live
+
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not count or top_k <= 0 or (allowed is not None and not allowed.any()):
+            return [[] for _ in queries]
+        query_norms = self._norms(queries)
+
+        if centroids is None and allowed is not None:
+            subset = np.flatnonzero(allowed)
+            ids, distances = self._exact(queries, query_norms, vectors[subset], norms[subset], top_k)
+            results = list(zip(subset[ids], distances))
+        elif centroids is None:
+            ids, distances = self._exact(queries, query_norms, vectors, norms, top_k)
+            results = list(zip(ids, distances))
+        else:
+            nprobe = max(1, min(nprobe or len(centroids), len(centroids)))
+            probes, _ = _top_k(_squared_l2(queries, query_norms, centroids, self._norms(centroids)), nprobe)
+            results = []
+            for query, query_norm, probe in zip(queries, query_norms, probes):
+                in_probe = np.isin(assignments, probe)
+                candidates = np.flatnonzero(in_probe if allowed is None else in_probe & allowed)
+                if not len(candidates):
+                    results.append((candidates, np.empty(0, dtype=np.float32)))
+                    continue
+                distances = _squared_l2(query[None, :], query_norm[None], vectors[candidates], norms[candidates])
+                idx, dist = _top_k(distances, top_k)
+                results.append((candidates[idx[0]], dist[0]))
+
+        return [
+            [dict(rows[i], distance=float(d)) for i, d in zip(ids, distances)]
+            for ids, distances in results
+        ]
+
+    @staticmethod
+    def _exact(queries, query_norms, vectors, norms, top_k):
+        best_ids = None
+        best_distances = None
+        for start in range(0, len(vectors), _SEARCH_BLOCK_ROWS):
+            block = vectors[start:start + _SEARCH_BLOCK_ROWS]
+            distances = _squared_l2(queries, query_norms, block, norms[start:start + len(block)])
+            ids, distances = _top_k(distances, top_k)
+            ids = ids + start
+            if best_ids is not None:
+                # 与之前各块的 top-k 合并
+                merged_ids = np.concatenate([best_ids, ids], axis=1)
+                merged = np.concatenate([best_distances, distances], axis=1)
+                idx, distances = _top_k(merged, top_k)
+                ids = np.take_along_axis(merged_ids, idx, axis=1)
+            best_ids, best_distances = ids, distances
+        return best_ids, best_distances
+
+
+class LocalVectorClient:
+    """
+    进程内向量库，接口与 MilvusClient 一致，无需部署 etcd + minio + milvus
+    适合小规模集合、CI 以及离线环境，数据保存在 Settings.LOCAL_VECTOR_STORE_PATH 目录
+    """
+
+    def __init__(self, path: str = "local_vector_store"):
+        self.path = path
+        self.connected = False
+        self.collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """创建数据目录"""
+        os.makedirs(self.path, exist_ok=True)
+        self.connected = True
+        logger.info(f"使用本地向量库: {os.path.abspath(self.path)}")
+
+    def _collection_path(self, collection_name):
+        if not _NAME_PATTERN.match(collection_name or ""):
+            raise ValueError(f"非法的集合名称: {collection_name}")
+        return os.path.join(self.path, collection_name)
+
+    def has_collection(self, collection_name):
+        return os.path.exists(os.path.join(self._collection_path(collection_name), "meta.json"))
+
+    def _create(self, collection_name, kind, dim):
+        if not self.connected:
+            self.connect()
+        with self._lock:
+            if self.has_collection(collection_name):
+                logger.warning(f"集合 {collection_name} 已存在，跳过创建")
+                return
+            collection = LocalCollection.create(self._collection_path(collection_name), kind, dim)
+            self.collections[collection_name] = collection
+        logger.info(f"集合 {collection_name} 创建完成")
+        return collection
+
+    def create_collection(self, collection_name, dim=768):
+        """创建元数据集合"""
+        return self._create(collection_name, "metadata", dim)
+
+    def create_qa_collection(self, collection_name, dim=768):
+        """创建QA集合"""
+        return self._create(collection_name, "qa", dim)
+
+    def load_collection(self, collection_name):
+        """加载集合"""
+        with self._lock:
+            if collection_name not in self.collections:
+                if not self.has_collection(collection_name):
+                    raise ValueError(f"集合 {collection_name} 不存在")
+                self.collections[collection_name] = LocalCollection(self._collection_path(collection_name))
+                logger.info(f"集合 {collection_name} 已加载")
+            return self.collections[collection_name]
+
+    def get_collection(self, collection_name):
+        """获取集合对象"""
+        return self.collections.get(collection_name) or self.load_collection(collection_name)
+
+    def pin_collection(self, collection_name, pinned=True):
+        """本地集合以内存映射方式打开，由操作系统按需换页，不做 LRU 释放，固定操作无需处理"""
+
+    def release_collection(self, collection_name):
+        """本地集合不单独释放，返回 False"""
+        return False
+
+    def loaded_collections_stats(self):
+        """已打开的本地集合及其向量矩阵大小"""
+        with self._lock:
+            loaded = [
+                {"name": name, "estimated_bytes": collection.count * collection.dim * 4, "pinned": False}
+                for name, collection in self.collections.items()
+            ]
+        return {
+            "loaded": loaded,
+            "loaded_count": len(loaded),
+            "estimated_bytes": sum(item["estimated_bytes"] for item in loaded)
+        }
+
+    def clear_collection_data(self, collection_name):
+        """删除集合目录及其索引策略"""
+        path = self._collection_path(collection_name)
+        with self._lock:
+            self.collections.pop(collection_name, None)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        get_index_policy_store().remove(collection_name)
+        get_search_cache().invalidate(collection_name)
+        logger.info(f"集合 {collection_name} 已被完全清除")
+
+    def list_collections(self):
+        """列出所有集合名称"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, name, "meta.json"))
+        )
+
+    def insert_and_create_index(self, collection_name, data):
+        """插入元数据条目并按需建索引，格式同 MilvusClient.insert_and_create_index"""
+        return self.bulk_insert(collection_name, data, kind="metadata")
+
+    def insert_qa_and_create_index(self, collection_name, qa_data):
+        """插入QA条目并按需建索引，格式同 MilvusClient.insert_qa_and_create_index"""
+        return self.bulk_insert(collection_name, qa_data, kind="qa")
+
+    def bulk_insert(
+        self, collection_name, rows, kind="metadata", chunk_size=None, growth_threshold=None, defer_index=False
+    ):
+        """
+        分块写入，参数与返回值同 MilvusClient.bulk_insert
+        """
+        settings = get_settings()
+        chunk_size = chunk_size or settings.MILVUS_INSERT_CHUNK_SIZE
+        if growth_threshold is None:
+            growth_threshold = settings.MILVUS_INDEX_REBUILD_GROWTH
+        collection = self.get_collection(collection_name)
+        if collection.kind != kind:
+            raise ValueError(f"集合 {collection_name} 的类型为 {collection.kind}，不能写入 {kind} 数据")
+        extract = _ROW_EXTRACTORS[collection.row_kind]
+
+        start = time.perf_counter()
+        inserted = 0
+        skipped = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            scalars, embeddings = [], []
+            for item in chunk:
+                try:
+                    values = extract(item)
+                    embedding = item["embedding"]
+                    if len(embedding) != collection.dim:
+                        continue
+                except (KeyError, TypeError):
+                    continue
+                scalars.append(values)
+                embeddings.append(embedding)
+            skipped += len(chunk) - len(scalars)
+            if scalars:
+                collection.append(scalars, np.asarray(embeddings, dtype=np.float32))
+                inserted += len(scalars)
+
+        if skipped:
+            logger.warning(f"跳过 {skipped} 条无效项（缺少字段或向量维度不为 {collection.dim}）")
+        if not inserted:
+            logger.warning("没有有效数据可供插入")
+            return {"inserted": 0, "skipped": skipped, "seconds": 0.0, "rows_per_sec": 0.0, "index": "skipped"}
+
+        if defer_index:
+            index_action = "deferred"
+        else:
+            get_search_cache().invalidate(collection_name)
+            index_action = self._ensure_index(collection, growth_threshold)
+        elapsed = time.perf_counter() - start
+        stats = {
+            "inserted": inserted,
+            "skipped": skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(inserted / elapsed, 1) if elapsed > 0 else 0.0,
+            "index": index_action
+        }
+        logger.info(f"已插入 {inserted} 条数据到集合 {collection_name}: {stats}")
+        return stats
+
+    def finish_bulk_insert(self, collection_name, growth_threshold=None):
+        """结束一组 defer_index=True 的写入，语义同 MilvusClient.finish_bulk_insert"""
+        if growth_threshold is None:
+            growth_threshold = get_settings().MILVUS_INDEX_REBUILD_GROWTH
+        get_search_cache().invalidate(collection_name)
+        return self._ensure_index(self.get_collection(collection_name), growth_threshold)
+
+    def sync_items(self, collection_name, items, kind="metadata", embed=None, delete_missing=True, batch_size=5000):
+        """按稳定标识增量同步，语义与返回值同 MilvusClient.sync_items，删除以标记方式实现"""
+        start = time.perf_counter()
+        collection = self.get_collection(collection_name)
+        partitioned = collection.partitioned
+        existing = collection.live_rows()
+        if partitioned:
+            # 只在本次涉及的数据库范围内比较和删除
+            databases = {item_database(item) for item in items}
+            existing = [row for row in existing if row["database"] in databases]
+        plan = plan_sync(existing, items, kind, partitioned, delete_missing)
+
+        changed = plan["added"] + plan["updated"]
+        if changed:
+            texts = [item["question"] if kind == "qa" else item["content"] for item in changed]
+            changed = [{**item, "embedding": embedding} for item, embedding in zip(changed, embed(texts))]
+            self.bulk_insert(collection_name, changed, kind, defer_index=True)
+        collection.delete(plan["delete_ids"])
+
+        index_action = "unchanged"
+        if changed or plan["delete_ids"]:
+            get_search_cache().invalidate(collection_name)
+            index_action = self._ensure_index(collection, get_settings().MILVUS_INDEX_REBUILD_GROWTH)
+        return {
+            "added": len(plan["added"]),
+            "updated": len(plan["updated"]),
+            "unchanged": plan["unchanged"],
+            "deleted": plan["deleted"],
+            "skipped": plan["skipped"],
+            "seconds": round(time.perf_counter() - start, 3),
+            "index": index_action
+        }
+
+    def insert_from_store(self, collection_name, npy_path, chunk_size=10000):
+        """从 write_embedding_store 生成的向量文件批量插入元数据集合"""
+        from backend.services.embedding_store import iter_store_chunks
+
+        collection = self.get_collection(collection_name)
+        total = 0
+        for vectors, metadata in iter_store_chunks(npy_path, chunk_size):
+            if vectors.ndim != 2 or vectors.shape[1] != collection.dim:
+                raise ValueError(f"向量维度不匹配: {vectors.shape}")
+            valid = [
+                i for i, item in enumerate(metadata)
+                if "type" in item and "content" in item and "name" in item.get("metadata", {})
+            ]
+            if len(valid) != len(metadata):
+                logger.warning(f"跳过 {len(metadata) - len(valid)} 条无效项")
+            if not valid:
+                continue
+            collection.append(
+                [_ROW_EXTRACTORS[collection.row_kind](metadata[i]) for i in valid],
+                np.asarray(vectors[valid], dtype=np.float32)
+            )
+            total += len(valid)
+
+        if not total:
+            logger.warning("没有有效数据可供插入")
+            return 0
+        get_search_cache().invalidate(collection_name)
+        logger.info(f"已从 {npy_path} 插入 {total} 条数据到集合 {collection_name}")
+        self._ensure_index(collection, get_settings().MILVUS_INDEX_REBUILD_GROWTH)
+        return total
+
+    def _ensure_index(self, collection, growth_threshold):
+        """与 MilvusClient 相同的重建规则，返回 created / rebuilt / unchanged"""
+        if not collection.meta.get("index"):
+            self._build_index(collection)
+            return "created"
+        store = get_index_policy_store()
+        baseline = (store.get(collection.name) or {}).get("rows_at_build")
+        if baseline is None:
+            store.update(collection.name, rows_at_build=collection.count)
+            return "unchanged"
+        if baseline and (collection.count - baseline) / baseline >= growth_threshold:
+            self._build_index(collection)
+            return "rebuilt"
+        return "unchanged"
+
+    def _build_index(self, collection):
+        """
+        按索引策略建索引：FLAT 为精确检索，其余索引类型（IVF_*、HNSW）在本地统一以 IVF_FLAT 实现
+        """
+        rows = collection.count
+        store = get_index_policy_store()
+        index_params = store.index_params_for(collection.name, rows, collection.dim)
+        if index_params.get("index_type") == "FLAT" or not rows:
+            collection.build_flat()
+        else:
+            nlist = index_params.get("params", {}).get("nlist") or int(min(65536, max(16, 4 * math.sqrt(rows))))
+            collection.build_ivf(nlist)
+        store.update(collection.name, index_params=index_params, rows_at_build=rows)
+        logger.info(f"集合 {collection.name} 索引构建完成: {collection.meta['index']}")
+
+    def create_index(self, collection_name):
+        """为集合（重新）构建索引"""
+        self._build_index(self.get_collection(collection_name))
+
+    def _nprobe(self, collection, top_k):
+        index = collection.meta.get("index") or {}
+        if index.get("index_type") != "IVF_FLAT":
+            return None
+        params = get_index_policy_store().search_params(collection.name, top_k)["params"]
+        return params.get("nprobe") or max(8, index["nlist"] // 16)
+
+    def resolve_partitions(self, collection_name, databases=None, types=None):
+        """按来源数据库/条目类型过滤出需要检索的分区，语义同 MilvusClient.resolve_partitions"""
+        if not databases and not types:
+            return None
+        collection = self.get_collection(collection_name)
+        if not collection.partitioned:
+            return None
+        return select_partitions(collection.partition_names, databases, types)
+
+    def metric_type(self, collection_name):
+        """本地检索始终计算 L2 距离，与索引策略中记录的度量无关"""
+        return "L2"
+
+    def search(self, collection_name, query_embedding, top_k=5, timeout=None, partition_names=None):
+        """在指定集合中搜索相似向量"""
+        return self.search_batch(collection_name, [query_embedding], top_k, timeout, partition_names)[0]
+
+    def search_batch(self, collection_name, query_embeddings, top_k=5, timeout=None, partition_names=None):
+        """
+        一次检索多个查询向量
+        :param timeout: 仅为与 MilvusClient 保持一致，本地检索不使用
+        :param partition_names: 只检索这些分区，None 表示全部
+        """
+        collection = self.get_collection(collection_name)
+        return collection.search(
+            np.asarray(query_embeddings), top_k, self._nprobe(collection, top_k), partition_names
+        )
+
+    def search_qa(self, collection_name, query_embedding, top_k=5, timeout=None):
+        """在QA集合中搜索相似问题"""
+        return self.search_qa_batch(collection_name, [query_embedding], top_k, timeout)[0]
+
+    def search_qa_batch(self, collection_name, query_embeddings, top_k=5, timeout=None):
+        """在QA集合中一次检索多个查询向量"""
+        return self.search_batch(collection_name, query_embeddings, top_k, timeout)
+
+    def get_index_info(self, collection_name):
+        """查看集合当前的索引策略，以及按当前行数推荐的索引"""
+        collection = self.get_collection(collection_name)
+        store = get_index_policy_store()
+        return {
+            "collection": collection_name,
+            "rows": collection.count,
+            "policy": store.get(collection_name),
+            "recommended": store.index_params_for(collection_name, collection.count, collection.dim),
+            "search_params": store.search_params(collection_name),
+            "local_index": collection.meta.get("index")
+        }
+
+    def set_index_policy(self, collection_name, target=None, index_params=None):
+        """修改集合的索引策略（不立即重建），参数同 MilvusClient.set_index_policy"""
+        fields = {"pinned": index_params is not None}
+        if target is not None:
+            fields["target"] = target
+        if index_params is not None:
+            fields["pinned_params"] = index_params
+        store = get_index_policy_store()
+        store.update(collection_name, **fields)
+        return store.get(collection_name)
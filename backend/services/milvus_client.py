@@ -2,7 +2,17 @@
 
 from pymilvus import connections, FieldSchema, CollectionSchema, DataType, Collection, utility
 from tqdm import tqdm
+from itertools import islice
+import json
 import logging
+import time
+import numpy as np
+from backend.services.collection_manager import LoadedCollectionManager
+from backend.services.index_policy import get_index_policy_store
+from backend.services.partitioning import item_database, partition_name, select_partitions
+from backend.services.query_cache import get_search_cache
+from backend.services.upsert_sync import plan_sync
+from backend.utils.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +21,16 @@ class MilvusClient:
         self.host = host
         self.port = port
         self.connected = False
-        self.collections = {}
+        settings = get_settings()
+        # 已加载集合的 LRU 管理，超出预算时释放冷集合
+        self.collections = LoadedCollectionManager(
+            load=self.load_collection,
+            release=lambda name, collection: collection.release(),
+            estimate_bytes=self._estimate_loaded_bytes,
+            max_collections=settings.MILVUS_MAX_LOADED_COLLECTIONS,
+            max_bytes=settings.MILVUS_LOADED_MEMORY_MB * 1024 * 1024,
+            pinned=settings.MILVUS_PINNED_COLLECTIONS
+        )
 
     def connect(self):
         """连接到 Milvus"""
@@ -24,7 +43,10 @@ class MilvusClient:
             raise
 
     def create_collection(self, collection_name, dim=768):
-        """创建默认结构的集合"""
+        """
+        创建默认结构的集合
+        写入时按来源数据库和条目类型分区（见 partitioning.partition_name），检索时可只探查相关分区
+        """
         if not self.connected:
             self.connect()
 
@@ -34,6 +56,7 @@ class MilvusClient:
 
         fields = [
             FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(name="database", dtype=DataType.VARCHAR, max_length=255),
             FieldSchema(name="type", dtype=DataType.VARCHAR, max_length=50),
             FieldSchema(name="name", dtype=DataType.VARCHAR, max_length=255),
             FieldSchema(name="description", dtype=DataType.VARCHAR, max_length=65535),
@@ -67,13 +90,12 @@ class MilvusClient:
         return collection
 
     def load_collection(self, collection_name):
-        """加载集合"""
+        """加载集合（由 self.collections 调用，业务代码请使用 get_collection）"""
         if not self.connected:
             self.connect()
         try:
             collection = Collection(collection_name)
             collection.load()
-            self.collections[collection_name] = collection
             logger.info(f"集合 {collection_name} 已加载")
             return collection
         except Exception as e:
@@ -105,6 +127,9 @@ class MilvusClient:
 
             # 删除集合
             collection.drop()
+            self.collections.discard(collection_name)
+            get_index_policy_store().remove(collection_name)
+            get_search_cache().invalidate(collection_name)
             print(f"集合 {collection_name} 已被完全清除")
 
         except Exception as e:
@@ -112,10 +137,30 @@ class MilvusClient:
             raise
 
     def get_collection(self, collection_name):
-        """获取集合对象"""
-        if collection_name in self.collections:
-            return self.collections[collection_name]
-        return self.load_collection(collection_name)
+        """获取已加载的集合对象，并发的首次访问共享同一次加载"""
+        return self.collections.get(collection_name)
+
+    @staticmethod
+    def _estimate_loaded_bytes(collection_name, collection):
+        """按行数 × (向量字节数 + 标量字段估算) 估算集合加载后的内存占用"""
+        dim = next(
+            (field.params.get("dim", 768) for field in collection.schema.fields
+             if field.dtype == DataType.FLOAT_VECTOR),
+            768
+        )
+        return collection.num_entities * (int(dim) * 4 + 256)
+
+    def pin_collection(self, collection_name, pinned=True):
+        """固定集合使其不被 LRU 释放，或取消固定"""
+        self.collections.pin(collection_name, pinned)
+
+    def release_collection(self, collection_name):
+        """主动释放已加载的集合"""
+        return self.collections.release(collection_name)
+
+    def loaded_collections_stats(self):
+        """已加载集合、预算与加载/释放统计"""
+        return self.collections.stats()
 
     def insert_and_create_index(self, collection_name, data):
         """
@@ -125,69 +170,15 @@ class MilvusClient:
             [
                 {
                     "type": "table",
-                    "name": "user",
-                    "description": "用户信息表",
+                    "content": "表名: user; 中文名: 用户信息表; ...",
+                    "metadata": {"name": "user", "database": "crm"},  # database 决定写入的分区，可省略
                     "embedding": [0.1, 0.2, ..., 0.768]
                 },
                 ...
             ]
+        :return: 写入统计，见 bulk_insert
         """
-        # Step 1: 获取集合引用（不 load）
-        if not utility.has_collection(collection_name):
-            raise ValueError(f"集合 {collection_name} 不存在")
-
-        collection = Collection(collection_name)
-
-        # Step 2: 准备数据
-        types = []
-        names = []
-        descriptions = []
-        embeddings = []
-
-        for item in data:
-            if "type" not in item or "metadata" not in item:
-                logger.warning(f"跳过无效项: {item}")
-                continue
-            if "name" not in item["metadata"] or "content" not in item or "embedding" not in item:
-                logger.warning(f"跳过无效项: {item}")
-                continue
-            if not isinstance(item["embedding"], list) or len(item["embedding"]) != 768:
-                logger.warning(f"跳过无效嵌入向量: {item['embedding']}")
-                continue
-
-            types.append(item["type"])
-            names.append(item["metadata"]["name"])
-            descriptions.append(item["content"])
-            embeddings.append(item["embedding"])
-
-        if not types:
-            logger.warning("没有有效数据可供插入")
-            return
-
-        # Step 3: 插入数据
-        collection.insert([
-            types,
-            names,
-            descriptions,
-            embeddings
-        ])
-        collection.flush()
-        logger.info(f"已插入 {len(types)} 条数据到集合 {collection_name}")
-
-        # Step 4: 创建索引
-        index_params = {
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 100},
-            "metric_type": "L2"
-        }
-
-        try:
-            collection.create_index(field_name="embedding", index_params=index_params)
-            utility.wait_for_index_building_complete(collection_name)
-            logger.info(f"集合 {collection_name} 索引创建完成")
-        except Exception as e:
-            logger.error(f"创建索引失败: {e}")
-            raise
+        return self.bulk_insert(collection_name, data, kind="metadata")
 
     def insert_qa_and_create_index(self, collection_name, qa_data):
         """
@@ -202,118 +193,428 @@ class MilvusClient:
                 },
                 ...
             ]
+        :return: 写入统计，见 bulk_insert
+        """
+        return self.bulk_insert(collection_name, qa_data, kind="qa")
+
+    def bulk_insert(
+        self, collection_name, rows, kind="metadata", chunk_size=None, growth_threshold=None, defer_index=False
+    ):
         """
-        # Step 1: 获取集合引用（不 load）
+        分块批量写入
+        - 每块构建列式数组（向量为 float32 矩阵）后插入
+        - 全部写完后只 flush 一次
+        - 仅在集合尚无索引，或数据量相对上次建索引增长超过阈值时才（重新）构建索引
+        :param collection_name: 集合名称
+        :param rows: 条目迭代器，格式同 insert_and_create_index / insert_qa_and_create_index
+        :param kind: metadata / qa
+        :param chunk_size: 每次插入的行数 (None则使用 Settings.MILVUS_INSERT_CHUNK_SIZE)
+        :param growth_threshold: 触发重建索引的增长比例 (None则使用 Settings.MILVUS_INDEX_REBUILD_GROWTH)
+        :param defer_index: 为 True 时不 flush、不建索引，由调用方在全部变更完成后处理
+        :return: {"inserted", "skipped", "seconds", "rows_per_sec", "index"}
+        """
+        settings = get_settings()
+        chunk_size = chunk_size or settings.MILVUS_INSERT_CHUNK_SIZE
+        if growth_threshold is None:
+            growth_threshold = settings.MILVUS_INDEX_REBUILD_GROWTH
         if not utility.has_collection(collection_name):
             raise ValueError(f"集合 {collection_name} 不存在")
+        collection = Collection(collection_name)
+        partitioned = self._is_partitioned(collection)
+        extract = self._ROW_EXTRACTORS["partitioned" if kind == "metadata" and partitioned else kind]
+
+        start = time.perf_counter()
+        inserted = 0
+        skipped = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            columns, vectors, bad = self._build_columns(chunk, extract)
+            skipped += bad
+            if vectors is None:
+                continue
+            self._insert_columns(collection, columns, vectors, partitioned)
+            inserted += len(vectors)
+
+        if skipped:
+            logger.warning(f"跳过 {skipped} 条无效项（缺少字段或向量维度不为 768）")
+        if not inserted:
+            logger.warning("没有有效数据可供插入")
+            return {"inserted": 0, "skipped": skipped, "seconds": 0.0, "rows_per_sec": 0.0, "index": "skipped"}
+
+        if defer_index:
+            index_action = "deferred"
+        else:
+            collection.flush()
+            get_search_cache().invalidate(collection_name)
+            index_action = self._ensure_index(collection, growth_threshold)
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "inserted": inserted,
+            "skipped": skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(inserted / elapsed, 1) if elapsed > 0 else 0.0,
+            "index": index_action
+        }
+        logger.info(f"已插入 {inserted} 条数据到集合 {collection_name}: {stats}")
+        return stats
 
+    def finish_bulk_insert(self, collection_name, growth_threshold=None):
+        """结束一组 defer_index=True 的写入：flush、清理检索缓存并按需建索引，返回索引动作"""
+        if growth_threshold is None:
+            growth_threshold = get_settings().MILVUS_INDEX_REBUILD_GROWTH
         collection = Collection(collection_name)
+        collection.flush()
+        get_search_cache().invalidate(collection_name)
+        return self._ensure_index(collection, growth_threshold)
 
-        # Step 2: 准备数据
-        questions = []
-        answers = []
-        embeddings = []
+    def sync_items(self, collection_name, items, kind="metadata", embed=None, delete_missing=True, batch_size=5000):
+        """
+        按稳定标识增量同步，不删除集合
+        - 标识：metadata 为 (database, type, name)，qa 为归一化问题的哈希
+        - 内容哈希相同的行保持不动；新增和内容变化的条目才计算向量并写入，变化条目的旧行随后删除
+        - 全部变更完成后只 flush 一次并按需建索引
+        :param items: 不含向量的条目，格式同 insert_and_create_index / insert_qa_and_create_index
+        :param embed: 文本列表 -> 向量列表 的函数，只对新增/变化条目调用
+        :param delete_missing: 删除本次未出现的已存储行；分区集合只在本次涉及的数据库范围内删除
+        :return: {"added", "updated", "unchanged", "deleted", "skipped", "seconds", "index"}
+        """
+        if not utility.has_collection(collection_name):
+            raise ValueError(f"集合 {collection_name} 不存在")
+        start = time.perf_counter()
+        collection = Collection(collection_name)
+        partitioned = kind == "metadata" and self._is_partitioned(collection)
 
-        for item in qa_data:
-            if not all(key in item for key in ["question", "answer", "embedding"]):
-                logger.warning(f"跳过无效QA项，缺少必要字段: {item}")
+        existing = []
+        # 延迟建索引或中途失败的写入可能留下未 flush、未建索引的数据，先 flush 再按行数判断
+        collection.flush()
+        if collection.num_entities > 0:
+            # 未建索引的集合无法加载查询，先建索引再读出已有行，否则会被当作空集合重复写入
+            if not collection.has_index():
+                self._build_index(collection)
+            existing = self._query_all(collection_name, kind, partitioned, items, batch_size)
+        plan = plan_sync(existing, items, kind, partitioned, delete_missing)
+
+        changed = plan["added"] + plan["updated"]
+        if changed:
+            texts = [item["question"] if kind == "qa" else item["content"] for item in changed]
+            changed = [{**item, "embedding": embedding} for item, embedding in zip(changed, embed(texts))]
+            # 先写入新版本再删除旧行，同步过程中检索始终有结果
+            self.bulk_insert(collection_name, changed, kind, defer_index=True)
+        ids = plan["delete_ids"]
+        for i in range(0, len(ids), batch_size):
+            collection.delete(f"id in {ids[i:i + batch_size]}")
+
+        index_action = "unchanged"
+        if changed or ids:
+            collection.flush()
+            get_search_cache().invalidate(collection_name)
+            index_action = self._ensure_index(collection, get_settings().MILVUS_INDEX_REBUILD_GROWTH)
+
+        stats = {
+            "added": len(plan["added"]),
+            "updated": len(plan["updated"]),
+            "unchanged": plan["unchanged"],
+            "deleted": plan["deleted"],
+            "skipped": plan["skipped"],
+            "seconds": round(time.perf_counter() - start, 3),
+            "index": index_action
+        }
+        logger.info(f"集合 {collection_name} 增量同步完成: {stats}")
+        return stats
+
+    def _query_all(self, collection_name, kind, partitioned, items, batch_size):
+        """分批读出同步范围内已存储行的 id 与标量字段"""
+        if kind == "qa":
+            fields, expr = ["id", "question", "answer"], "id >= 0"
+        elif partitioned:
+            databases = sorted({item_database(item) for item in items})
+            fields = ["id", "database", "type", "name", "description"]
+            expr = f"database in {json.dumps(databases, ensure_ascii=False)}"
+        else:
+            fields, expr = ["id", "type", "name", "description"], "id >= 0"
+
+        rows = []
+        # 全量读取用于同步，重建索引期间等待重建完成而不是失败
+        with self.collections.acquire(collection_name, wait_maintenance=True) as collection:
+            iterator = collection.query_iterator(batch_size=batch_size, expr=expr, output_fields=fields)
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    iterator.close()
+                    break
+                rows.extend(batch)
+        return rows
+
+    # 每种集合的标量列提取方式（顺序与 schema 中除 id、embedding 外的字段一致）
+    _ROW_EXTRACTORS = {
+        "metadata": lambda item: (item["type"], item["metadata"]["name"], item["content"]),
+        "partitioned": lambda item: (item_database(item), item["type"], item["metadata"]["name"], item["content"]),
+        "qa": lambda item: (item["question"], item["answer"]),
+    }
+
+    @staticmethod
+    def _is_partitioned(collection):
+        """带 database 字段的元数据集合按库名/类型分区；旧集合保持不分区"""
+        return any(field.name == "database" for field in collection.schema.fields)
+
+    @staticmethod
+    def _insert_columns(collection, columns, vectors, partitioned):
+        """写入一块列式数据；分区集合按 (database, type) 拆分后写入各自分区，分区不存在时创建"""
+        if not partitioned:
+            collection.insert([*columns, vectors])
+            return
+        groups = {}
+        for i, (database, item_type) in enumerate(zip(columns[0], columns[1])):
+            groups.setdefault(partition_name(database, item_type), []).append(i)
+        for name, rows in groups.items():
+            if not collection.has_partition(name):
+                collection.create_partition(name)
+            collection.insert(
+                [[column[i] for i in rows] for column in columns] + [vectors[rows]],
+                partition_name=name
+            )
+
+    @staticmethod
+    def _build_columns(chunk, extract, dim=768):
+        """把一块条目转换为列式数据，返回 (标量列列表, 向量矩阵, 无效条数)"""
+        scalars = []
+        embeddings = []
+        for item in chunk:
+            try:
+                values = extract(item)
+                embedding = item["embedding"]
+                if len(embedding) != dim:
+                    continue
+            except (KeyError, TypeError):
                 continue
+            scalars.append(values)
+            embeddings.append(embedding)
+
+        bad = len(chunk) - len(scalars)
+        if not scalars:
+            return None, None, bad
+        columns = [list(column) for column in zip(*scalars)]
+        return columns, np.asarray(embeddings, dtype=np.float32), bad
+
+    def _ensure_index(self, collection, growth_threshold):
+        """按需创建或重建索引，返回执行的动作：created / rebuilt / unchanged"""
+        name = collection.name
+        rows = collection.num_entities
+        if not collection.has_index():
+            self._build_index(collection)
+            return "created"
+
+        # 没有记录的集合（例如策略文件丢失）以当前行数作为基线
+        store = get_index_policy_store()
+        policy = store.get(name) or {}
+        baseline = policy.get("rows_at_build")
+        if baseline is None:
+            store.update(name, rows_at_build=rows)
+            return "unchanged"
+        if baseline and (rows - baseline) / baseline >= growth_threshold:
+            self._build_index(collection, rebuild=True)
+            return "rebuilt"
+        return "unchanged"
+
+    def _build_index(self, collection, rebuild=False):
+        """按索引策略（集合行数 + 延迟/召回目标）创建或重建索引，并记录到策略存储"""
+        name = collection.name
+        rows = collection.num_entities
+        store = get_index_policy_store()
+        index_params = store.index_params_for(name, rows)
+        try:
+            if rebuild:
+                # Milvus 每个向量字段只能有一个索引，无法先建新索引再切换，重建期间集合不可检索；
+                # 经由管理器释放：等待进行中的检索结束，重建期间的检索立即失败，不阻塞到重建结束
+                with self.collections.maintenance(name, collection) as was_loaded:
+                    collection.drop_index()
+                    collection.create_index(field_name="embedding", index_params=index_params)
+                    utility.wait_for_index_building_complete(name)
+                if was_loaded:
+                    self.collections.get(name)
+            else:
+                collection.create_index(field_name="embedding", index_params=index_params)
+                utility.wait_for_index_building_complete(name)
+            store.update(name, index_params=index_params, rows_at_build=rows)
+            logger.info(f"集合 {name} 索引{'重建' if rebuild else '创建'}完成: {index_params}")
+        except Exception as e:
+            logger.error(f"创建索引失败: {e}")
+            raise
+
+    def insert_from_store(self, collection_name, npy_path, chunk_size=10000):
+        """
+        从 .npy 向量文件及其元数据文件批量插入并创建索引
+        向量以内存映射切片直接传给 Milvus，不转换为 Python 列表
+        :param collection_name: 集合名称
+        :param npy_path: write_embedding_store 生成的向量文件路径
+        :param chunk_size: 每次插入的行数
+        """
+        from backend.services.embedding_store import iter_store_chunks
 
-            if not isinstance(item["embedding"], list) or len(item["embedding"]) != 768:
-                logger.warning(f"跳过无效嵌入向量: {item['embedding']}")
+        if not utility.has_collection(collection_name):
+            raise ValueError(f"集合 {collection_name} 不存在")
+
+        collection = Collection(collection_name)
+        partitioned = self._is_partitioned(collection)
+        extract = self._ROW_EXTRACTORS["partitioned" if partitioned else "metadata"]
+        total = 0
+        for vectors, metadata in iter_store_chunks(npy_path, chunk_size):
+            if vectors.ndim != 2 or vectors.shape[1] != 768:
+                raise ValueError(f"向量维度不匹配: {vectors.shape}")
+
+            valid = [
+                i for i, item in enumerate(metadata)
+                if "type" in item and "content" in item and "name" in item.get("metadata", {})
+            ]
+            if len(valid) != len(metadata):
+                logger.warning(f"跳过 {len(metadata) - len(valid)} 条无效项")
+                vectors = vectors[valid]
+                metadata = [metadata[i] for i in valid]
+            if not metadata:
                 continue
+            if vectors.dtype != np.float32:
+                vectors = vectors.astype(np.float32)
 
-            questions.append(item["question"])
-            answers.append(item["answer"])
-            embeddings.append(item["embedding"])
+            columns = [list(column) for column in zip(*(extract(item) for item in metadata))]
+            self._insert_columns(collection, columns, vectors, partitioned)
+            total += len(metadata)
 
-        if not questions:
-            logger.warning("没有有效的QA数据可供插入")
-            return
+        if not total:
+            logger.warning("没有有效数据可供插入")
+            return 0
 
-        # Step 3: 插入数据
-        collection.insert([
-            questions,
-            answers,
-            embeddings
-        ])
         collection.flush()
-        logger.info(f"已插入 {len(questions)} 条QA数据到集合 {collection_name}")
-
-        # Step 4: 创建索引
-        index_params = {
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 100},
-            "metric_type": "L2"
-        }
+        get_search_cache().invalidate(collection_name)
+        logger.info(f"已从 {npy_path} 插入 {total} 条数据到集合 {collection_name}")
+        self._ensure_index(collection, get_settings().MILVUS_INDEX_REBUILD_GROWTH)
+        return total
 
-        try:
-            collection.create_index(field_name="embedding", index_params=index_params)
-            utility.wait_for_index_building_complete(collection_name)
-            logger.info(f"集合 {collection_name} QA索引创建完成")
-        except Exception as e:
-            logger.error(f"创建QA索引失败: {e}")
-            raise
+    def resolve_partitions(self, collection_name, databases=None, types=None):
+        """
+        按来源数据库/条目类型过滤出需要探查的分区
+        :return: 分区名列表；不分区的集合或未指定过滤条件时返回 None（检索全部）
+        """
+        if not databases and not types:
+            return None
+        collection = self.get_collection(collection_name)
+        if not self._is_partitioned(collection):
+            return None
+        return select_partitions([p.name for p in collection.partitions], databases, types)
 
+    def metric_type(self, collection_name):
+        """检索该集合时实际使用的距离度量，与 search_batch 传给 Milvus 的参数一致"""
+        return get_index_policy_store().search_params(collection_name)["metric_type"]
 
-    def search(self, collection_name, query_embedding, top_k=5):
+    def search(self, collection_name, query_embedding, top_k=5, timeout=None, partition_names=None):
         """在指定集合中搜索相似向量"""
-        collection = self.get_collection(collection_name)
-        results = collection.search(
-            data=[query_embedding],
-            anns_field="embedding",
-            param={"metric_type": "L2", "nprobe": 10},
-            limit=top_k,
-            output_fields=["type", "description", "name"]
-        )
-        matched_results = []
-        for hits in results:
-            for hit in hits:
-                matched_results.append({
+        return self.search_batch(collection_name, [query_embedding], top_k, timeout, partition_names)[0]
+
+    def search_batch(self, collection_name, query_embeddings, top_k=5, timeout=None, partition_names=None):
+        """
+        一次请求检索多个查询向量
+        :param timeout: 单次检索的超时时间（秒），超时后 Milvus 调用会被中止
+        :param partition_names: 只探查这些分区（见 resolve_partitions），None 表示全部
+        :return: 与 query_embeddings 顺序一致的结果列表，每项为该查询的命中列表
+        """
+        query_embeddings = list(query_embeddings)
+        if partition_names is not None and not partition_names:
+            return [[] for _ in query_embeddings]
+        # 检索期间持有集合，避免被并发请求触发的 LRU 释放
+        with self.collections.acquire(collection_name) as collection:
+            output_fields = ["type", "description", "name"]
+            if self._is_partitioned(collection):
+                output_fields.append("database")
+            results = collection.search(
+                data=query_embeddings,
+                anns_field="embedding",
+                param=get_index_policy_store().search_params(collection_name, top_k),
+                limit=top_k,
+                output_fields=output_fields,
+                partition_names=partition_names,
+                timeout=timeout
+            )
+        return [
+            [
+                {
                     "distance": hit.distance,
-                    "name": hit.entity.get('name'),
-                    "type": hit.entity.get('type'),
-                    "description": hit.entity.get('description')
-                })
-        return matched_results
+                    **{field: hit.entity.get(field) for field in ("name", "type", "description", "database")
+                       if field in output_fields}
+                }
+                for hit in hits
+            ]
+            for hits in results
+        ]
 
-    def search_qa(self, collection_name, query_embedding, top_k=5):
+    def search_qa(self, collection_name, query_embedding, top_k=5, timeout=None):
         """在QA集合中搜索相似问题"""
-        collection = self.get_collection(collection_name)
-        results = collection.search(
-            data=[query_embedding],
-            anns_field="embedding",
-            param={"metric_type": "L2", "nprobe": 10},
-            limit=top_k,
-            output_fields=["question", "answer"]  # 只返回问题和答案字段
-        )
-        
-        matched_results = []
-        for hits in results:
-            for hit in hits:
-                matched_results.append({
+        return self.search_qa_batch(collection_name, [query_embedding], top_k, timeout)[0]
+
+    def search_qa_batch(self, collection_name, query_embeddings, top_k=5, timeout=None):
+        """
+        在QA集合中一次检索多个查询向量
+        :return: 与 query_embeddings 顺序一致的结果列表
+        """
+        with self.collections.acquire(collection_name) as collection:
+            results = collection.search(
+                data=list(query_embeddings),
+                anns_field="embedding",
+                param=get_index_policy_store().search_params(collection_name, top_k),
+                limit=top_k,
+                output_fields=["question", "answer"],  # 只返回问题和答案字段
+                timeout=timeout
+            )
+        return [
+            [
+                {
                     "distance": hit.distance,
                     "question": hit.entity.get('question'),
                     "answer": hit.entity.get('answer')
-                })
-        return matched_results
+                }
+                for hit in hits
+            ]
+            for hits in results
+        ]
 
     def list_collections(self):
         """列出所有集合名称"""
         return utility.list_collections()
 
     def create_index(self, collection_name):
-        """为集合创建索引"""
-        collection = self.get_collection(collection_name)
-        index_params = {
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 100},
-            "metric_type": "L2"
+        """为集合创建索引（已存在索引时重建）"""
+        if not utility.has_collection(collection_name):
+            raise ValueError(f"集合 {collection_name} 不存在")
+        collection = self.collections.peek(collection_name) or Collection(collection_name)
+        self._build_index(collection, rebuild=collection.has_index())
+
+    def get_index_info(self, collection_name):
+        """查看集合当前的索引策略，以及按当前行数推荐的索引"""
+        if not utility.has_collection(collection_name):
+            raise ValueError(f"集合 {collection_name} 不存在")
+        rows = Collection(collection_name).num_entities
+        store = get_index_policy_store()
+        return {
+            "collection": collection_name,
+            "rows": rows,
+            "policy": store.get(collection_name),
+            "recommended": store.index_params_for(collection_name, rows),
+            "search_params": store.search_params(collection_name)
         }
-        try:
-            collection.create_index(field_name="embedding", index_params=index_params)
-            utility.wait_for_index_building_complete(collection_name)
-            logger.info(f"集合 {collection_name} 索引创建完成")
-        except Exception as e:
-            logger.error(f"创建索引失败: {e}")
-            raise
\ No newline at end of file
+
+    def set_index_policy(self, collection_name, target=None, index_params=None):
+        """
+        修改集合的索引策略（不立即重建）
+        :param target: latency / balanced / recall
+        :param index_params: 固定的索引参数，指定后不再按行数自动选择；传 None 取消固定
+        """
+        fields = {"pinned": index_params is not None}
+        if target is not None:
+            fields["target"] = target
+        if index_params is not None:
+            fields["pinned_params"] = index_params
+        store = get_index_policy_store()
+        store.update(collection_name, **fields)
+        return store.get(collection_name)
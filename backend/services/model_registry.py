@@ -0,0 +1,135 @@
+# backend/services/model_registry.py
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from backend.services.embedding_service import load_embedding_model
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, str, str]
+
+
+class _Entry:
+    def __init__(self):
+        self.model = None
+        self.refcount = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    进程内共享的嵌入模型注册表
+    以 (模型路径, 设备, 后端) 为键，每个模型只加载一次；
+    通过 acquire/release 维护引用计数，引用归零且空闲超过 idle_timeout 秒后卸载
+    """
+
+    def __init__(self, idle_timeout: float = 0):
+        self.idle_timeout = idle_timeout
+        self.loads = 0
+        self.unloads = 0
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._lock = threading.Lock()
+        if idle_timeout > 0:
+            reaper = threading.Thread(target=self._reap_loop, name="model-registry-reaper", daemon=True)
+            reaper.start()
+
+    @staticmethod
+    def make_key(model_path: str, device: str = "cpu", backend: Optional[str] = None) -> ModelKey:
+        backend = backend or get_settings().EMBEDDING_BACKEND
+        return os.path.normpath(model_path), device or "cpu", backend
+
+    def acquire(self, model_path: str, device: str = "cpu", backend: Optional[str] = None):
+        """获取模型并增加引用计数，首次获取时加载（并发获取同一模型只会加载一次）"""
+        key = self.make_key(model_path, device, backend)
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            entry.refcount += 1
+
+        try:
+            # 每个模型单独加锁，加载大模型时不阻塞其他模型的获取
+            with entry.lock:
+                if entry.model is None:
+                    logger.info(f"Loading embedding model {key}...")
+                    entry.model = load_embedding_model(key[0], key[1], key[2])
+                    self.loads += 1
+                entry.last_used = time.monotonic()
+                return entry.model
+        except Exception:
+            with self._lock:
+                entry.refcount -= 1
+            raise
+
+    def release(self, model_path: str, device: str = "cpu", backend: Optional[str] = None):
+        """释放一次引用"""
+        key = self.make_key(model_path, device, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount <= 0:
+                logger.warning(f"Releasing model that is not acquired: {key}")
+                return
+            entry.refcount -= 1
+            entry.last_used = time.monotonic()
+
+    def unload_idle(self, max_idle: Optional[float] = None) -> int:
+        """卸载引用计数为 0 且空闲超过 max_idle 秒的模型，返回卸载数量"""
+        max_idle = self.idle_timeout if max_idle is None else max_idle
+        now = time.monotonic()
+        unloaded = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.refcount == 0 and now - entry.last_used >= max_idle:
+                    del self._entries[key]
+                    unloaded.append((key, entry))
+        for key, entry in unloaded:
+            with entry.lock:
+                close = getattr(entry.model, "close", None)
+                if callable(close):
+                    close()
+                entry.model = None
+            self.unloads += 1
+            logger.info(f"Unloaded idle embedding model {key}")
+        return len(unloaded)
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 4)
+        while True:
+            time.sleep(interval)
+            try:
+                self.unload_idle()
+            except Exception as e:
+                logger.error(f"Failed to unload idle models: {e}")
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            models = [
+                {
+                    "path": key[0],
+                    "device": key[1],
+                    "backend": key[2],
+                    "loaded": entry.model is not None,
+                    "refcount": entry.refcount,
+                    "idle_seconds": round(now - entry.last_used, 1)
+                }
+                for key, entry in self._entries.items()
+            ]
+        return {"loads": self.loads, "unloads": self.unloads, "idle_timeout": self.idle_timeout, "models": models}
+
+
+# 全局共享注册表实例
+_model_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _model_registry
+    with _registry_lock:
+        if _model_registry is None:
+            _model_registry = ModelRegistry(idle_timeout=get_settings().MODEL_IDLE_UNLOAD_SECONDS)
+    return _model_registry
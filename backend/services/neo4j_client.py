@@ -1,7 +1,10 @@
 import re
-from neo4j import GraphDatabase
+import threading
+import time
+from contextlib import contextmanager
 from typing import List, Dict, Any
 from pydantic import BaseModel
+from backend.services.graph_sync import diff_schema, reference_labels, split_references
 
 class SqlContent(BaseModel):
     content: str
@@ -9,6 +12,7 @@ class SqlContent(BaseModel):
 class ColumnInfo(BaseModel):
     name: str
     type: str
+    comment: str = ""
 
 class RelationshipInfo(BaseModel):
     from_table: str
@@ -18,6 +22,7 @@ class RelationshipInfo(BaseModel):
 
 class TableInfo(BaseModel):
     columns: List[ColumnInfo]
+    comment: str = ""
     relationships: List[RelationshipInfo] = []
 
 class MetadataInput(BaseModel):
@@ -56,8 +61,30 @@ class MetadataInput(BaseModel):
 
 
 class Neo4jClient:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, max_pool_size=100, acquisition_timeout=60.0,
+                 liveness_check_seconds=None, max_connection_lifetime=3600.0):
+        """
+        :param max_pool_size: 连接池最大连接数
+        :param acquisition_timeout: 获取连接的超时时间（秒）
+        :param liveness_check_seconds: 空闲超过该时间的连接借出前先检查存活，None 表示不检查
+        :param max_connection_lifetime: 连接最长存活时间（秒）
+        """
+        from neo4j import GraphDatabase  # 延迟导入，加快应用启动
+        self.max_pool_size = max_pool_size
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout,
+            liveness_check_timeout=liveness_check_seconds,
+            max_connection_lifetime=max_connection_lifetime
+        )
+        self.round_trips = 0  # run_query 发出的查询次数
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+        self.peak_in_use = 0
+        self.sessions_opened = 0
+        self.session_errors = 0
         self.verify_connection()
 
     def verify_connection(self):
@@ -71,18 +98,224 @@ class Neo4jClient:
     def close(self):
         self.driver.close()
 
+    @contextmanager
+    def session(self):
+        """借出一个会话，并统计连接池占用情况"""
+        with self._stats_lock:
+            self._in_use += 1
+            self.sessions_opened += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+        try:
+            with self.driver.session() as session:
+                yield session
+        except Exception:
+            with self._stats_lock:
+                self.session_errors += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self._in_use -= 1
+
+    def check_liveness(self) -> Dict[str, Any]:
+        """检查服务端是否可达，返回耗时"""
+        start = time.perf_counter()
+        try:
+            self.driver.verify_connectivity()
+            return {"alive": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+        except Exception as e:
+            return {"alive": False, "error": str(e)}
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池使用情况：当前/峰值占用的会话数及其占池大小的比例"""
+        with self._stats_lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "in_use": self._in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": round(self._in_use / self.max_pool_size, 3) if self.max_pool_size else None,
+                "sessions_opened": self.sessions_opened,
+                "session_errors": self.session_errors,
+                "round_trips": self.round_trips
+            }
+
+    # ===== 约束与索引 =====
+    def ensure_schema(self) -> List[Dict[str, Any]]:
+        """
+        创建 SCHEMA_STATEMENTS 中的约束与索引（已存在时跳过）
+        单条失败（如已有同名 Table 节点导致唯一约束无法建立）只记录，不影响其余语句
+        :return: 每条语句的执行结果 [{"name", "ok", "error"}]
+        """
+        report = []
+        with self.session() as session:
+            for name, statement in SCHEMA_STATEMENTS:
+                try:
+                    session.run(statement).consume()
+                    report.append({"name": name, "ok": True})
+                except Exception as e:
+                    print(f"Failed to create {name}: {e}")
+                    report.append({"name": name, "ok": False, "error": str(e)})
+        return report
+
+    def check_index_usage(self) -> List[Dict[str, Any]]:
+        """
+        EXPLAIN 热点查询，检查执行计划是否用索引查找定位起始节点
+        uses_index_seek 为 False 或 label_scans 非空说明查询仍在做标签扫描
+        """
+        report = []
+        with self.session() as session:
+            for name, query in INDEXED_QUERIES:
+                plan = session.run("EXPLAIN " + query, {"name": "", "table": ""}).consume().plan
+                operators = _plan_operators(plan)
+                report.append({
+                    "query": name,
+                    "uses_index_seek": any("IndexSeek" in op for op in operators),
+                    "label_scans": [op for op in operators if op in ("NodeByLabelScan", "AllNodesScan")],
+                    "operators": operators
+                })
+        return report
+
+    def search_schema(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """在表/字段的名称与注释上做全文检索"""
+        records = self.run_query(SEARCH_SCHEMA_QUERY, {"text": text, "limit": limit})
+        return [dict(record) for record in records]
+
     def run_query(self, query, parameters=None):
-        with self.driver.session() as session:
+        with self._stats_lock:
+            self.round_trips += 1
+        with self.session() as session:
             result = session.run(query, parameters or {})
             return list(result)
 
     # ===== 新增方法：清空图库 =====
     def clear_graph(self):
         """清空整个图数据库"""
-        with self.driver.session() as session:
+        with self.session() as session:
             session.run("MATCH (n) DETACH DELETE n")
             return {"message": "Graph database has been cleared."}
 
+    # ===== 批量加载 parse_sql_metadata 的结果 =====
+    def load_metadata(self, metadata: Dict[str, Any], batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        以参数化 UNWIND 批量写入表、字段、HAS_COLUMN 与 REFERENCES 关系
+        每批在一个显式事务中执行，查询文本固定，执行计划可复用；
+        节点和关系均为 MERGE，已存在的表/字段只更新属性，可重复执行
+        :param metadata: parse_sql_metadata 的输出
+        :param batch_size: 每个事务写入的行数
+        :return: 创建的节点/关系数、批次数、耗时与每秒节点数；两端字段不存在的外键不写入，列在 unresolved_references
+        """
+        tables, columns, references = metadata_rows(metadata)
+        references, unresolved = split_references(references, columns)
+        start = time.perf_counter()
+        totals = {"nodes_created": 0, "relationships_created": 0, "batches": 0}
+        with self.session() as session:
+            for query, rows in ((LOAD_TABLES_QUERY, tables), (LOAD_COLUMNS_QUERY, columns),
+                                (LOAD_REFERENCES_QUERY, references)):
+                self._write_batches(session, query, rows, batch_size, totals)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "tables": len(tables),
+            "columns": len(columns),
+            "references": len(references),
+            "unresolved_references": reference_labels(unresolved),
+            **totals,
+            "seconds": round(elapsed, 3),
+            "nodes_per_sec": round(totals["nodes_created"] / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+    def _write_batches(self, session, query, rows, batch_size, totals):
+        """把 rows 按 batch_size 分批，每批一个写事务，计数累加到 totals"""
+        for i in range(0, len(rows), batch_size):
+            counters = session.execute_write(_run_batch, query, rows[i:i + batch_size])
+            for key in ("nodes_created", "nodes_deleted", "relationships_created",
+                        "relationships_deleted", "properties_set"):
+                if key in totals:
+                    totals[key] += getattr(counters, key)
+            totals["batches"] += 1
+        if rows:
+            with self._stats_lock:
+                self.round_trips += (len(rows) + batch_size - 1) // batch_size
+
+    # ===== 增量同步表结构 =====
+    def read_schema(self):
+        """读取图中现有的表、字段与外键，返回 (表行, 字段行, 外键行)"""
+        table_records = self.run_query(READ_TABLES_QUERY)
+        column_records = self.run_query(READ_COLUMNS_QUERY)
+        reference_records = self.run_query(READ_REFERENCES_QUERY)
+        return (
+            [dict(record) for record in table_records],
+            [dict(record) for record in column_records],
+            [dict(record) for record in reference_records]
+        )
+
+    def sync_metadata(self, metadata: Dict[str, Any], batch_size: int = 1000,
+                      dry_run: bool = False) -> Dict[str, Any]:
+        """
+        与图中现有结构对比后只写入差异，同步过程中图始终可查询
+        顺序：删外键 -> 删字段 -> 删表 -> MERGE 新表 -> SET 变更表/字段 -> MERGE 新字段 -> MERGE 新外键
+        :param metadata: parse_sql_metadata 的输出
+        :param batch_size: 每个事务写入的行数
+        :param dry_run: 为 True 时只返回差异摘要，不写入
+        :return: {"summary": 差异摘要, "nodes_created", "nodes_deleted", ..., "batches", "seconds"}
+        """
+        start = time.perf_counter()
+        plan = diff_schema(*self.read_schema(), *metadata_rows(metadata))
+        totals = {"nodes_created": 0, "nodes_deleted": 0, "relationships_created": 0,
+                  "relationships_deleted": 0, "properties_set": 0, "batches": 0}
+        if not dry_run:
+            with self.session() as session:
+                for query, key in ((SYNC_REMOVE_REFERENCES_QUERY, "references_to_remove"),
+                                   (SYNC_REMOVE_COLUMNS_QUERY, "columns_to_remove"),
+                                   (SYNC_REMOVE_TABLES_QUERY, "tables_to_remove"),
+                                   (SYNC_ADD_TABLES_QUERY, "tables_to_add"),
+                                   (SYNC_UPDATE_TABLES_QUERY, "tables_to_update"),
+                                   (SYNC_UPDATE_COLUMNS_QUERY, "columns_to_update"),
+                                   (SYNC_ADD_COLUMNS_QUERY, "columns_to_add"),
+                                   (SYNC_ADD_REFERENCES_QUERY, "references_to_add")):
+                    self._write_batches(session, query, plan[key], batch_size, totals)
+        return {
+            "summary": plan["summary"],
+            "dry_run": dry_run,
+            **totals,
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+
+    def insert_cypher_batched(self, cypher_statements: str, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        按分号（忽略引号内的分号）拆分脚本，每 batch_size 条语句放在一个显式事务中执行
+        某批失败时整批回滚并记录错误，其余批次继续
+        """
+        statements = split_cypher_statements(cypher_statements)
+        start = time.perf_counter()
+        success_count = 0
+        nodes_created = 0
+        failed_batches = []
+
+        def run_statements(tx, batch):
+            created = 0
+            for stmt in batch:
+                created += tx.run(stmt).consume().counters.nodes_created
+            return created
+
+        with self.session() as session:
+            for i in range(0, len(statements), batch_size):
+                batch = statements[i:i + batch_size]
+                try:
+                    nodes_created += session.execute_write(run_statements, batch)
+                    success_count += len(batch)
+                except Exception as e:
+                    failed_batches.append({"first_statement": i, "statements": len(batch), "error": str(e)})
+
+        elapsed = time.perf_counter() - start
+        return {
+            "total": len(statements),
+            "success": success_count,
+            "failed": failed_batches,
+            "nodes_created": nodes_created,
+            "seconds": round(elapsed, 3),
+            "nodes_per_sec": round(nodes_created / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
     # ===== 新增方法：插入 .cypher 文件内容 =====
     def insert_cypher_content(self, cypher_statements: str):
         """
@@ -96,7 +329,7 @@ class Neo4jClient:
         success_count = 0
         failed_statements = []
 
-        with self.driver.session() as session:
+        with self.session() as session:
             for stmt in statements:
                 try:
                     session.run(stmt)
@@ -111,182 +344,317 @@ class Neo4jClient:
         }
     
     def get_table_info(self, table_name):
-        query_columns = """
-        MATCH (t:Table {name: $table_name})-[:HAS_COLUMN]->(c:Column)
-        OPTIONAL MATCH (c)-[:REFERENCES]->(target_col:Column)
-        OPTIONAL MATCH (target_col)<-[:HAS_COLUMN]-(target_table:Table)
-        RETURN 
-            c.name AS column_name,
-            c.type AS data_type,
-            target_table.name AS references_table,
-            target_col.name AS references_column
-        """
-
-        query_referenced_by = """
-        MATCH (c:Column {name: $column_name})<-[:REFERENCES]-(source_col:Column)
-        MATCH (source_col)<-[:HAS_COLUMN]-(source_table:Table)
-        RETURN 
-            source_table.name AS referenced_by_table,
-            source_col.name AS referenced_by_column
-        """
-
-        columns_result = self.run_query(query_columns, {"table_name": table_name})
-        all_columns = []
-
-        for record in columns_result:
-            column_name = record["column_name"]
-            data_type = record["data_type"]
-            references_table = record["references_table"]
-            references_column = record["references_column"]
-
-            column_info = {
-                "name": column_name,
-                "type": data_type
-            }
-
-            if references_table and references_column:
-                column_info["references"] = [
-                    {
-                        "table": references_table,
-                        "column": references_column
-                    }
-                ]
-
-            # Check for referenced_by relationships
-            referenced_by_result = self.run_query(query_referenced_by, {"column_name": column_name})
-            referenced_by_list = []
-            for ref_record in referenced_by_result:
-                referenced_by_list.append({
-                    "table": ref_record["referenced_by_table"],
-                    "column": ref_record["referenced_by_column"]
-                })
-            
-            if referenced_by_list:
-                column_info["referenced_by"] = referenced_by_list
-
-            all_columns.append(column_info)
-
-        if not all_columns:
-            return None
-
-        related_tables_set = set()
-        for column in all_columns:
-            if "references" in column:
-                for ref in column["references"]:
-                    related_tables_set.add(ref["table"])
-            if "referenced_by" in column:
-                for ref in column["referenced_by"]:
-                    related_tables_set.add(ref["table"])
-
-        related_tables = list(related_tables_set)
-
-        return {
-            "table": table_name,
-            "columns": all_columns,
-            "related_tables": related_tables
-        }
+        """一次查询取回表的全部字段及其引用/被引用关系"""
+        records = self.run_query(TABLE_INFO_QUERY, {"name": table_name})
+        return _format_table_info(table_name, records[0]["columns"] if records else [])
 
     def get_field_info(self, field_name):
-        query_find_table = """
-        MATCH (t:Table)-[:HAS_COLUMN]->(c:Column {name: $field_name})
-        RETURN t.name AS table_name
-        LIMIT 1
+        """一次查询取回字段所在表及其引用/被引用关系"""
+        records = self.run_query(FIELD_INFO_QUERY, {"name": field_name})
+        return _format_field_info(field_name, records[0] if records else None)
+
+    def query_database(self, input_string):
         """
-        table_result = self.run_query(query_find_table, {"field_name": field_name})
-        if not table_result:
-            return None
-
-        table_name = table_result[0]["table_name"]
-
-        query_references = """
-        MATCH (c:Column {name: $field_name})<-[:HAS_COLUMN]-(t:Table {name: $table_name})
-        OPTIONAL MATCH (c)-[:REFERENCES]->(target_col:Column)
-        OPTIONAL MATCH (target_col)<-[:HAS_COLUMN]-(target_table:Table)
-        RETURN 
-            target_table.name AS references_table,
-            target_col.name AS references_column,
-            target_col.type AS data_type
+        按表名或字段名查询，一次往返完成：
+        先按表名聚合字段，找不到表时在同一条查询中按字段名查找
         """
+        print(f"Querying for table or field: {input_string}")
+        records = self.run_query(TABLE_OR_FIELD_QUERY, {"name": input_string})
+        record = records[0] if records else None
+        if record is not None:
+            table_info = _format_table_info(input_string, record["columns"])
+            if table_info:
+                return table_info
+            print(f"Table '{input_string}' not found, checking as field...")
+            field_info = _format_field_info(input_string, record)
+            if field_info:
+                return field_info
+        print(f"Field '{input_string}' not found in any table.")
+        # If neither table nor field is found
+        return {"error": "No information found for the provided input."}
 
-        query_referenced_by = """
-        MATCH (c:Column {name: $field_name})<-[:HAS_COLUMN]-(t:Table {name: $table_name})
-        OPTIONAL MATCH (referencing_col:Column)-[:REFERENCES]->(c)
-        OPTIONAL MATCH (referencing_col)<-[:HAS_COLUMN]-(referencing_table:Table)
-        RETURN 
-            referencing_table.name AS referenced_by_table,
-            referencing_col.name AS referenced_by_column,
-            referencing_col.type AS data_type
-        """
 
-        references_result = self.run_query(query_references, {"field_name": field_name, "table_name": table_name})
-        referenced_by_result = self.run_query(query_referenced_by, {"field_name": field_name, "table_name": table_name})
+# 表按 name、字段按 (table, name) MERGE，重复加载同一批表不会违反唯一约束或产生重复节点
+LOAD_TABLES_QUERY = """
+UNWIND $rows AS row
+MERGE (t:Table {name: row.name})
+SET t.comment = row.comment
+"""
+
+# 字段节点带 table 属性，REFERENCES 按 (table, name) 定位字段
+LOAD_COLUMNS_QUERY = """
+UNWIND $rows AS row
+MATCH (t:Table {name: row.table})
+MERGE (c:Column {table: row.table, name: row.name})
+SET c.type = row.type, c.comment = row.comment
+MERGE (t)-[:HAS_COLUMN]->(c)
+"""
+
+LOAD_REFERENCES_QUERY = """
+UNWIND $rows AS row
+MATCH (src:Column {table: row.from_table, name: row.from_column})
+MATCH (dst:Column {table: row.to_table, name: row.to_column})
+MERGE (src)-[:REFERENCES]->(dst)
+"""
+
+
+# ===== 约束与索引：get_table_info / get_field_info 按名称查找，同步与加载按 (table, name) 定位字段 =====
+SCHEMA_STATEMENTS = [
+    ("table_name_unique",
+     "CREATE CONSTRAINT table_name_unique IF NOT EXISTS FOR (t:Table) REQUIRE t.name IS UNIQUE"),
+    ("column_table_name",
+     "CREATE INDEX column_table_name IF NOT EXISTS FOR (c:Column) ON (c.table, c.name)"),
+    # 组合索引无法服务只按字段名的查找（FIELD_INFO_QUERY），单独建索引
+    ("column_name",
+     "CREATE INDEX column_name IF NOT EXISTS FOR (c:Column) ON (c.name)"),
+    ("schema_fulltext",
+     "CREATE FULLTEXT INDEX schema_fulltext IF NOT EXISTS FOR (n:Table|Column) ON EACH [n.name, n.comment]")
+]
+
+SEARCH_SCHEMA_QUERY = """
+CALL db.index.fulltext.queryNodes('schema_fulltext', $text) YIELD node, score
+RETURN labels(node)[0] AS label, node.name AS name, node.table AS table, node.comment AS comment, score
+LIMIT $limit
+"""
+
+
+def _plan_operators(plan) -> List[str]:
+    """展开执行计划树，返回算子名称（去掉 @neo4j 等运行时后缀）"""
+    if not plan:
+        return []
+    operators = [plan.get("operatorType", "").split("@")[0]]
+    for child in plan.get("children", []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+
+# ===== 增量同步使用的查询，字段按所在表定位，兼容没有 table 属性的旧节点 =====
+READ_TABLES_QUERY = "MATCH (t:Table) RETURN t.name AS name, t.comment AS comment"
+
+READ_COLUMNS_QUERY = """
+MATCH (t:Table)-[:HAS_COLUMN]->(c:Column)
+RETURN t.name AS table, c.name AS name, c.type AS type, c.comment AS comment,
+       c.table IS NOT NULL AS has_table_property
+"""
+
+READ_REFERENCES_QUERY = """
+MATCH (st:Table)-[:HAS_COLUMN]->(s:Column)-[:REFERENCES]->(d:Column)<-[:HAS_COLUMN]-(dt:Table)
+RETURN DISTINCT st.name AS from_table, s.name AS from_column, dt.name AS to_table, d.name AS to_column
+"""
+
+SYNC_REMOVE_REFERENCES_QUERY = """
+UNWIND $rows AS row
+MATCH (:Table {name: row.from_table})-[:HAS_COLUMN]->(:Column {name: row.from_column})
+      -[r:REFERENCES]->(:Column {name: row.to_column})<-[:HAS_COLUMN]-(:Table {name: row.to_table})
+DELETE r
+"""
+
+SYNC_REMOVE_COLUMNS_QUERY = """
+UNWIND $rows AS row
+MATCH (:Table {name: row.table})-[:HAS_COLUMN]->(c:Column {name: row.name})
+DETACH DELETE c
+"""
+
+SYNC_REMOVE_TABLES_QUERY = """
+UNWIND $rows AS row
+MATCH (t:Table {name: row.name})
+OPTIONAL MATCH (t)-[:HAS_COLUMN]->(c:Column)
+DETACH DELETE c, t
+"""
+
+SYNC_ADD_TABLES_QUERY = LOAD_TABLES_QUERY
+
+SYNC_UPDATE_TABLES_QUERY = """
+UNWIND $rows AS row
+MATCH (t:Table {name: row.name})
+SET t.comment = row.comment
+"""
+
+SYNC_UPDATE_COLUMNS_QUERY = """
+UNWIND $rows AS row
+MATCH (:Table {name: row.table})-[:HAS_COLUMN]->(c:Column {name: row.name})
+SET c.type = row.type, c.comment = row.comment, c.table = row.table
+"""
+
+SYNC_ADD_COLUMNS_QUERY = LOAD_COLUMNS_QUERY
+
+SYNC_ADD_REFERENCES_QUERY = LOAD_REFERENCES_QUERY
+
+
+def _run_batch(tx, query, rows):
+    return tx.run(query, rows=rows).consume().counters
+
+
+def metadata_rows(metadata: Dict[str, Any]):
+    """把 parse_sql_metadata 的输出展开为 (表行, 字段行, 外键行)"""
+    all_tables = {**metadata.get("independent_tables", {}), **metadata.get("fk_tables", {})}
+    tables = [{"name": name, "comment": info.get("comment", "")} for name, info in all_tables.items()]
+    columns = [
+        {"table": name, "name": column["name"], "type": column["type"], "comment": column.get("comment", "")}
+        for name, info in all_tables.items()
+        for column in info.get("columns", [])
+    ]
+    references = [
+        {key: rel[key] for key in ("from_table", "from_column", "to_table", "to_column")}
+        for info in metadata.get("fk_tables", {}).values()
+        for rel in info.get("relationships", [])
+    ]
+    return tables, columns, references
+
+
+def split_cypher_statements(script: str) -> List[str]:
+    """按语句末尾的分号拆分 Cypher 脚本，引号、反引号及 // 注释中的分号不作为分隔符"""
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(script):
+        ch = script[i]
+        if quote:
+            current.append(ch)
+            if ch == "\\" and quote != "`" and i + 1 < len(script):
+                current.append(script[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            current.append(ch)
+        elif script.startswith("//", i):
+            end = script.find("\n", i)
+            end = len(script) if end == -1 else end
+            current.append(script[i:end])
+            i = end
+            continue
+        elif ch == ";":
+            statements.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    statements.append("".join(current))
+    # 丢弃空语句和只有注释的语句
+    return [
+        stmt.strip() for stmt in statements
+        if any(line.strip() and not line.strip().startswith("//") for line in stmt.splitlines())
+    ]
+
+
+# 表的全部字段，每个字段聚合其引用（REFERENCES 指向）和被引用关系
+_TABLE_COLUMNS_QUERY = """
+    OPTIONAL MATCH (t:Table {name: $name})-[:HAS_COLUMN]->(c:Column)
+    OPTIONAL MATCH (c)-[:REFERENCES]->(ref_col:Column)<-[:HAS_COLUMN]-(ref_table:Table)
+    WITH c, collect(DISTINCT CASE WHEN ref_table IS NOT NULL
+        THEN {table: ref_table.name, column: ref_col.name} END) AS refs
+    OPTIONAL MATCH (c)<-[:REFERENCES]-(src_col:Column)<-[:HAS_COLUMN]-(src_table:Table)
+    WITH c, refs, collect(DISTINCT CASE WHEN src_table IS NOT NULL
+        THEN {table: src_table.name, column: src_col.name} END) AS referenced_by
+    RETURN collect(CASE WHEN c IS NOT NULL
+        THEN {name: c.name, type: c.type, references: refs, referenced_by: referenced_by} END) AS columns
+"""
+
+# 按字段名找到所在表（多表同名时取表名最小者），并聚合其引用和被引用关系
+_FIELD_QUERY = """
+    OPTIONAL MATCH (field_table:Table)-[:HAS_COLUMN]->(f:Column {name: $name})
+    %s
+    WITH field_table, f ORDER BY field_table.name LIMIT 1
+    OPTIONAL MATCH (f)-[:REFERENCES]->(ref_col:Column)<-[:HAS_COLUMN]-(ref_table:Table)
+    WITH field_table, f, collect(DISTINCT CASE WHEN ref_table IS NOT NULL
+        THEN {table: ref_table.name, column: ref_col.name, data_type: ref_col.type} END) AS field_references
+    OPTIONAL MATCH (f)<-[:REFERENCES]-(src_col:Column)<-[:HAS_COLUMN]-(src_table:Table)
+    RETURN field_table.name AS field_table, field_references,
+        collect(DISTINCT CASE WHEN src_table IS NOT NULL
+            THEN {table: src_table.name, column: src_col.name, data_type: src_col.type} END) AS field_referenced_by
+"""
+
+TABLE_INFO_QUERY = _TABLE_COLUMNS_QUERY
+
+FIELD_INFO_QUERY = _FIELD_QUERY % ""
+
+# 表查询为空时才在同一次往返中执行字段查询
+TABLE_OR_FIELD_QUERY = (
+    "CALL {" + _TABLE_COLUMNS_QUERY + "}\n"
+    "CALL {\n    WITH columns" + _FIELD_QUERY % "WHERE size(columns) = 0" + "}\n"
+    "RETURN columns, field_table, field_references, field_referenced_by"
+)
+
+
+# 需要走索引查找的热点查询，参数统一为 $name / $table
+INDEXED_QUERIES = [
+    ("table_info", TABLE_INFO_QUERY),
+    ("field_info", FIELD_INFO_QUERY),
+    ("table_or_field", TABLE_OR_FIELD_QUERY),
+    ("column_by_table", "MATCH (c:Column {table: $table, name: $name}) RETURN c")
+]
+
+
+def _format_table_info(table_name, columns):
+    """把聚合查询返回的字段列表整理为 get_table_info 的结果格式，表不存在时返回 None"""
+    if not columns:
+        return None
+    all_columns = []
+    related_tables = set()
+    for column in columns:
+        column_info = {"name": column["name"], "type": column["type"]}
+        if column["references"]:
+            column_info["references"] = column["references"]
+        if column["referenced_by"]:
+            column_info["referenced_by"] = column["referenced_by"]
+        related_tables.update(ref["table"] for ref in column["references"] + column["referenced_by"])
+        all_columns.append(column_info)
+    return {
+        "table": table_name,
+        "columns": all_columns,
+        "related_tables": list(related_tables)
+    }
 
-        if not references_result and not referenced_by_result:
-            return None
 
-        references = []
-        for record in references_result:
-            if record["references_table"] and record["references_column"]:
-                references.append({
-                    "table": record["references_table"],
-                    "column": record["references_column"],
-                    "data_type": record["data_type"]
-                })
+def _format_field_info(field_name, record):
+    """整理字段查询结果，字段不存在时返回 None"""
+    if record is None or record["field_table"] is None:
+        return None
+    return {
+        "field": field_name,
+        "table": record["field_table"],
+        "references": record["field_references"],
+        "referenced_by": record["field_referenced_by"]
+    }
 
-        referenced_by = []
-        for record in referenced_by_result:
-            if record["referenced_by_table"] and record["referenced_by_column"]:
-                referenced_by.append({
-                    "table": record["referenced_by_table"],
-                    "column": record["referenced_by_column"],
-                    "data_type": record["data_type"]
-                })
 
-        return {
-            "field": field_name,
-            "table": table_name,
-            "references": references,
-            "referenced_by": referenced_by
-        }
+def _cypher_string(value: str) -> str:
+    """转为双引号包裹的 Cypher 字符串字面量"""
+    return '"' + (value or "").replace("\\", "\\\\").replace('"', '\\"') + '"'
+
 
-    def query_database(self, input_string):
-        # First, try to find the input string as a table
-        print(f"Querying for table or field: {input_string}")
-        table_info = self.get_table_info(input_string)
-        if table_info:
-            return table_info
-        print(f"Table '{input_string}' not found, checking as field...")
-        # If not found as a table, try to find it as a field
-        field_info = self.get_field_info(input_string)
-        if field_info:
-            return field_info
-        print(f"Field '{input_string}' not found in any table.")
-        # If neither table nor field is found
-        return {"error": "No information found for the provided input."}
-    
 def generate_cypher(json_data: Dict[str, Any]) -> str:
     cypher_statements = []
 
     # 创建表节点和字段节点，并建立 HAS_COLUMN 关系
     for table_name, table_info in json_data.get("fk_tables", {}).items():
-        cypher_statements.append(f'CREATE (t_{table_name}:Table {{name: "{table_name}"}})')
+        table_comment = _cypher_string(table_info.get("comment", ""))
+        cypher_statements.append(f'CREATE (t_{table_name}:Table {{name: "{table_name}", comment: {table_comment}}})')
         for column in table_info.get("columns", []):
             column_name = column["name"]
             column_type = column["type"]
+            column_comment = _cypher_string(column.get("comment", ""))
             cypher_statements.append(
-                f'CREATE (c_{table_name}_{column_name}:Column {{name: "{column_name}", type: "{column_type}"}})'
+                f'CREATE (c_{table_name}_{column_name}:Column {{name: "{column_name}", type: "{column_type}", '
+                f'table: "{table_name}", comment: {column_comment}}})'
             )
             cypher_statements.append(
                 f'CREATE (t_{table_name})-[:HAS_COLUMN]->(c_{table_name}_{column_name})'
             )
 
     for table_name, table_info in json_data.get("independent_tables", {}).items():
-        cypher_statements.append(f'CREATE (t_{table_name}:Table {{name: "{table_name}"}})')
+        table_comment = _cypher_string(table_info.get("comment", ""))
+        cypher_statements.append(f'CREATE (t_{table_name}:Table {{name: "{table_name}", comment: {table_comment}}})')
         for column in table_info.get("columns", []):
             column_name = column["name"]
             column_type = column["type"]
+            column_comment = _cypher_string(column.get("comment", ""))
             cypher_statements.append(
-                f'CREATE (c_{table_name}_{column_name}:Column {{name: "{column_name}", type: "{column_type}"}})'
+                f'CREATE (c_{table_name}_{column_name}:Column {{name: "{column_name}", type: "{column_type}", '
+                f'table: "{table_name}", comment: {column_comment}}})'
             )
             cypher_statements.append(
                 f'CREATE (t_{table_name})-[:HAS_COLUMN]->(c_{table_name}_{column_name})'
@@ -310,6 +678,7 @@ def parse_sql_metadata(sql_content: str):
     sql_content = re.sub(r'/\*!\d{5}\s+(.*?)\*/', '', sql_content, flags=re.DOTALL)
 
     tables = {}
+    table_comments = {}
     relationships = []
     fk_tables = set()
 
@@ -333,6 +702,12 @@ def parse_sql_metadata(sql_content: str):
         cols_block = sql_content[m.end():i-1]
         pos = i
 
+        # 表选项（ENGINE=... COMMENT='...'）位于右括号与分号之间
+        end = sql_content.find(';', i)
+        tbl_cmt = re.search(r"COMMENT\s*=?\s*'((?:[^'\\]|\\.)*)'",
+                            sql_content[i:end if end != -1 else len(sql_content)], re.I)
+        table_comments[table] = tbl_cmt.group(1) if tbl_cmt else ''
+
         # Step 2: 逐行解析字段
         columns = []
         for line in cols_block.splitlines():
@@ -390,11 +765,11 @@ def parse_sql_metadata(sql_content: str):
         tables[table] = columns
 
     # Step 3: 分类输出
-    fk_info = {t: {"columns": tables[t], "relationships": []} for t in fk_tables}
+    fk_info = {t: {"columns": tables[t], "comment": table_comments[t], "relationships": []} for t in fk_tables}
     for r in relationships:
         fk_info[r["from_table"]]["relationships"].append(r)
 
-    indep_info = {t: {"columns": cols} for t, cols in tables.items() if t not in fk_tables}
+    indep_info = {t: {"columns": cols, "comment": table_comments[t]} for t, cols in tables.items() if t not in fk_tables}
 
     return {
         "fk_tables": fk_info,
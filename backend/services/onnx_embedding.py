@@ -0,0 +1,222 @@
+# backend/services/onnx_embedding.py
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARITY_SAMPLES = [
+    "用户信息表，存储用户的基本资料",
+    "订单表中的下单时间字段",
+    "统计每个月的碳排放总量",
+    "应急地址信息表，包含地点类型和坐标",
+    "查询最近一周新增的设备数量",
+    "字段名: user_id; 中文名: 用户ID; 类型: BIGINT",
+    "指标名: 有效地址数量; 表达式: COUNT(CASE WHEN del_flag = '0' THEN 1 END)",
+    "How many orders were placed yesterday?",
+]
+
+
+def export_onnx(model_path: str, onnx_path: str, opset: int = 17) -> str:
+    """
+    将 SentenceTransformer 的 transformer 主体导出为 ONNX（输出 last_hidden_state）
+    :param model_path: 模型路径
+    :param onnx_path: 导出文件路径
+    :param opset: ONNX opset 版本
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    logger.info(f"Exporting {model_path} to ONNX: {onnx_path}")
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModel.from_pretrained(model_path).eval()
+    sample = dict(tokenizer(["示例文本", "another sample"], padding=True, return_tensors="pt"))
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    Path(onnx_path).parent.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample,),
+            onnx_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    return onnx_path
+
+
+def quantize_onnx(onnx_path: str, quantized_path: str) -> str:
+    """对 ONNX 模型做 int8 动态量化"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info(f"Quantizing {onnx_path} -> {quantized_path}")
+    quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+def _read_pooling_config(model_path: str) -> Dict:
+    """读取 SentenceTransformer 的池化与归一化配置"""
+    config = {"mode": "mean", "normalize": False}
+    root = Path(model_path)
+    modules_file = root / "modules.json"
+    if not modules_file.exists():
+        return config
+    modules = json.loads(modules_file.read_text(encoding="utf-8"))
+    for module in modules:
+        module_type = module.get("type", "")
+        if module_type.endswith("Normalize"):
+            config["normalize"] = True
+        elif module_type.endswith("Pooling"):
+            pooling_file = root / module.get("path", "") / "config.json"
+            if pooling_file.exists():
+                pooling = json.loads(pooling_file.read_text(encoding="utf-8"))
+                if pooling.get("pooling_mode_cls_token"):
+                    config["mode"] = "cls"
+                elif pooling.get("pooling_mode_lasttoken"):
+                    config["mode"] = "lasttoken"
+    return config
+
+
+def _read_max_seq_length(model_path: str, tokenizer) -> int:
+    """
+    与 SentenceTransformer 一致：优先读取 sentence_bert_config.json 中的 max_seq_length，
+    没有时使用分词器的 model_max_length（过大的占位值按 512 处理）
+    """
+    config_file = Path(model_path) / "sentence_bert_config.json"
+    if config_file.exists():
+        value = json.loads(config_file.read_text(encoding="utf-8")).get("max_seq_length")
+        if value:
+            return int(value)
+    model_max_length = getattr(tokenizer, "model_max_length", None) or 512
+    return model_max_length if model_max_length <= 100000 else 512
+
+
+class OnnxEmbeddingBackend:
+    """
+    ONNX Runtime CPU 嵌入后端，可选 int8 动态量化
+    复现 SentenceTransformer 的池化/归一化逻辑，encode 接口与之兼容
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        onnx_path: Optional[str] = None,
+        quantize: bool = False,
+        num_threads: int = 0
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_path = model_path
+        self.pooling = _read_pooling_config(model_path)
+
+        onnx_path = onnx_path or os.path.join(model_path, "onnx", "model.onnx")
+        if not os.path.exists(onnx_path):
+            export_onnx(model_path, onnx_path)
+        if quantize:
+            quantized_path = str(Path(onnx_path).with_name(Path(onnx_path).stem + "_int8.onnx"))
+            if not os.path.exists(quantized_path):
+                quantize_onnx(onnx_path, quantized_path)
+            onnx_path = quantized_path
+        self.onnx_path = onnx_path
+
+        # 与 torch 后端（load_embedding_model）一致：左侧填充，截断长度取模型自身配置
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, padding_side="left")
+        self.max_seq_length = _read_max_seq_length(model_path, self.tokenizer)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+        if not isinstance(self.dim, int):
+            self.dim = self._run(["dim probe"]).shape[-1]
+        self.cache_identity = f"{model_path}:{self.dim}:onnx-{'int8' if quantize else 'fp32'}:{self.max_seq_length}"
+        logger.info(f"ONNX embedding backend ready: {onnx_path}")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in encoded if name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = encoded["attention_mask"].astype(np.float32)
+
+        mode = self.pooling["mode"]
+        if mode == "cls":
+            vectors = hidden[:, 0]
+        elif mode == "lasttoken":
+            vectors = hidden[:, -1]
+        else:
+            summed = (hidden * mask[:, :, None]).sum(axis=1)
+            vectors = summed / np.clip(mask.sum(axis=1, keepdims=True), 1e-9, None)
+
+        if self.pooling["normalize"]:
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batch_size = max(1, batch_size)
+        vectors = np.concatenate([
+            self._run(texts[start:start + batch_size])
+            for start in range(0, len(texts), batch_size)
+        ])
+        return vectors[0] if single else vectors
+
+
+def parity_check(model_path: str, backend, samples: Optional[List[str]] = None, device: str = "cpu") -> Dict:
+    """
+    对比后端与线上 fp32 torch 后端的输出，报告余弦偏差 (1 - cos)
+    :param model_path: 模型路径
+    :param backend: 待检查的嵌入后端
+    :param samples: 样本文本 (None则使用内置样本)
+    """
+    from backend.services.embedding_service import load_embedding_model
+
+    samples = samples or DEFAULT_PARITY_SAMPLES
+    # 参照模型与线上 torch 后端的构造完全一致（包括左侧填充），偏差才有意义
+    reference = load_embedding_model(model_path, device, "torch").encode(samples, convert_to_numpy=True)
+    candidate = np.asarray(backend.encode(samples), dtype=np.float32)
+
+    ref_norm = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand_norm = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    deviation = 1.0 - (ref_norm * cand_norm).sum(axis=1)
+    return {
+        "samples": len(samples),
+        "mean_cosine_deviation": float(deviation.mean()),
+        "max_cosine_deviation": float(deviation.max()),
+        "min_cosine_similarity": float(1.0 - deviation.max())
+    }
+
+
+if __name__ == "__main__":
+    # 配置参数
+    MODEL_PATH = "E:/model/m3e-base"
+
+    logging.basicConfig(level=logging.INFO)
+    for quantize in (False, True):
+        onnx_backend = OnnxEmbeddingBackend(MODEL_PATH, quantize=quantize)
+        report = parity_check(MODEL_PATH, onnx_backend)
+        logger.info(f"{'int8' if quantize else 'fp32'} parity: {report}")
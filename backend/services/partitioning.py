@@ -0,0 +1,74 @@
+# backend/services/partitioning.py
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 未标明来源数据库的条目统一放入该库名对应的分区
+UNSPECIFIED_DATABASE = "_unspecified"
+
+_INVALID_CHARS = re.compile(r"[^A-Za-z0-9_]")
+_SEPARATOR = "__"
+
+
+def _database_token(database: str) -> str:
+    """分区名只允许字母、数字和下划线，库名含其他字符时替换并追加短哈希避免冲突"""
+    token = _INVALID_CHARS.sub("_", database).replace(_SEPARATOR, "_")
+    if token != database:
+        token = f"{token}_{hashlib.sha1(database.encode('utf-8')).hexdigest()[:8]}"
+    return token
+
+
+def item_database(item: Dict) -> str:
+    """条目的来源数据库：优先 item["database"]，其次 item["metadata"]["database"]"""
+    database = item.get("database") or (item.get("metadata") or {}).get("database")
+    return database or UNSPECIFIED_DATABASE
+
+
+def with_default_database(items: List[Dict], database: Optional[str]) -> List[Dict]:
+    """为未标明来源数据库的条目（item["database"] 与 item["metadata"]["database"] 均为空）补上 database"""
+    if not database:
+        return items
+    return [
+        item if item_database(item) != UNSPECIFIED_DATABASE else {**item, "database": database}
+        for item in items
+    ]
+
+
+def partition_name(database: str, item_type: str) -> str:
+    """按来源数据库与条目类型（table / column / metric）生成分区名"""
+    return f"p_{_database_token(database or UNSPECIFIED_DATABASE)}{_SEPARATOR}{_database_token(item_type)}"
+
+
+def parse_partition_name(name: str) -> Optional[Tuple[str, str]]:
+    """拆出 (库名标记, 类型标记)，不是按本规则命名的分区（如 _default）返回 None"""
+    if not name.startswith("p_") or _SEPARATOR not in name:
+        return None
+    database_token, type_token = name[2:].rsplit(_SEPARATOR, 1)
+    return database_token, type_token
+
+
+def select_partitions(
+    existing: Iterable[str],
+    databases: Optional[List[str]] = None,
+    types: Optional[List[str]] = None
+) -> List[str]:
+    """
+    从集合已有的分区中挑出满足库名/类型过滤条件的分区
+    :param databases: 来源数据库列表，None 表示不限
+    :param types: 条目类型列表，None 表示不限
+    """
+    database_tokens = {_database_token(db) for db in databases} if databases else None
+    type_tokens = {_database_token(t) for t in types} if types else None
+    selected = []
+    for name in existing:
+        parsed = parse_partition_name(name)
+        if parsed is None:
+            continue
+        database_token, type_token = parsed
+        if database_tokens is not None and database_token not in database_tokens:
+            continue
+        if type_tokens is not None and type_token not in type_tokens:
+            continue
+        selected.append(name)
+    return sorted(selected)
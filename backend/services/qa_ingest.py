@@ -0,0 +1,186 @@
+# backend/services/qa_ingest.py
+
+import csv
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from backend.services.embedding_service import encode_in_batches
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+QUESTION_COLUMN = "问题"
+ANSWER_COLUMN = "答案"
+
+_DONE = object()
+
+
+def read_qa_csv_header(csv_path: str) -> List[str]:
+    """读取表头并检查必要列，缺少时抛出 ValueError"""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    if QUESTION_COLUMN not in header or ANSWER_COLUMN not in header:
+        raise ValueError(f"CSV文件必须包含'{QUESTION_COLUMN}'和'{ANSWER_COLUMN}'两列")
+    return header
+
+
+def iter_qa_csv(csv_path: str, chunk_size: int = 2000) -> Iterator[Tuple[List[Tuple[str, str]], int]]:
+    """
+    流式读取 QA CSV，每次产出 (有效问答对列表, 本块读取的行数)
+    问题或答案为空的行被跳过
+    """
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        pairs, rows = [], 0
+        for row in reader:
+            rows += 1
+            question = (row.get(QUESTION_COLUMN) or "").strip()
+            answer = (row.get(ANSWER_COLUMN) or "").strip()
+            if question and answer:
+                pairs.append((question, answer))
+            if rows >= chunk_size:
+                yield pairs, rows
+                pairs, rows = [], 0
+        if rows:
+            yield pairs, rows
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """向有界队列放入数据，下游已失败时放弃"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def ingest_qa_csv(
+    client,
+    collection_name: str,
+    csv_path: str,
+    model,
+    chunk_size: int = 2000,
+    batch_size: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """
+    解析 -> 编码 -> 写入 三段流水线导入 QA CSV
+    解析和写入各占一个线程，编码在当前线程进行，段间用长度为 2 的队列衔接，
+    每块编码完成后立即写入，全部写完（或中途失败）后统一 flush 并按需建索引
+    :param client: MilvusClient / LocalVectorClient
+    :param chunk_size: 每块的 CSV 行数
+    :param batch_size: 编码批次大小 (None则使用 Settings.EMBEDDING_BATCH_SIZE)
+    :param on_progress: 每块写入后以当前统计调用
+    :return: {"rows_read", "inserted", "skipped", "chunks", "seconds", "rows_per_sec", "index"}
+    """
+    batch_size = batch_size or get_settings().EMBEDDING_BATCH_SIZE
+    parsed: queue.Queue = queue.Queue(maxsize=2)
+    encoded: queue.Queue = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    errors: List[Exception] = []
+    stats = {"rows_read": 0, "inserted": 0, "skipped": 0, "chunks": 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def report():
+        if on_progress:
+            with lock:
+                snapshot = dict(stats)
+            elapsed = time.perf_counter() - start
+            snapshot["rows_per_sec"] = round(snapshot["inserted"] / elapsed, 1) if elapsed > 0 else 0.0
+            on_progress(snapshot)
+
+    def parse():
+        try:
+            for pairs, rows in iter_qa_csv(csv_path, chunk_size):
+                with lock:
+                    stats["rows_read"] += rows
+                    stats["skipped"] += rows - len(pairs)
+                if not _put(parsed, pairs, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(parsed, _DONE, stop)
+
+    def insert():
+        while True:
+            try:
+                rows = encoded.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if rows is _DONE:
+                return
+            try:
+                result = client.bulk_insert(collection_name, rows, kind="qa", defer_index=True)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                return
+            with lock:
+                stats["inserted"] += result["inserted"]
+                stats["skipped"] += result["skipped"]
+                stats["chunks"] += 1
+            report()
+
+    parser = threading.Thread(target=parse, name="qa-csv-parse", daemon=True)
+    inserter = threading.Thread(target=insert, name="qa-csv-insert", daemon=True)
+    parser.start()
+    inserter.start()
+    try:
+        while not stop.is_set():
+            try:
+                pairs = parsed.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if pairs is _DONE:
+                break
+            if not pairs:
+                continue
+            vectors = encode_in_batches(model, [q for q, _ in pairs], batch_size=batch_size)
+            rows = [
+                {"question": question, "answer": answer, "embedding": vector}
+                for (question, answer), vector in zip(pairs, vectors)
+                if vector is not None
+            ]
+            with lock:
+                stats["skipped"] += len(pairs) - len(rows)
+            if rows and not _put(encoded, rows, stop):
+                break
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(encoded, _DONE, stop)
+        parser.join()
+        inserter.join()
+
+    # 即使中途失败，已写入的块也要 flush、建索引并清理检索缓存，否则这些数据检索不到
+    index_action = "skipped"
+    if stats["inserted"]:
+        try:
+            index_action = client.finish_bulk_insert(collection_name)
+        except Exception as e:
+            if not errors:
+                raise
+            logger.error(f"QA CSV 导入失败后收尾集合 {collection_name} 失败: {e}")
+    if errors:
+        logger.error(f"QA CSV 导入集合 {collection_name} 失败，已写入 {stats['inserted']} 条")
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start
+    stats.update(
+        seconds=round(elapsed, 3),
+        rows_per_sec=round(stats["inserted"] / elapsed, 1) if elapsed > 0 else 0.0,
+        index=index_action
+    )
+    logger.info(f"QA CSV 导入集合 {collection_name} 完成: {stats}")
+    return stats
@@ -0,0 +1,123 @@
+# backend/services/query_cache.py
+
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.utils.config import get_settings
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，条目超过 ttl 秒后失效（ttl<=0 表示不过期）"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if not expires_at or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate) -> int:
+        """删除所有满足条件的键，返回删除数量"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+def embedding_hash(embedding: List[float]) -> str:
+    return hashlib.sha1(array("f", embedding).tobytes()).hexdigest()
+
+
+class SearchCache:
+    """
+    两级检索缓存：
+    - 查询文本 -> 查询向量
+    - (集合, 向量哈希, top_k, 检索类型) -> 检索结果，集合数据变化时按集合失效
+    """
+
+    def __init__(self, embedding_size=1024, embedding_ttl=600, result_size=4096, result_ttl=300):
+        self.embeddings = LRUCache(embedding_size, embedding_ttl)
+        self.results = LRUCache(result_size, result_ttl)
+
+    def get_embedding(self, query: str) -> Optional[List[float]]:
+        return self.embeddings.get(query)
+
+    def put_embedding(self, query: str, embedding: List[float]):
+        self.embeddings.put(query, embedding)
+
+    def get_results(self, collection: str, emb_hash: str, top_k: int, kind: str = "metadata"):
+        return self.results.get((collection, emb_hash, top_k, kind))
+
+    def put_results(self, collection: str, emb_hash: str, top_k: int, results, kind: str = "metadata"):
+        self.results.put((collection, emb_hash, top_k, kind), results)
+
+    def invalidate(self, collection: str) -> int:
+        """集合数据被插入或清空后调用，丢弃该集合的全部检索结果"""
+        return self.results.discard_where(lambda key: key[0] == collection)
+
+    def stats(self) -> Dict:
+        return {
+            "query_embeddings": self.embeddings.stats(),
+            "search_results": self.results.stats()
+        }
+
+
+# 全局共享检索缓存实例
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            settings = get_settings()
+            _search_cache = SearchCache(
+                embedding_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+                embedding_ttl=settings.QUERY_EMBEDDING_CACHE_TTL,
+                result_size=settings.SEARCH_RESULT_CACHE_SIZE,
+                result_ttl=settings.SEARCH_RESULT_CACHE_TTL
+            )
+    return _search_cache
@@ -0,0 +1,78 @@
+# backend/services/result_merge.py
+
+import heapq
+from typing import Dict, List, Optional
+
+
+def normalize_distance(distance: float, metric_type: str = "L2") -> float:
+    """
+    把不同度量的检索距离统一换算为 (0, 1] 区间的相似度分数，越大越相似，使 L2 与 IP 集合的命中可以相互比较
+    - L2：距离越小越相似，取 1 / (1 + d)
+    - IP / COSINE：相似度本身越大越好，按 (1 + s) / 2 映射并截断到 [0, 1]
+    同一查询在各集合中的距离尺度相同，不再按查询向量模长缩放（对所有集合乘同一系数不改变排序）
+    """
+    if metric_type in ("IP", "COSINE"):
+        return float(min(1.0, max(0.0, (1.0 + distance) / 2.0)))
+    return float(1.0 / (1.0 + max(distance, 0.0)))
+
+
+def merge_top_k(
+    results: Dict[str, List[Dict]],
+    top_k: int,
+    metric_types: Optional[Dict[str, str]] = None
+) -> List[Dict]:
+    """
+    对各集合已按距离排好序的命中列表做基于堆的 k 路归并，返回全局 top-k
+    每个命中附带 collection（来源集合）和 score（归一化分数）
+    :param results: {集合名: 命中列表}
+    :param metric_types: {集合名: 度量类型}，缺省为 L2
+    """
+    metric_types = metric_types or {}
+
+    def scored(collection, hit):
+        score = normalize_distance(hit["distance"], metric_types.get(collection, "L2"))
+        return dict(hit, collection=collection, score=score)
+
+    heap = []
+    for order, (collection, hits) in enumerate(results.items()):
+        if isinstance(hits, list) and hits:
+            hit = scored(collection, hits[0])
+            heapq.heappush(heap, (-hit["score"], order, 0, collection, hit))
+
+    merged = []
+    while heap and len(merged) < top_k:
+        _, order, position, collection, hit = heapq.heappop(heap)
+        merged.append(hit)
+        hits = results[collection]
+        # 只有被取走头部的集合才推进下一个，其余集合的剩余命中不再访问
+        if position + 1 < len(hits):
+            following = scored(collection, hits[position + 1])
+            heapq.heappush(heap, (-following["score"], order, position + 1, collection, following))
+    return merged
+
+
+def collections_to_refetch(
+    results: Dict[str, List[Dict]],
+    fetched: int,
+    merged: List[Dict],
+    top_k: int,
+    metric_types: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """
+    找出继续获取更多结果仍可能进入全局 top-k 的集合
+    集合本轮返回了完整的 fetched 条，且其最差一条不劣于当前第 k 名（或全局结果不足 top_k）时才需要继续获取，
+    其余集合的剩余结果不可能超过第 k 名，提前停止
+    """
+    if fetched >= top_k:
+        return []
+    metric_types = metric_types or {}
+    kth_score = merged[-1]["score"] if len(merged) >= top_k else None
+
+    refetch = []
+    for collection, hits in results.items():
+        if not isinstance(hits, list) or len(hits) < fetched:
+            continue
+        worst = normalize_distance(hits[-1]["distance"], metric_types.get(collection, "L2"))
+        if kth_score is None or worst >= kth_score:
+            refetch.append(collection)
+    return refetch
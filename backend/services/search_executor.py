@@ -0,0 +1,98 @@
+# backend/services/search_executor.py
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable
+
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SearchExecutor:
+    """
+    进程级共享的有界检索线程池
+    fan_out 并发执行多个集合的检索，到达截止时间后取消尚未开始的任务，
+    正在执行的任务通过传入的剩余时间（pymilvus timeout）自行中止
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vector-search")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def fan_out(self, tasks: Dict[Hashable, Callable[[float], Any]], timeout: float) -> Dict[Hashable, Any]:
+        """
+        :param tasks: {键: 接收剩余秒数参数的检索函数}
+        :param timeout: 整个请求的截止时间（秒）
+        :return: {键: 结果}，失败或超时的键对应 {"error": ...}
+        """
+        deadline = time.monotonic() + timeout
+
+        def run(func):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("deadline exceeded before search started")
+            return func(remaining)
+
+        futures = {self._executor.submit(run, func): key for key, func in tasks.items()}
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+        results = {}
+        for future in done:
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as exc:
+                results[key] = {"error": str(exc)}
+        cancelled = 0
+        for future in not_done:
+            if future.cancel():
+                cancelled += 1
+            results[futures[future]] = {"error": f"search timed out after {timeout}s"}
+
+        with self._lock:
+            self.submitted += len(futures)
+            self.timeouts += len(not_done)
+            self.cancelled += cancelled
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._executor._work_queue.qsize(),
+                "submitted": self.submitted,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局共享检索线程池
+_search_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_search_executor() -> SearchExecutor:
+    global _search_executor
+    with _executor_lock:
+        if _search_executor is None:
+            _search_executor = SearchExecutor(get_settings().SEARCH_EXECUTOR_WORKERS)
+    return _search_executor
+
+
+def close_search_executor():
+    """应用关闭时停止线程池并重置全局实例，之后的 get_search_executor() 会重新创建"""
+    global _search_executor
+    with _executor_lock:
+        if _search_executor is not None:
+            _search_executor.shutdown()
+            _search_executor = None
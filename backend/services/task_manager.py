@@ -1,18 +1,50 @@
 from concurrent.futures import ThreadPoolExecutor, Future
-from typing import Dict
+from typing import Dict, Optional
 import threading
+import time
 from fastapi import HTTPException
 import uuid
 
 class TaskManager:
-    def __init__(self):
+    def __init__(self, retention_seconds: float = 3600):
         self.tasks: Dict[str, Future] = {}
+        self.progress: Dict[str, Dict] = {}  # 长任务上报的进度
+        self.finished_at: Dict[str, float] = {}  # 已结束任务的结束时间，保留 retention_seconds 供查询
+        self.retention_seconds = retention_seconds
         self.lock = threading.Lock()
         self.executor = ThreadPoolExecutor(max_workers=4)  # 控制并发数
 
     def add_task(self, task_id: str, future: Future):
         with self.lock:
+            self._prune()
             self.tasks[task_id] = future
+        future.add_done_callback(lambda _, task_id=task_id: self._mark_finished(task_id))
+
+    def get_task(self, task_id: str) -> Optional[Future]:
+        with self.lock:
+            self._prune()
+            return self.tasks.get(task_id)
+
+    def _mark_finished(self, task_id: str):
+        with self.lock:
+            if task_id in self.tasks:
+                self.finished_at[task_id] = time.monotonic()
+
+    def _prune(self):
+        """移除结束超过 retention_seconds 的任务及其进度（调用方持有锁）"""
+        cutoff = time.monotonic() - self.retention_seconds
+        for task_id in [t for t, finished in self.finished_at.items() if finished < cutoff]:
+            self.tasks.pop(task_id, None)
+            self.progress.pop(task_id, None)
+            del self.finished_at[task_id]
+
+    def update_progress(self, task_id: str, **fields):
+        with self.lock:
+            self.progress.setdefault(task_id, {}).update(fields)
+
+    def get_progress(self, task_id: str) -> Dict:
+        with self.lock:
+            return dict(self.progress.get(task_id, {}))
 
     def cancel_task(self, task_id: str):
         with self.lock:
@@ -21,6 +53,8 @@ class TaskManager:
             future = self.tasks[task_id]
             future.cancel()
             del self.tasks[task_id]
+            self.progress.pop(task_id, None)
+            self.finished_at.pop(task_id, None)
             return True
 
     def shutdown(self):
@@ -0,0 +1,103 @@
+# backend/services/upsert_sync.py
+
+import hashlib
+from typing import Dict, Iterable, List
+
+from backend.services.embedding_cache import normalize_text
+from backend.services.partitioning import UNSPECIFIED_DATABASE, item_database
+
+
+def _sha1(*parts: str) -> str:
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def item_key(item: Dict, kind: str = "metadata", partitioned: bool = True) -> str:
+    """
+    待写入条目的稳定标识
+    - metadata：(database, type, name)，不分区的旧集合没有 database，只用 (type, name)
+    - qa：归一化后问题文本的哈希
+    """
+    if kind == "qa":
+        return _sha1(normalize_text(item["question"]))
+    database = item_database(item) if partitioned else ""
+    return _sha1(database, item["type"], item["metadata"]["name"])
+
+
+def stored_key(row: Dict, kind: str = "metadata", partitioned: bool = True) -> str:
+    """已存储行的稳定标识，与 item_key 对应"""
+    if kind == "qa":
+        return _sha1(normalize_text(row["question"]))
+    database = (row.get("database") or UNSPECIFIED_DATABASE) if partitioned else ""
+    return _sha1(database, row["type"], row["name"])
+
+
+def item_content_hash(item: Dict, kind: str = "metadata") -> str:
+    """条目内容哈希：metadata 为 content，qa 为原始问题与答案"""
+    if kind == "qa":
+        return _sha1(item["question"], item["answer"])
+    return _sha1(item["content"])
+
+
+def stored_content_hash(row: Dict, kind: str = "metadata") -> str:
+    if kind == "qa":
+        return _sha1(row["question"], row["answer"])
+    return _sha1(row["description"])
+
+
+def plan_sync(
+    existing: Iterable[Dict],
+    items: List[Dict],
+    kind: str = "metadata",
+    partitioned: bool = True,
+    delete_missing: bool = True
+) -> Dict:
+    """
+    对比已存储行与待写入条目，得出增量同步计划
+    :param existing: 已存储的行，需包含 id 及计算标识/内容哈希所需的字段
+    :param items: 待写入条目（同一标识出现多次时以最后一次为准）
+    :param delete_missing: 是否删除已存储但不在本次条目中的行
+    :return: {"added": [条目], "updated": [条目], "unchanged": 数量, "delete_ids": [id], "deleted": 数量, "skipped": 数量}
+    """
+    incoming = {}
+    for item in items:
+        try:
+            item_content_hash(item, kind)
+            incoming[item_key(item, kind, partitioned)] = item
+        except (KeyError, TypeError):
+            continue
+    # 无效条目与重复标识被覆盖的条目
+    skipped = len(items) - len(incoming)
+
+    stored: Dict[str, List[Dict]] = {}
+    for row in existing:
+        stored.setdefault(stored_key(row, kind, partitioned), []).append(row)
+
+    added, updated, delete_ids = [], [], []
+    unchanged = deleted = 0
+    for key, item in incoming.items():
+        rows = stored.pop(key, None)
+        if not rows:
+            added.append(item)
+            continue
+        # 历史重复写入的行只保留一条
+        keep, duplicates = rows[0], rows[1:]
+        delete_ids.extend(row["id"] for row in duplicates)
+        if stored_content_hash(keep, kind) == item_content_hash(item, kind):
+            unchanged += 1
+        else:
+            updated.append(item)
+            delete_ids.append(keep["id"])
+
+    if delete_missing:
+        for rows in stored.values():
+            delete_ids.extend(row["id"] for row in rows)
+            deleted += 1
+
+    return {
+        "added": added,
+        "updated": updated,
+        "unchanged": unchanged,
+        "delete_ids": delete_ids,
+        "deleted": deleted,
+        "skipped": skipped
+    }
@@ -0,0 +1,120 @@
+# backend/services/warmup.py
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """记录各组件的预热状态：pending / loading / ready / failed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict] = {}
+
+    def register(self, name: str):
+        with self._lock:
+            self._components.setdefault(name, {"status": "pending"})
+
+    def run(self, name: str, func: Callable):
+        """执行预热步骤并记录结果，失败不影响其他组件"""
+        with self._lock:
+            self._components[name] = {"status": "loading"}
+        start = time.perf_counter()
+        try:
+            detail = func()
+            state = {"status": "ready", "seconds": round(time.perf_counter() - start, 3)}
+            if detail:
+                state["detail"] = detail
+        except Exception as e:
+            logger.error(f"Warm-up of {name} failed: {e}")
+            state = {"status": "failed", "error": str(e), "seconds": round(time.perf_counter() - start, 3)}
+        with self._lock:
+            self._components[name] = state
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(c["status"] == "ready" for c in self._components.values())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(state) for name, state in self._components.items()}
+
+
+readiness = Readiness()
+
+
+def _warm_model():
+    from backend.models.m3e_base import get_model
+    from backend.services.embedding_service import encode_in_batches
+
+    model = get_model()
+    # 空跑一次编码，让 torch 完成首轮初始化，不写入嵌入缓存
+    encode_in_batches(model, ["warmup"], strict=True, use_cache=False)
+    return None
+
+
+def _warm_milvus(get_milvus_client: Callable, collections: List[str]):
+    def step():
+        client = get_milvus_client()
+        loaded = []
+        for name in collections:
+            client.get_collection(name)
+            loaded.append(name)
+        return {"collections": loaded}
+    return step
+
+
+def check_components(get_milvus_client: Callable) -> Dict[str, Dict]:
+    """
+    未启用预热时直接检查各组件：模型是否已加载（不触发加载）、Milvus 能否列出集合
+    模型在首个请求时才加载，加载前报告 pending
+    """
+    from backend.models.m3e_base import is_model_loaded
+
+    components = {
+        "embedding_model": {"status": "ready"} if is_model_loaded()
+        else {"status": "pending", "detail": "warm-up disabled, model loads on first request"}
+    }
+    try:
+        get_milvus_client().list_collections()
+        components["milvus"] = {"status": "ready"}
+    except Exception as e:
+        components["milvus"] = {"status": "failed", "error": str(e)}
+    return components
+
+
+def start_warmup(get_milvus_client: Callable, ensure_graph_schema: Optional[Callable] = None) -> Optional[threading.Thread]:
+    """
+    在后台线程中加载模型、空跑编码、预加载配置的 Milvus 集合，并建立图库约束与索引
+    应用不等待这些步骤即开始接收请求，各步骤状态见 /ready
+    :param get_milvus_client: 返回已连接 MilvusClient 的工厂函数
+    :param ensure_graph_schema: 建立 Neo4j 约束与索引的函数，NEO4J_ENSURE_SCHEMA 开启时执行（不受 WARMUP_ENABLED 影响）
+    :return: 后台线程，没有需要执行的步骤时为 None
+    """
+    settings = get_settings()
+    steps = []
+    if settings.WARMUP_ENABLED:
+        steps.append(("embedding_model", _warm_model))
+        if settings.WARMUP_MILVUS:
+            steps.append(("milvus", _warm_milvus(get_milvus_client, settings.WARMUP_COLLECTIONS)))
+    if ensure_graph_schema is not None and settings.NEO4J_ENSURE_SCHEMA:
+        steps.append(("neo4j_schema", ensure_graph_schema))
+    if not steps:
+        return None
+    for name, _ in steps:
+        readiness.register(name)
+
+    def worker():
+        for name, func in steps:
+            readiness.run(name, func)
+        logger.info(f"Warm-up finished: {readiness.snapshot()}")
+
+    thread = threading.Thread(target=worker, name="warmup", daemon=True)
+    thread.start()
+    return thread
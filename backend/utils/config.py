@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List
 
 
 class Settings(BaseSettings):
@@ -7,6 +8,12 @@ class Settings(BaseSettings):
     NEO4J_URI: str = "bolt://localhost:7687"
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
+    NEO4J_MAX_POOL_SIZE: int = 50  # 连接池最大连接数
+    NEO4J_ACQUISITION_TIMEOUT: float = 30.0  # 从连接池获取连接的超时时间（秒）
+    NEO4J_LIVENESS_CHECK_SECONDS: float = 30.0  # 连接空闲超过该时间后，借出前先做存活检查
+    NEO4J_MAX_CONNECTION_LIFETIME: float = 3600.0  # 连接最长存活时间（秒）
+    NEO4J_BATCH_SIZE: int = 1000  # 批量写入时每个事务的行数 / 语句数
+    NEO4J_ENSURE_SCHEMA: bool = True  # 应用启动时确保 Table/Column 的约束与索引存在
 
     # Milvus 配置
     MILVUS_HOST: str = "localhost"
@@ -14,7 +21,42 @@ class Settings(BaseSettings):
 
     # 嵌入模型配置（可选）
     EMBEDDING_MODEL_NAME: str = "text-embedding-ada-002"
+    EMBEDDING_MODEL_PATH: str = "E:/model/m3e-base"
     EMBEDDING_DIMENSION: int = 768
+    EMBEDDING_BATCH_SIZE: int = 32
+
+    # 嵌入后端：torch（进程内 SentenceTransformer）/ process_pool（多进程工作池）/ onnx（ONNX Runtime）
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_POOL_WORKERS: int = 0  # 0 表示按 CPU 核数 / 每进程线程数 自动计算
+    EMBEDDING_POOL_THREADS_PER_WORKER: int = 4
+    EMBEDDING_POOL_CHUNK_SIZE: int = 256
+    EMBEDDING_POOL_JOB_TIMEOUT: float = 300.0  # 等待空闲工作进程及单块编码结果的超时时间（秒）
+    EMBEDDING_ONNX_PATH: str = ""  # 为空时使用 <模型路径>/onnx/model.onnx，不存在则自动导出
+    EMBEDDING_ONNX_QUANTIZE: bool = False  # 是否使用 int8 动态量化
+    EMBEDDING_ONNX_THREADS: int = 0
+    MODEL_IDLE_UNLOAD_SECONDS: int = 0  # 无引用的模型空闲多久后卸载，0 表示不卸载
+
+    # 启动预热配置
+    WARMUP_ENABLED: bool = True
+    WARMUP_MILVUS: bool = True
+    WARMUP_COLLECTIONS: List[str] = []  # 启动时预加载的 Milvus 集合，环境变量中使用 JSON 数组
+
+    # 嵌入缓存配置
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 500000
+
+    # 检索缓存配置（内存 LRU，ttl 单位为秒）
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL: int = 3600
+    SEARCH_RESULT_CACHE_SIZE: int = 4096
+    SEARCH_RESULT_CACHE_TTL: int = 300
+
+    # 在线编码请求合并配置
+    EMBEDDING_DISPATCH_ENABLED: bool = True
+    EMBEDDING_DISPATCH_MAX_BATCH: int = 64
+    EMBEDDING_DISPATCH_WAIT_MS: float = 5
+    EMBEDDING_DISPATCH_TIMEOUT: float = 30.0  # 在线单条编码等待合并批次结果的超时时间（秒）
     
     DB_HOST: str = "localhost"
     DB_PORT: str = "3306"
@@ -25,6 +67,19 @@ class Settings(BaseSettings):
 
     MILVUS_HOST: str = "localhost"
     MILVUS_PORT: str = "19530"
+    MILVUS_INSERT_CHUNK_SIZE: int = 5000  # 批量写入时每次 insert 的行数
+    MILVUS_INDEX_REBUILD_GROWTH: float = 1.0  # 数据量相对上次建索引增长超过该比例时重建索引
+    MILVUS_INDEX_POLICY_PATH: str = "milvus_index_policies.json"  # 各集合索引策略的存储位置
+    MILVUS_INDEX_TARGET: str = "balanced"  # 默认目标：latency / balanced / recall
+    MILVUS_FLAT_MAX_ROWS: int = 10000  # 低于该行数使用 FLAT
+    MILVUS_LARGE_COLLECTION_ROWS: int = 1000000  # 达到该行数视为大集合
+    SEARCH_EXECUTOR_WORKERS: int = 16  # 进程级共享检索线程池大小
+    SEARCH_TIMEOUT_SECONDS: float = 10.0  # 单个检索请求的默认截止时间
+    MILVUS_MAX_LOADED_COLLECTIONS: int = 32  # 同时加载的集合数上限，超出时按 LRU 释放，0 表示不限
+    MILVUS_LOADED_MEMORY_MB: int = 0  # 已加载集合估算内存上限（MB），0 表示不限
+    MILVUS_PINNED_COLLECTIONS: List[str] = []  # 常驻加载、不参与 LRU 释放的集合
+    VECTOR_STORE_BACKEND: str = "milvus"  # 向量库后端：milvus / local（进程内 NumPy 实现，无需 Milvus 服务）
+    LOCAL_VECTOR_STORE_PATH: str = "local_vector_store"  # local 后端的数据目录
     DEVICE: str = "cpu"  
     class Config:
         env_file = ".env"
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from backend.services.embedding_stream import iter_json_items
+
+ITEMS = [
+    {"content": "表 users 的字段", "id": 1},
+    1,
+    2.5,
+    -3e-2,
+    1E10,
+    'str, with ] and \\" escapes',
+    True,
+    None,
+    [1, [2, 3]],
+    {"nested": {"list": [0.125, "x"]}},
+    12345678901234567890
+]
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "input.json"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_array_split_at_every_offset(tmp_path, indent):
+    text = json.dumps(ITEMS, ensure_ascii=False, indent=indent)
+    path = _write(tmp_path, text)
+    with open(path, encoding="utf-8") as f:
+        expected = json.load(f)
+    # 依次以每个长度作为块大小，使块边界落在每一个位置（含数字、字符串和转义的中间）
+    for chunk_size in range(1, len(text) + 2):
+        assert list(iter_json_items(path, chunk_size)) == expected, chunk_size
+
+
+def test_numbers_cut_at_chunk_boundary(tmp_path):
+    text = json.dumps([1, 2.5, "str"])
+    path = _write(tmp_path, text)
+    for chunk_size in range(1, len(text) + 2):
+        assert list(iter_json_items(path, chunk_size)) == [1, 2.5, "str"], chunk_size
+
+
+def test_ndjson(tmp_path):
+    path = _write(tmp_path, "\n".join(json.dumps(item, ensure_ascii=False) for item in ITEMS) + "\n")
+    assert list(iter_json_items(path, 7)) == ITEMS
+
+
+@pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "[1, 2.]"])
+def test_malformed_array_raises(tmp_path, text):
+    path = _write(tmp_path, text)
+    for chunk_size in (1, 3, 64):
+        with pytest.raises(ValueError):
+            list(iter_json_items(path, chunk_size))
@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# 应用启动阶段不应导入的重量级依赖，它们由后台预热或首次请求时再加载
+HEAVY_MODULES = ("torch", "sentence_transformers", "pandas", "pymilvus", "neo4j")
+
+IMPORT_BUDGET_SECONDS = 3.0
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def measure_import(module: str) -> dict:
+    """在全新的解释器中导入模块，返回耗时与已加载的重量级依赖"""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'heavy_modules_loaded': heavy}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=REPO_ROOT)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["within_budget"] = report["seconds"] <= IMPORT_BUDGET_SECONDS
+    return report
+
+
+def test_app_import_within_budget():
+    report = measure_import("backend.api.main")
+    assert report["within_budget"], report
+    assert report["heavy_modules_loaded"] == [], report